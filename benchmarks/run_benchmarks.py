@@ -0,0 +1,339 @@
+"""
+Benchmarks for the extraction, prediction, session and rendering hot paths.
+
+Generates a synthetic pitch video and session locally, times each stage and
+records throughput and peak traced memory. Results are written to
+benchmarks/results/<timestamp>-<commit>.json so runs can be compared:
+
+    python -m benchmarks.run_benchmarks --frames 200 --width 1920 --height 1080
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<earlier>.json
+    python -m benchmarks.run_benchmarks --only trackers --like match.mp4 --frames 60
+    python -m benchmarks.run_benchmarks --only geometry --session-frames 100000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+import cv2
+import numpy as np
+from data.annotation_store import KEYPOINT_NAMES, frame_to_dict, AnnotationStore
+from utils.extraction_cache import ExtractionCache
+from utils.frame_extractor import extract_frames
+from utils.frame_source import open_frame_source
+from utils.geometry_check import check_values
+from utils.shot_detection import analyse_frames
+from utils.trackers import TRACKER_NAMES
+from utils.keypoint_predictor import (
+    annotations_to_points, build_pyramid, convert_annotations_to_array, predict_keypoints,
+    predictions_to_annotations, propagate_keypoints, update_annotations_with_predictions,
+)
+from benchmarks.synthetic import synthetic_session, write_synthetic_video
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STAGES = ("extract", "predict", "trackers", "shots", "convert", "session", "geometry", "scene")
+
+def measure(name, func, items, unit, repeat=1):
+    """
+    Run func() repeat times and return a result dict with the best wall time,
+    throughput (items per second) and peak memory traced during the first run.
+    """
+    times = []
+    peak = 0
+    for i in range(repeat):
+        if i == 0:
+            tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if i == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    best = min(times)
+    result = {
+        "name": name,
+        "seconds": best,
+        "items": items,
+        "unit": unit,
+        "throughput": items / best if best > 0 else float("inf"),
+        "peak_mb": peak / 2**20,
+    }
+    print(f"{name:<28} {best * 1000:10.1f} ms {result['throughput']:12.1f} {unit}/s {result['peak_mb']:9.1f} MB")
+    return result
+
+def bench_extraction(video_path, work_dir, frame_count, workers):
+    results = []
+    for fmt in ("jpg", "store"):
+        output = os.path.join(work_dir, f"frames-{fmt}")
+
+        def run():
+            # A fresh folder each time, otherwise the manifest resume skips all chunks
+            target = output + f"-{time.perf_counter_ns()}"
+            extract_frames(video_path, target, fmt=fmt, workers=workers)
+
+        results.append(measure(f"extract_frames[{fmt}]", run, frame_count, "frames"))
+
+    # Opening a video that is already in the extraction cache only fingerprints it
+    cache = ExtractionCache(os.path.join(work_dir, "extraction-cache"))
+    cache.extract(video_path, workers=workers)
+    results.append(measure("extraction_cache[reuse]", lambda: cache.extract(video_path, workers=workers),
+                           frame_count, "frames", repeat=3))
+    return results
+
+def bench_prediction(video_path, truth, pairs):
+    source = open_frame_source(video_path)
+    grays = [source.read_gray(i) for i in range(pairs + 1)]
+    pyramids = [build_pyramid(g) for g in grays]
+    start_points = truth[0].reshape(-1, 1, 2).copy()
+    results = [
+        measure("predict_keypoints[frames]",
+                lambda: [predict_keypoints(grays[i], grays[i + 1], start_points) for i in range(pairs)],
+                pairs, "pairs", repeat=3),
+        measure("predict_keypoints[pyramids]",
+                lambda: [predict_keypoints(pyramids[i], pyramids[i + 1], start_points) for i in range(pairs)],
+                pairs, "pairs", repeat=3),
+    ]
+
+    tracked = {}
+
+    def propagate():
+        source.cache.clear()
+        for index, points, status in propagate_keypoints(source, 0, pairs, start_points, min_tracked=1):
+            tracked[index] = (points, status)
+
+    result = measure("propagate_keypoints", propagate, pairs, "frames")
+    errors, _ = tracking_errors(tracked, truth, grays[0].shape)
+    result["mean_error_px"] = float(np.mean(errors)) if len(errors) else None
+    results.append(result)
+    source.close()
+    return results
+
+def tracking_errors(tracked, truth, shape):
+    """
+    Tracking accuracy against the rendered ground truth, for keypoints inside the
+    frame. tracked maps frame index to (points, status); returns (errors in pixels
+    of the tracked points, fraction of the points inside the frame that were lost).
+    """
+    height, width = shape[:2]
+    errors = []
+    inside_count = lost = 0
+    for index, (points, status) in tracked.items():
+        inside = ((truth[index, :, 0] >= 0) & (truth[index, :, 0] < width) &
+                  (truth[index, :, 1] >= 0) & (truth[index, :, 1] < height))
+        ok = inside & (status.reshape(-1) == 1) & ~np.isnan(points.reshape(-1, 2)).any(axis=1)
+        errors.extend(np.linalg.norm(points.reshape(-1, 2)[ok] - truth[index][ok], axis=1))
+        inside_count += int(inside.sum())
+        lost += int((inside & ~ok).sum())
+    return np.array(errors), lost / max(1, inside_count)
+
+def bench_trackers(video_path, truth, pairs, trackers=TRACKER_NAMES):
+    """
+    Compare the tracker backends on the same synthetic sequence: propagation speed,
+    mean and median error against the ground truth, and the fraction of points lost.
+    Frames are decoded up front so only tracking is timed.
+    """
+    source = open_frame_source(video_path)
+    for index in range(pairs + 1):
+        source.read_gray(index)
+    start_points = truth[0].reshape(-1, 1, 2).copy()
+    results = []
+    for name in trackers:
+        tracked = {}
+
+        def propagate():
+            tracked.clear()
+            for index, points, status in propagate_keypoints(source, 0, pairs, start_points,
+                                                             min_tracked=1, tracker=name):
+                tracked[index] = (points, status)
+
+        result = measure(f"tracker[{name}]", propagate, pairs, "frames")
+        errors, lost = tracking_errors(tracked, truth, source.read_gray(0).shape)
+        result["tracked_frames"] = len(tracked)
+        result["mean_error_px"] = float(np.mean(errors)) if len(errors) else None
+        result["median_error_px"] = float(np.median(errors)) if len(errors) else None
+        result["lost_fraction"] = lost
+        results.append(result)
+    source.close()
+    print(f"{'tracker':<12} {'ms/frame':>9} {'mean px':>9} {'median px':>10} {'lost':>6}")
+    for r in results:
+        mean = "-" if r["mean_error_px"] is None else f"{r['mean_error_px']:.2f}"
+        median = "-" if r["median_error_px"] is None else f"{r['median_error_px']:.2f}"
+        print(f"{r['name'][8:-1]:<12} {1000 * r['seconds'] / max(1, pairs):9.1f} {mean:>9} {median:>10} "
+              f"{r['lost_fraction']:6.0%}")
+    return results
+
+def bench_shots(work_dir, frame_count, width, height):
+    # A separate video with two camera cuts, so the main video stays comparable across runs
+    path = os.path.join(work_dir, "synthetic-cuts.mp4")
+    cuts = [frame_count // 3, 2 * frame_count // 3]
+    write_synthetic_video(path, frame_count, width, height, cuts=cuts)
+    source = open_frame_source(path, cache_bytes=0)
+    found = {}
+
+    def run():
+        found.update(analyse_frames(source))
+
+    result = measure("analyse_frames", run, frame_count, "frames")
+    source.close()
+    result["cuts_expected"] = cuts
+    result["cuts_found"] = found["cuts"]
+    result["duplicates"] = len(found["duplicates"])
+    return [result]
+
+def bench_conversion(session, repeat):
+    values = session.values
+    dicts = [frame_to_dict(v) for v in values]
+    points = [annotations_to_points(v) for v in values]
+    status = [(~np.isnan(p[:, 0, 0])).astype(np.uint8).reshape(-1, 1) for p in points]
+    n = len(values)
+    return [
+        measure("convert_annotations_to_array",
+                lambda: [convert_annotations_to_array(d, KEYPOINT_NAMES) for d in dicts], n, "frames", repeat),
+        measure("annotations_to_points",
+                lambda: [annotations_to_points(v) for v in values], n, "frames", repeat),
+        measure("update_annotations_with_pred",
+                lambda: [update_annotations_with_predictions(KEYPOINT_NAMES, p, s) for p, s in zip(points, status)],
+                n, "frames", repeat),
+        measure("predictions_to_annotations",
+                lambda: [predictions_to_annotations(p, s) for p, s in zip(points, status)], n, "frames", repeat),
+    ]
+
+def bench_session_io(session, work_dir):
+    path = os.path.join(work_dir, "session.json")
+    n = len(session)
+    results = [measure("session save_json", lambda: session.save_json(path), n, "frames", repeat=3)]
+    results.append(measure("session load_json", lambda: AnnotationStore.load_json(path), n, "frames", repeat=3))
+    results[-1]["file_mb"] = os.path.getsize(path) / 2**20
+    return results
+
+def bench_geometry(session, repeat):
+    values = session.values
+    return [measure("check_values", lambda: check_values(values), len(values), "frames", repeat)]
+
+def bench_scene(session, width, height, repeat):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6 import QtWidgets
+    except ImportError:
+        print("PyQt6 is not installed; skipping the scene benchmark.")
+        return []
+    from data.keypoints_data import build_keypoint_dict
+    from gui.annotation_scene import AnnotationScene
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    scene = AnnotationScene(build_keypoint_dict())
+    scene.setSceneRect(0, 0, width, height)
+    values = session.values
+
+    def run():
+        for v in values:
+            scene.load_annotations(v)
+        app.processEvents()
+
+    return [measure("scene load_annotations", run, len(values), "frames", repeat)]
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(RESULTS_DIR), check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(results, baseline_path):
+    """
+    Print the time ratio of each stage against an earlier results file.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\nCompared with {os.path.basename(baseline_path)} (ratio < 1 is faster):")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old is None:
+            print(f"{r['name']:<28} (new)")
+            continue
+        ratio = r["seconds"] / old["seconds"] if old["seconds"] > 0 else float("inf")
+        print(f"{r['name']:<28} {old['seconds'] * 1000:10.1f} ms -> {r['seconds'] * 1000:10.1f} ms  x{ratio:.2f}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the annotation tool hot paths.")
+    parser.add_argument("--frames", type=int, default=100, help="Frames in the synthetic video.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--session-frames", type=int, default=5000, help="Frames in the synthetic session.")
+    parser.add_argument("--workers", type=int, help="Extraction worker processes (default: CPU count).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per in-memory stage; the best is kept.")
+    parser.add_argument("--like", help="Video whose resolution the synthetic video takes (overrides --width/--height).")
+    parser.add_argument("--skip", nargs="*", default=[], choices=STAGES)
+    parser.add_argument("--only", nargs="*", choices=STAGES, help="Run only these stages.")
+    parser.add_argument("--trackers", nargs="*", choices=TRACKER_NAMES, default=list(TRACKER_NAMES),
+                        help="Tracker backends compared by the trackers stage.")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>-<commit>.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.like:
+        cap = cv2.VideoCapture(args.like)
+        if not cap.isOpened():
+            print(f"Could not open video: {args.like}", file=sys.stderr)
+            return 1
+        args.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        args.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+    stages = set(args.only) if args.only else set(STAGES) - set(args.skip)
+    print(f"{'stage':<28} {'time':>13} {'throughput':>19} {'peak':>12}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pitch-bench-") as work_dir:
+        video_path = os.path.join(work_dir, "synthetic.mp4")
+        truth = write_synthetic_video(video_path, args.frames, args.width, args.height)
+        session = synthetic_session(args.session_frames, args.width, args.height)
+        if "extract" in stages:
+            results += bench_extraction(video_path, work_dir, args.frames, args.workers)
+        if "predict" in stages:
+            results += bench_prediction(video_path, truth, args.frames - 1)
+        if "trackers" in stages:
+            results += bench_trackers(video_path, truth, args.frames - 1, args.trackers)
+        if "shots" in stages:
+            results += bench_shots(work_dir, args.frames, args.width, args.height)
+        if "convert" in stages:
+            results += bench_conversion(session, args.repeat)
+        if "session" in stages:
+            results += bench_session_io(session, work_dir)
+        if "geometry" in stages:
+            results += bench_geometry(session, args.repeat)
+        if "scene" in stages:
+            results += bench_scene(session, args.width, args.height, args.repeat)
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    maxrss_mb = maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+    commit = git_commit()
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: getattr(args, k) for k in ("frames", "width", "height", "session_frames", "workers", "repeat")},
+        "max_rss_mb": maxrss_mb,
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nPeak RSS {maxrss_mb:.1f} MB. Results written to {output}.")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Synthetic pitch footage and sessions for benchmarks.
+
+Frames are rendered by warping a textured top-down pitch (grass noise plus the
+CONNECTIONS lines and centre circle) with a panning, zooming camera homography,
+so optical flow has realistic texture to track and the true keypoint positions
+of every frame are known.
+"""
+import cv2
+import numpy as np
+from data.keypoints_data import CONNECTIONS, KEYPOINTS_DATA
+from data.annotation_store import NUM_KEYPOINTS, AnnotationStore, empty_frame
+from utils.homography import PITCH_POINTS, project_pitch_points
+
+TEXTURE_SCALE = 10.0  # texture pixels per metre
+TEXTURE_MARGIN = 10.0  # metres of grass around the pitch
+
+def pitch_texture(seed=0):
+    """
+    Render the top-down pitch texture; returns (image, matrix mapping metres to texture pixels).
+    """
+    rng = np.random.default_rng(seed)
+    width = int((105 + 2 * TEXTURE_MARGIN) * TEXTURE_SCALE)
+    height = int((68 + 2 * TEXTURE_MARGIN) * TEXTURE_SCALE)
+    noise = rng.normal(0, 18, (height // 4, width // 4)).astype(np.float32)
+    noise = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[..., 0] = np.clip(40 + noise * 0.5, 0, 255)
+    image[..., 1] = np.clip(120 + noise, 0, 255)
+    image[..., 2] = np.clip(40 + noise * 0.5, 0, 255)
+    # Mowing stripes
+    stripe = ((np.arange(width) / TEXTURE_SCALE + TEXTURE_MARGIN) // 5.25).astype(int) % 2
+    image[:, stripe == 1, 1] = np.clip(image[:, stripe == 1, 1].astype(int) + 15, 0, 255)
+
+    to_texture = np.array([
+        [TEXTURE_SCALE, 0, TEXTURE_MARGIN * TEXTURE_SCALE],
+        [0, TEXTURE_SCALE, TEXTURE_MARGIN * TEXTURE_SCALE],
+        [0, 0, 1],
+    ])
+    by_number = {no: (x, y) for no, x, y, _ in KEYPOINTS_DATA}
+
+    def px(x, y):
+        return (int(round((x + TEXTURE_MARGIN) * TEXTURE_SCALE)), int(round((y + TEXTURE_MARGIN) * TEXTURE_SCALE)))
+
+    for a, b in CONNECTIONS:
+        cv2.line(image, px(*by_number[a]), px(*by_number[b]), (255, 255, 255), 2, cv2.LINE_AA)
+    cv2.circle(image, px(52.5, 34), int(9.15 * TEXTURE_SCALE), (255, 255, 255), 2, cv2.LINE_AA)
+    cv2.circle(image, px(52.5, 34), 3, (255, 255, 255), -1, cv2.LINE_AA)
+    return image, to_texture
+
+def camera_homography(t, width, height):
+    """
+    Homography from pitch metres to image pixels at time t in [0, 1]: a broadcast
+    camera panning from the left half to the right half while slowly zooming.
+    """
+    zoom = 1.0 + 0.3 * np.sin(np.pi * t)
+    half_width = 32.0 / zoom
+    center_x = 30.0 + 45.0 * t
+    # The pitch window [center_x +- half_width] x [0, 68] maps to a trapezoid:
+    # the far touchline is narrower than the near one, as seen from the stands.
+    src = np.float32([
+        [center_x - half_width, 0], [center_x + half_width, 0],
+        [center_x + half_width, 68], [center_x - half_width, 68],
+    ])
+    dst = np.float32([
+        [0.18 * width, 0.12 * height], [0.82 * width, 0.12 * height],
+        [1.1 * width, 0.95 * height], [-0.1 * width, 0.95 * height],
+    ])
+    return cv2.getPerspectiveTransform(src, dst)
+
+def render_frames(frame_count, width, height, seed=0, cuts=()):
+    """
+    Yield (frame, keypoints) for each synthetic frame; keypoints has shape (35, 2).
+    At each frame index in cuts the camera jumps half way across its pan, as at
+    a cut to another broadcast camera.
+    """
+    texture, to_texture = pitch_texture(seed)
+    from_texture = np.linalg.inv(to_texture)
+    for i in range(frame_count):
+        jumps = sum(1 for c in cuts if c <= i)
+        # Reflect rather than wrap, so the camera only jumps at the cuts
+        t = (i / max(1, frame_count - 1) + 0.5 * jumps) % 2.0
+        H = camera_homography(t if t <= 1.0 else 2.0 - t, width, height)
+        frame = cv2.warpPerspective(texture, H @ from_texture, (width, height),
+                                    flags=cv2.INTER_LINEAR, borderValue=(30, 90, 30))
+        yield frame, project_pitch_points(H, PITCH_POINTS)
+
+def write_synthetic_video(path, frame_count, width, height, fps=25.0, seed=0, cuts=()):
+    """
+    Write a synthetic pitch video and return the true keypoints, shape (frames, 35, 2).
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    truth = np.empty((frame_count, NUM_KEYPOINTS, 2), dtype=np.float32)
+    for i, (frame, keypoints) in enumerate(render_frames(frame_count, width, height, seed, cuts)):
+        writer.write(frame)
+        truth[i] = keypoints
+    writer.release()
+    return truth
+
+def synthetic_session(frame_count, width=1920, height=1080, visible_fraction=0.6, seed=0):
+    """
+    Build an AnnotationStore of frame_count frames with random visible keypoints.
+    """
+    rng = np.random.default_rng(seed)
+    store = AnnotationStore(capacity=frame_count)
+    for i in range(frame_count):
+        values = empty_frame()
+        visible = rng.random(NUM_KEYPOINTS) < visible_fraction
+        values[visible, 0] = rng.integers(0, width, np.count_nonzero(visible))
+        values[visible, 1] = rng.integers(0, height, np.count_nonzero(visible))
+        values[visible, 2] = 1
+        store.set(f"image{i + 1:06d}.jpg", values)
+    return store
@@ -0,0 +1,552 @@
+"""
+Headless command-line pipeline: frame extraction, keypoint propagation,
+session validation/export and batch processing. Does not import Qt, so it
+runs on servers without a display.
+
+    python cli.py extract match.mp4 frames/ --stride 2 --format jpg
+    python cli.py extract match.mp4 --proxy-width 1920 --detect-cuts
+    python cli.py cache --max-gb 50
+    python cli.py propagate match.mp4 seed.json session.json --until-cut
+    python cli.py propagate match.mp4 seed.json session.json --tracker lk --tracker-param win_size=31
+    python cli.py interpolate match.mp4 keyframes.json session.json --max-gap 100
+    python cli.py validate session.json --source match.mp4
+    python cli.py check session.json --max-error 8 --report geometry.json
+    python cli.py export session.json out.json
+    python cli.py batch videos/*.mp4 --out-dir extracted/ --seed-dir seeds/
+    python cli.py dataset session.json match.mp4 dataset/ --format yolo --val 0.1
+    python cli.py shard match.mp4 shards/ --shards 4 --overlap 25
+    python cli.py merge shards/match.shards.json merged.json --report conflicts.json
+    python cli.py shots match.mp4 --output shots.json
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from data.annotation_store import CONFIRMED, KEYPOINT_INDEX, VISIBLE, AnnotationStore
+from data.project_store import ProjectSessionView, ProjectStore
+from data.session_shards import DEFAULT_CONFLICT_TOLERANCE, load_shard_sessions, merge_sessions, write_shards
+from utils.dataset_export import EXPORT_FORMATS, PREDICTED_MODES, export_dataset
+from utils.extraction_cache import DEFAULT_CACHE_BYTES, ExtractionCache
+from utils.frame_extractor import extract_frames, extracted_cut_indices
+from utils.frame_source import open_frame_source
+from utils.geometry_check import DEFAULT_MAX_ERROR, check_session, geometry_report, write_report
+from utils.keypoint_predictor import (
+    annotations_to_points, interpolate_keyframes, predictions_to_annotations, propagate_keypoints,
+)
+from utils.shot_detection import DEFAULT_CUT_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD, ShotDetector, analyse_frames
+from utils.trackers import FULL_FRAME, TRACKER_NAMES, get_tracker, parse_tracker_params
+
+def _print_progress(label):
+    def progress(done, total):
+        sys.stderr.write(f"\r{label}: {done}/{total}")
+        if done >= total:
+            sys.stderr.write("\n")
+        sys.stderr.flush()
+    return progress
+
+def propagate_session(source_path, seed, from_frame=None, to_frame=None,
+                      until_cut=False, use_homography=False, tracker=None, progress=None):
+    """
+    Propagate the annotations of one seed frame through a video.
+
+    Args:
+        source_path (str): Video, frame store or frames folder.
+        seed (AnnotationStore): Session holding the seed frame.
+        from_frame (str): Name of the seed frame (default: first frame in seed).
+        to_frame (int): Last frame index to predict (default: last frame).
+        until_cut (bool): Stop at the next shot cut (recorded at extraction, or
+            detected on the way) or once fewer than four points are still tracked.
+        use_homography (bool): Constrain predictions with the pitch homography.
+        tracker: Tracker name or instance (see utils.trackers); None tracks over the whole frame.
+        progress (callable): Called as progress(done, total).
+
+    Returns:
+        AnnotationStore: The seed session with the predicted frames added.
+    """
+    source = open_frame_source(source_path)
+    try:
+        names = [source.frame_name(i) for i in range(len(source))]
+        from_frame = from_frame or seed.frame_names()[0]
+        if from_frame not in names:
+            raise ValueError(f"Seed frame {from_frame} is not a frame of {source_path}")
+        start = names.index(from_frame)
+        end = len(source) - 1 if to_frame is None else min(to_frame, len(source) - 1)
+        total = abs(end - start)
+        start_points = annotations_to_points(seed.get(from_frame))
+        cuts = extracted_cut_indices(source) if until_cut else None
+        shot_detector = ShotDetector() if until_cut and cuts is None else None
+        done = 0
+        for index, points, status in propagate_keypoints(
+            source, start, end, start_points,
+            min_tracked=4 if until_cut else 1, use_homography=use_homography,
+            cuts=cuts, shot_detector=shot_detector, tracker=tracker,
+        ):
+            seed.set(names[index], predictions_to_annotations(points, status))
+            done += 1
+            if progress:
+                progress(done, total)
+        if progress and done < total:
+            progress(total, total)
+    finally:
+        source.close()
+    return seed
+
+def interpolate_session(source_path, session, max_gap=None, use_homography=False, tracker=None, progress=None):
+    """
+    Fill the frames between each pair of consecutive keyframes of a session with
+    predicted points. Keyframes are the frames with confirmed points; confirmed
+    points already on in-between frames are kept.
+
+    Args:
+        source_path (str): Video, frame store or frames folder.
+        session (AnnotationStore): Session holding the keyframes; updated in place.
+        max_gap (int): Skip keyframe pairs more than this many frames apart.
+        use_homography (bool): Constrain predictions with the pitch homography.
+        tracker: Tracker name or instance (see utils.trackers); None tracks over the whole frame.
+        progress (callable): Called as progress(done, total) per keyframe pair.
+
+    Returns:
+        int: Number of frames filled.
+    """
+    source = open_frame_source(source_path)
+    try:
+        index_of = {source.frame_name(i): i for i in range(len(source))}
+        keyframes = sorted(
+            index_of[name] for name, values in session.iter_frames()
+            if name in index_of and (values[:, VISIBLE] == CONFIRMED).any()
+        )
+        pairs = [(a, b) for a, b in zip(keyframes, keyframes[1:])
+                 if b - a >= 2 and (max_gap is None or b - a <= max_gap)]
+        filled = 0
+        for done, (start, end) in enumerate(pairs, 1):
+            values = interpolate_keyframes(
+                source, start, end, session.get(source.frame_name(start)), session.get(source.frame_name(end)),
+                use_homography=use_homography, tracker=tracker,
+            )
+            for index, annotations in enumerate(values, start + 1):
+                name = source.frame_name(index)
+                current = session.get(name)
+                if current is not None:
+                    confirmed = current[:, VISIBLE] == CONFIRMED
+                    annotations[confirmed] = current[confirmed]
+                session.set(name, annotations)
+            filled += len(values)
+            if progress:
+                progress(done, len(pairs))
+    finally:
+        source.close()
+    return filled
+
+def validate_session(session, frame_shape=None):
+    """
+    Check a raw JSON session dict; returns a list of problem descriptions.
+    """
+    problems = []
+    for frame_name, annotations in session.items():
+        if not isinstance(annotations, dict):
+            problems.append(f"{frame_name}: annotations are not an object")
+            continue
+        for name, data in annotations.items():
+            if name not in KEYPOINT_INDEX:
+                problems.append(f"{frame_name}: unknown keypoint {name!r}")
+                continue
+            if data.get("visible") != 1:
+                continue
+            x, y = data.get("x"), data.get("y")
+            if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+                problems.append(f"{frame_name}/{name}: missing or non-numeric coordinates")
+            elif x < 0 or y < 0:
+                problems.append(f"{frame_name}/{name}: negative coordinates ({x}, {y})")
+            elif frame_shape is not None and (x >= frame_shape[1] or y >= frame_shape[0]):
+                problems.append(f"{frame_name}/{name}: ({x}, {y}) outside the {frame_shape[1]}x{frame_shape[0]} frame")
+    return problems
+
+def _extraction_cache(args):
+    return ExtractionCache(args.cache_dir, max_bytes=int(args.max_gb * 2**30))
+
+def cmd_extract(args):
+    options = dict(
+        stride=args.stride, start_time=args.start, end_time=args.end, fmt=args.format, jpeg_quality=args.quality,
+        proxy_width=args.proxy_width, detect_cuts=args.detect_cuts, drop_duplicates=args.drop_duplicates,
+        cut_threshold=args.cut_threshold, duplicate_threshold=args.duplicate_threshold,
+    )
+    if args.output is None:
+        output, manifest, reused = _extraction_cache(args).extract(
+            args.video, workers=args.workers, progress=_print_progress("extract"), **options)
+        if reused:
+            print(f"Reusing the frames of {args.video} extracted earlier into {output}.")
+            return 0
+    else:
+        output = args.output
+        manifest = extract_frames(args.video, output, workers=args.workers, progress=_print_progress("extract"),
+                                  **options)
+    print(f"Extracted {args.video} to {output} ({manifest['params']['format']}).")
+    if "cuts" in manifest:
+        print(f"{len(manifest['cuts'])} shot cuts, {manifest['dropped_frames']} near-duplicate frames skipped.")
+    return 0
+
+def cmd_propagate(args):
+    seed = AnnotationStore.load_json(args.seed)
+    if len(seed) == 0:
+        print("Seed session has no frames.", file=sys.stderr)
+        return 1
+    session = propagate_session(
+        args.source, seed, from_frame=args.from_frame, to_frame=args.to_frame,
+        until_cut=args.until_cut, use_homography=args.homography,
+        tracker=get_tracker(args.tracker, **parse_tracker_params(args.tracker_param)),
+        progress=_print_progress("propagate"),
+    )
+    session.save_json(args.output)
+    print(f"Wrote {len(session)} frames to {args.output}.")
+    return 0
+
+def cmd_interpolate(args):
+    session = AnnotationStore.load_json(args.session)
+    tracker = get_tracker(args.tracker, **parse_tracker_params(args.tracker_param))
+    filled = interpolate_session(args.source, session, max_gap=args.max_gap, use_homography=args.homography,
+                                 tracker=tracker, progress=_print_progress("interpolate"))
+    session.save_json(args.output)
+    print(f"Filled {filled} frames between keyframes; wrote {len(session)} frames to {args.output}.")
+    return 0
+
+def cmd_validate(args):
+    with open(args.session, "r") as f:
+        session = json.load(f)
+    frame_shape = None
+    if args.source:
+        source = open_frame_source(args.source)
+        first = source.read(0)
+        frame_shape = None if first is None else first.shape
+        source.close()
+    problems = validate_session(session, frame_shape)
+    for problem in problems:
+        print(problem)
+    store = AnnotationStore.from_json_dict(session) if not problems else None
+    if store is not None:
+        counts = store.annotated_counts()
+        print(f"{len(store)} frames, {int(counts.sum())} visible keypoints, "
+              f"{int(np.count_nonzero(counts == 0))} frames without visible keypoints.")
+    print(f"{len(problems)} problems found.")
+    return 1 if problems else 0
+
+def cmd_check(args):
+    session = AnnotationStore.load_json(args.session)
+    names, result = check_session(session, args.max_error)
+    report = geometry_report(names, result, args.max_error)
+    for frame in report["frames"][:args.limit]:
+        points = ", ".join(name if error is None else f"{name} ({error:.1f} px)"
+                           for name, error in frame["points"].items())
+        print(f"{frame['frame']}: {', '.join(frame['reasons'])}" + (f" - {points}" if points else ""))
+    summary = report["summary"]
+    if summary["flagged"] > args.limit:
+        print(f"... and {summary['flagged'] - args.limit} more.")
+    print(f"{summary['frames']} frames, {summary['fitted']} with a homography, {summary['flagged']} flagged "
+          f"({summary['reprojection']} reprojection, {summary['mirrored']} mirrored, {summary['order']} order).")
+    if args.report:
+        write_report(args.report, report)
+        print(f"Wrote the report to {args.report}.")
+    return 1 if summary["flagged"] else 0
+
+def cmd_export(args):
+    if args.project:
+        project = ProjectStore(args.project)
+        videos = {os.path.abspath(path): vid for vid, path, _, _ in project.videos()}
+        video_id = videos.get(os.path.abspath(args.session))
+        if video_id is None:
+            print(f"{args.session} is not part of {args.project}.", file=sys.stderr)
+            return 1
+        source = open_frame_source(args.session)
+        session = project.export_json_session(video_id, source.frame_name)
+        source.close()
+        project.close()
+        store = AnnotationStore.from_json_dict(session)
+    else:
+        store = AnnotationStore.load_json(args.session)
+    store.save_json(args.output, indent=None if args.compact else 2)
+    print(f"Exported {len(store)} frames to {args.output}.")
+    return 0
+
+def cmd_dataset(args):
+    project = None
+    if args.project:
+        project = ProjectStore(args.project)
+        videos = {os.path.abspath(path): vid for vid, path, _, _ in project.videos()}
+        video_id = videos.get(os.path.abspath(args.source))
+        if video_id is None:
+            print(f"{args.source} is not part of {args.project}.", file=sys.stderr)
+            project.close()
+            return 1
+        source = open_frame_source(args.source)
+        session = ProjectSessionView(project, video_id, source)
+    else:
+        session = AnnotationStore.load_json(args.session)
+    try:
+        counts = export_dataset(
+            session, args.source, args.output, fmt=args.format, val_fraction=args.val, seed=args.seed,
+            max_width=args.max_width, jpeg_quality=args.quality, workers=args.workers,
+            predicted=args.predicted, progress=_print_progress("dataset"),
+        )
+    finally:
+        if project is not None:
+            source.close()
+            project.close()
+    print(f"Exported {counts['train']} train and {counts['val']} val frames to {args.output} ({args.format}).")
+    return 0
+
+def cmd_cache(args):
+    cache = _extraction_cache(args)
+    if args.clear:
+        removed = cache.evict(max_bytes=0)
+        print(f"Removed {len(removed)} extractions from {cache.root}.")
+    elif args.evict:
+        removed = cache.evict()
+        print(f"Removed {len(removed)} least recently used extractions from {cache.root}.")
+    entries = cache.entries()
+    for folder, entry in reversed(entries):
+        state = "" if entry.get("complete") else "  (incomplete)"
+        print(f"{os.path.basename(folder)}  {entry.get('bytes', 0) / 2**20:9.1f} MB  {entry['video']}{state}")
+    print(f"{len(entries)} extractions, {cache.total_bytes() / 2**30:.2f} GB of {cache.max_bytes / 2**30:.0f} GB "
+          f"in {cache.root}.")
+    return 0
+
+def cmd_shots(args):
+    source = open_frame_source(args.source, cache_bytes=0)
+    try:
+        result = analyse_frames(source, args.cut_threshold, args.duplicate_threshold,
+                                progress=_print_progress("shots"))
+        cut_frames = [source.frame_name(i) for i in result["cuts"]]
+        duplicate_frames = [source.frame_name(i) for i in result["duplicates"]]
+        total = len(source)
+    finally:
+        source.close()
+    for name in cut_frames:
+        print(f"cut before {name}")
+    print(f"{len(cut_frames) + 1} shots, {len(duplicate_frames)} of {total} frames are near-duplicates.")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cut_frames": cut_frames, "duplicate_frames": duplicate_frames}, f, indent=2)
+    return 0
+
+def cmd_shard(args):
+    source = open_frame_source(args.source)
+    names = [source.frame_name(i) for i in range(len(source))]
+    source.close()
+    seed = AnnotationStore.load_json(args.seed) if args.seed else None
+    stem = os.path.splitext(os.path.basename(args.source.rstrip(os.sep)))[0]
+    manifest = write_shards(names, args.out_dir, stem, args.shards, overlap=args.overlap, seed=seed)
+    for shard in manifest["shards"]:
+        print(f"{shard['path']}: frames {shard['start'] + 1}-{shard['end']} "
+              f"({shard['first_frame']} .. {shard['last_frame']})")
+    return 0
+
+def cmd_merge(args):
+    sessions = load_shard_sessions(args.sessions)
+    store, conflicts, problems = merge_sessions(sessions, tolerance=args.tolerance, prefer=args.prefer)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    for c in conflicts[:20]:
+        print(f"conflict {c['frame']}/{c['keypoint']}: " +
+              ", ".join(f"{label} ({x:.0f}, {y:.0f})" for label, (x, y) in c["values"].items()) +
+              f"; kept {c['kept']}")
+    if len(conflicts) > 20:
+        print(f"... {len(conflicts) - 20} more conflicts")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"conflicts": conflicts, "problems": problems}, f, indent=2)
+    store.save_json(args.output)
+    print(f"Merged {len(sessions)} sessions into {len(store)} frames in {args.output}: "
+          f"{len(conflicts)} conflicts, {len(problems)} invalid entries skipped.")
+    return 1 if problems else 0
+
+def process_video(video_path, out_dir, stride=1, fmt="jpg", seed_dir=None, until_cut=False,
+                  tracker=None, tracker_params=None):
+    """
+    Batch job for one video: extract its frames and, if a seed session named
+    after the video exists in seed_dir, propagate it with the named tracker.
+    Runs in a worker process.
+    """
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    output = os.path.join(out_dir, stem)
+    extract_frames(video_path, output, stride=stride, fmt=fmt, workers=1)
+    result = {"video": video_path, "frames": output}
+    seed_path = os.path.join(seed_dir, stem + ".json") if seed_dir else None
+    if seed_path and os.path.exists(seed_path):
+        seed = AnnotationStore.load_json(seed_path)
+        if len(seed):
+            session = propagate_session(output, seed, until_cut=until_cut,
+                                        tracker=get_tracker(tracker, **(tracker_params or {})))
+            session_path = os.path.join(out_dir, stem + ".session.json")
+            session.save_json(session_path)
+            result["session"] = session_path
+    return result
+
+def cmd_batch(args):
+    os.makedirs(args.out_dir, exist_ok=True)
+    tracker_params = parse_tracker_params(args.tracker_param)
+    # Fail on bad tracker settings before any video is processed
+    get_tracker(args.tracker, **tracker_params)
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(process_video, video, args.out_dir, args.stride, args.format,
+                        args.seed_dir, args.until_cut, args.tracker, tracker_params): video
+            for video in args.videos
+        }
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"FAILED {video}: {e}", file=sys.stderr)
+                continue
+            print(f"done {video} -> {result['frames']}" + (f", {result['session']}" if "session" in result else ""))
+    return 1 if failures else 0
+
+def add_tracker_arguments(p):
+    p.add_argument("--tracker", choices=TRACKER_NAMES, default=FULL_FRAME,
+                   help="Tracker backend (compare them with python -m benchmarks.run_benchmarks --only trackers).")
+    p.add_argument("--tracker-param", action="append", metavar="KEY=VALUE",
+                   help="Tracker parameter, e.g. search_radius=96 or win_size=31; repeatable.")
+
+def add_cache_arguments(p):
+    p.add_argument("--cache-dir", help="Extraction cache folder (default: $PITCH_EXTRACTION_CACHE or "
+                                       "~/.cache/pitch-annotation-tool/extractions).")
+    p.add_argument("--max-gb", type=float, default=DEFAULT_CACHE_BYTES / 2**30,
+                   help="Size above which the least recently used extractions are removed.")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless pitch keypoint annotation pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="Extract frames from a video.")
+    p.add_argument("video")
+    p.add_argument("output", nargs="?",
+                   help="Output folder (default: the extraction cache, which reuses earlier extractions).")
+    p.add_argument("--stride", type=int, default=1)
+    p.add_argument("--start", type=float, help="Start time in seconds.")
+    p.add_argument("--end", type=float, help="End time in seconds.")
+    p.add_argument("--format", choices=["jpg", "png", "raw", "store"], default="jpg")
+    p.add_argument("--quality", type=int, default=95, help="JPEG quality.")
+    p.add_argument("--workers", type=int, help="Worker processes (default: CPU count).")
+    p.add_argument("--proxy-width", type=int, help="Also write display proxies at most this wide.")
+    p.add_argument("--detect-cuts", action="store_true", help="Record shot cuts in the manifest.")
+    p.add_argument("--drop-duplicates", action="store_true", help="Skip near-duplicate frames (image formats).")
+    p.add_argument("--cut-threshold", type=float, default=DEFAULT_CUT_THRESHOLD)
+    p.add_argument("--duplicate-threshold", type=float, default=DEFAULT_DUPLICATE_THRESHOLD)
+    add_cache_arguments(p)
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("cache", help="List, trim or clear the extraction cache.")
+    p.add_argument("--evict", action="store_true", help="Remove least recently used extractions above --max-gb.")
+    p.add_argument("--clear", action="store_true", help="Remove every extraction.")
+    add_cache_arguments(p)
+    p.set_defaults(func=cmd_cache)
+
+    p = sub.add_parser("propagate", help="Propagate a seed annotation through a video.")
+    p.add_argument("source", help="Video, frame store or frames folder.")
+    p.add_argument("seed", help="JSON session with the seed frame.")
+    p.add_argument("output", help="JSON session to write.")
+    p.add_argument("--from-frame", help="Seed frame name (default: first frame in the seed).")
+    p.add_argument("--to-frame", type=int, help="Last 0-based frame index to predict.")
+    p.add_argument("--until-cut", action="store_true", help="Stop at the next shot cut or when tracking collapses.")
+    p.add_argument("--homography", action="store_true", help="Constrain predictions with the pitch homography.")
+    add_tracker_arguments(p)
+    p.set_defaults(func=cmd_propagate)
+
+    p = sub.add_parser("interpolate", help="Fill the frames between the keyframes of a session.")
+    p.add_argument("source", help="Video, frame store or frames folder.")
+    p.add_argument("session", help="JSON session with the keyframes (frames with confirmed points).")
+    p.add_argument("output", help="JSON session to write.")
+    p.add_argument("--max-gap", type=int, help="Skip keyframes more than this many frames apart.")
+    p.add_argument("--homography", action="store_true", help="Constrain predictions with the pitch homography.")
+    add_tracker_arguments(p)
+    p.set_defaults(func=cmd_interpolate)
+
+    p = sub.add_parser("validate", help="Validate a JSON session.")
+    p.add_argument("session")
+    p.add_argument("--source", help="Video or frames to check coordinates against.")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("check", help="Flag frames whose keypoints do not fit the pitch geometry.")
+    p.add_argument("session")
+    p.add_argument("--max-error", type=float, default=DEFAULT_MAX_ERROR,
+                   help="Reprojection error in pixels above which a keypoint is flagged.")
+    p.add_argument("--report", help="Write the flagged frames and keypoints to this JSON file.")
+    p.add_argument("--limit", type=int, default=20, help="Flagged frames printed.")
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("export", help="Export a session (or a project video) as JSON.")
+    p.add_argument("session", help="JSON session, or the video path when --project is given.")
+    p.add_argument("output")
+    p.add_argument("--project", help="SQLite project to export from.")
+    p.add_argument("--compact", action="store_true", help="Write JSON without indentation.")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("dataset", help="Export annotated frames as a COCO or YOLO-pose dataset.")
+    p.add_argument("session", help="JSON session (ignored with --project).")
+    p.add_argument("source", help="Video, frame store or frames folder the session annotates.")
+    p.add_argument("output", help="Dataset folder to write.")
+    p.add_argument("--format", choices=EXPORT_FORMATS, default="coco")
+    p.add_argument("--val", type=float, default=0.1, help="Fraction of frames in the validation split.")
+    p.add_argument("--seed", type=int, default=0, help="Changes the train/val assignment.")
+    p.add_argument("--max-width", type=int, help="Downscale images to at most this width.")
+    p.add_argument("--quality", type=int, default=95, help="JPEG quality.")
+    p.add_argument("--workers", type=int, help="Image worker processes (default: CPU count).")
+    p.add_argument("--project", help="SQLite project holding the annotations of source.")
+    p.add_argument("--predicted", choices=PREDICTED_MODES, default="keep",
+                   help="Unconfirmed predicted points: keep them as labels (default), drop them and export only "
+                        "confirmed points, or skip frames that still have any.")
+    p.set_defaults(func=cmd_dataset)
+
+    p = sub.add_parser("shots", help="List the shot cuts and near-duplicate frames of a video.")
+    p.add_argument("source", help="Video, frame store or frames folder.")
+    p.add_argument("--output", help="Write the cut and duplicate frame names to this JSON file.")
+    p.add_argument("--cut-threshold", type=float, default=DEFAULT_CUT_THRESHOLD)
+    p.add_argument("--duplicate-threshold", type=float, default=DEFAULT_DUPLICATE_THRESHOLD)
+    p.set_defaults(func=cmd_shots)
+
+    p = sub.add_parser("shard", help="Split a video into shard sessions for several annotators.")
+    p.add_argument("source", help="Video, frame store or frames folder.")
+    p.add_argument("out_dir", help="Folder receiving the shard sessions and manifest.")
+    p.add_argument("--shards", type=int, required=True)
+    p.add_argument("--overlap", type=int, default=0, help="Frames each shard shares with the next.")
+    p.add_argument("--seed", help="Existing session whose annotations are copied into the shards.")
+    p.set_defaults(func=cmd_shard)
+
+    p = sub.add_parser("merge", help="Merge shard sessions, reporting conflicting keypoints.")
+    p.add_argument("sessions", nargs="+", help="Shard sessions, or a shard manifest standing for all its shards.")
+    p.add_argument("output")
+    p.add_argument("--tolerance", type=float, default=DEFAULT_CONFLICT_TOLERANCE,
+                   help="Pixels within which two positions of a keypoint agree.")
+    p.add_argument("--prefer", choices=["first", "last"], default="first",
+                   help="Which session wins a conflict.")
+    p.add_argument("--report", help="Write conflicts and problems to this JSON file.")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("batch", help="Extract (and propagate) a list of videos in parallel.")
+    p.add_argument("videos", nargs="+")
+    p.add_argument("--out-dir", required=True)
+    p.add_argument("--seed-dir", help="Folder with <video name>.json seed sessions.")
+    p.add_argument("--stride", type=int, default=1)
+    p.add_argument("--format", choices=["jpg", "png", "raw", "store"], default="jpg")
+    p.add_argument("--until-cut", action="store_true")
+    add_tracker_arguments(p)
+    p.add_argument("--workers", type=int, help="Videos processed in parallel (default: CPU count).")
+    p.set_defaults(func=cmd_batch)
+    return parser
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
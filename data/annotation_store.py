@@ -0,0 +1,220 @@
+import json
+from utils.lazy_import import lazy_import
+from data.keypoints_data import KEYPOINTS_DATA
+from utils.instrumentation import span
+
+np = lazy_import("numpy")
+
+# Keypoint names in KEYPOINTS_DATA order; column i of the store is KEYPOINT_NAMES[i]
+KEYPOINT_NAMES = [name for _, _, _, name in KEYPOINTS_DATA]
+KEYPOINT_INDEX = {name: i for i, name in enumerate(KEYPOINT_NAMES)}
+NUM_KEYPOINTS = len(KEYPOINT_NAMES)
+
+# Field indices along the last axis
+X, Y, VISIBLE = 0, 1, 2
+# Values of the VISIBLE field: a point placed or checked by the annotator, and a
+# point filled in automatically that still needs checking. Both count as visible.
+CONFIRMED, PREDICTED = 1, 2
+
+def empty_frame():
+    """
+    Return a (35, 3) float32 array with no visible keypoints (x, y are NaN).
+    """
+    values = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+    values[:, X:VISIBLE] = np.nan
+    return values
+
+def frame_from_dict(annotations):
+    """
+    Convert { keypoint_name: {"visible": 1, "x": int, "y": int} } into a (35, 3) array.
+    Points with "predicted": true are PREDICTED. Unknown keypoint names raise KeyError.
+    """
+    # Filling a flat Python list and converting once is cheaper than a NumPy write per keypoint
+    flat = [np.nan, np.nan, 0.0] * NUM_KEYPOINTS
+    for name, data in annotations.items():
+        i = 3 * KEYPOINT_INDEX[name]
+        if data.get("visible") == 1:
+            flat[i] = data["x"]
+            flat[i + 1] = data["y"]
+            flat[i + 2] = PREDICTED if data.get("predicted") else CONFIRMED
+    return np.array(flat, dtype=np.float32).reshape(NUM_KEYPOINTS, 3)
+
+def frame_to_dict(values):
+    """
+    Convert a (35, 3) array back into the JSON session format (visible points only).
+    Predicted points keep "visible": 1 and add "predicted": true, so readers that
+    do not know about predictions still see them as visible.
+    """
+    annotations = {}
+    for i in np.flatnonzero(values[:, VISIBLE] > 0):
+        annotations[KEYPOINT_NAMES[i]] = {
+            "visible": 1,
+            "x": int(values[i, X]),
+            "y": int(values[i, Y]),
+        }
+        if values[i, VISIBLE] == PREDICTED:
+            annotations[KEYPOINT_NAMES[i]]["predicted"] = True
+    return annotations
+
+class AnnotationStore:
+    """
+    Columnar session annotations: one float32 array of shape (frames, 35, 3)
+    holding (x, y, visible) per keypoint, plus a frame-name -> row index.
+
+    Rows are only allocated for frames that have annotations. Storage grows by
+    doubling, so adding frames is amortised O(1) and 100k frames take ~42 MB.
+    """
+    def __init__(self, capacity=64):
+        # Allocated on first use, so creating an empty session does not import NumPy
+        self._capacity = max(1, capacity)
+        self._data = None
+        self._names = []
+        self._rows = {}
+
+    def _allocate(self):
+        if self._data is None:
+            self._data = np.empty((self._capacity, NUM_KEYPOINTS, 3), dtype=np.float32)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, frame_name):
+        return frame_name in self._rows
+
+    def frame_names(self):
+        return list(self._names)
+
+    @property
+    def values(self):
+        """
+        View of all rows, shape (frames, 35, 3), in frame_names() order.
+        """
+        self._allocate()
+        return self._data[:len(self._names)]
+
+    def row(self, frame_name, create=False):
+        """
+        Return the row index of frame_name, allocating an empty row if create is True.
+        Returns None if the frame has no row and create is False.
+        """
+        row = self._rows.get(frame_name)
+        if row is None and create:
+            self._allocate()
+            row = len(self._names)
+            if row == len(self._data):
+                grown = np.empty((2 * len(self._data), NUM_KEYPOINTS, 3), dtype=np.float32)
+                grown[:row] = self._data[:row]
+                self._data = grown
+            self._data[row] = empty_frame()
+            self._names.append(frame_name)
+            self._rows[frame_name] = row
+        return row
+
+    def get(self, frame_name):
+        """
+        Return a copy of the (35, 3) annotations of frame_name, or None.
+        """
+        row = self._rows.get(frame_name)
+        if row is None:
+            return None
+        return self._data[row].copy()
+
+    def set(self, frame_name, values):
+        """
+        Replace all annotations of frame_name with a (35, 3) array.
+        """
+        # Resolve the row first: allocating it may replace self._data
+        row = self.row(frame_name, create=True)
+        self._data[row] = values
+
+    def set_point(self, frame_name, keypoint, x, y, visible=1):
+        """
+        Set one keypoint (name or column index) of frame_name.
+        """
+        k = keypoint if isinstance(keypoint, (int, np.integer)) else KEYPOINT_INDEX[keypoint]
+        row = self.row(frame_name, create=True)
+        self._data[row, k] = (x, y, visible)
+
+    def iter_frames(self):
+        """
+        Yield (frame_name, values) for every frame; values are read-only views of the rows.
+        """
+        for name in self._names:
+            values = self._data[self._rows[name]]
+            values.flags.writeable = False
+            yield name, values
+
+    def copy(self):
+        """
+        Return an independent copy (used to snapshot the session off the GUI thread).
+        """
+        store = AnnotationStore(capacity=len(self._names))
+        store._allocate()
+        store._data[:len(self._names)] = self.values
+        store._names = list(self._names)
+        store._rows = dict(self._rows)
+        return store
+
+    def clear(self):
+        self._names = []
+        self._rows = {}
+
+    def visible_mask(self):
+        """
+        Boolean array of shape (frames, 35): True where a keypoint is visible.
+        """
+        return self.values[:, :, VISIBLE] > 0
+
+    def predicted_mask(self):
+        """
+        Boolean array of shape (frames, 35): True where a keypoint is predicted, not confirmed.
+        """
+        return self.values[:, :, VISIBLE] == PREDICTED
+
+    def annotated_counts(self):
+        """
+        Number of visible keypoints per frame, shape (frames,).
+        """
+        return np.count_nonzero(self.visible_mask(), axis=1)
+
+    def annotated_counts_by_name(self):
+        """
+        { frame_name: number of visible keypoints } for every frame with a row.
+        """
+        return dict(zip(self._names, self.annotated_counts().tolist()))
+
+    def frames_with(self, keypoint):
+        """
+        Names of frames in which keypoint (name or column index) is visible.
+        """
+        k = keypoint if isinstance(keypoint, (int, np.integer)) else KEYPOINT_INDEX[keypoint]
+        return [self._names[i] for i in np.flatnonzero(self.values[:, k, VISIBLE] > 0)]
+
+    def frames_missing(self, keypoint):
+        """
+        Names of annotated frames in which keypoint (name or column index) is not visible.
+        """
+        k = keypoint if isinstance(keypoint, (int, np.integer)) else KEYPOINT_INDEX[keypoint]
+        return [self._names[i] for i in np.flatnonzero(self.values[:, k, VISIBLE] <= 0)]
+
+    def to_json_dict(self):
+        """
+        Export to the JSON session format: { frame_name: { keypoint_name: {...} } }.
+        """
+        return {name: frame_to_dict(self._data[row]) for name, row in self._rows.items()}
+
+    @classmethod
+    def from_json_dict(cls, session):
+        store = cls(capacity=len(session))
+        for frame_name, annotations in session.items():
+            store.set(frame_name, frame_from_dict(annotations))
+        return store
+
+    def save_json(self, path, indent=2):
+        with span("session.save_json", frames=len(self)), open(path, "w") as f:
+            json.dump(self.to_json_dict(), f, indent=indent)
+
+    @classmethod
+    def load_json(cls, path):
+        with span("session.load_json"), open(path, "r") as f:
+            return cls.from_json_dict(json.load(f))
@@ -1,5 +1,3 @@
-from PyQt6 import QtGui
-
 # (keypoint_no, keypoint_x, keypoint_y, keypoint_name)
 KEYPOINTS_DATA = [
     (1, 0, 0, "far_left_corner"),
@@ -67,6 +65,8 @@ def generate_unique_colors(n):
     Generate n distinct colors by distributing hues around the color wheel.
     Returns a list of QColor objects.
     """
+    # Imported here so the pitch model can be used without Qt (e.g. on batch servers)
+    from PyQt6 import QtGui
     colors = []
     for i in range(n):
         hue = int((i / n) * 360)  # from 0 to 359
@@ -0,0 +1,292 @@
+import os
+import re
+import json
+import sqlite3
+from utils.lazy_import import lazy_import
+from data.annotation_store import CONFIRMED, KEYPOINT_INDEX, PREDICTED, VISIBLE, empty_frame, frame_to_dict
+from utils.instrumentation import span
+
+np = lazy_import("numpy")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    frame_count INTEGER,
+    fps REAL
+);
+CREATE TABLE IF NOT EXISTS annotations (
+    video_id INTEGER NOT NULL REFERENCES videos(id),
+    frame_index INTEGER NOT NULL,
+    keypoint INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    visible INTEGER NOT NULL,
+    PRIMARY KEY (video_id, frame_index, keypoint)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_annotations_keypoint
+    ON annotations (video_id, keypoint, frame_index);
+"""
+
+_FRAME_NUMBER = re.compile(r"(\d+)\D*$")
+
+def frame_index_from_name(frame_name):
+    """
+    Return the 0-based frame index encoded in a session frame name ("image012.jpg" -> 11).
+    """
+    match = _FRAME_NUMBER.search(frame_name)
+    if match is None:
+        raise ValueError(f"No frame number in {frame_name!r}")
+    return int(match.group(1)) - 1
+
+class ProjectStore:
+    """
+    SQLite store for annotations of several videos, keyed by
+    (video, frame index, keypoint number).
+
+    The primary key serves per-frame loads and a secondary index serves
+    per-keypoint queries, so only the frames being viewed need to be read.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add_video(self, video_path, frame_count=None, fps=None):
+        """
+        Register a video (by absolute path) and return its id.
+        """
+        path = os.path.abspath(video_path)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO videos (path, frame_count, fps) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "frame_count = COALESCE(excluded.frame_count, frame_count), "
+                "fps = COALESCE(excluded.fps, fps)",
+                (path, frame_count, fps),
+            )
+        return self.conn.execute("SELECT id FROM videos WHERE path = ?", (path,)).fetchone()[0]
+
+    def videos(self):
+        """
+        Return a list of (id, path, frame_count, fps).
+        """
+        return self.conn.execute("SELECT id, path, frame_count, fps FROM videos ORDER BY id").fetchall()
+
+    def load_frame(self, video_id, frame_index):
+        """
+        Return the (35, 3) annotations of one frame, or None if it has none.
+        """
+        with span("project.load_frame"):
+            rows = self.conn.execute(
+                "SELECT keypoint, x, y, visible FROM annotations WHERE video_id = ? AND frame_index = ?",
+                (video_id, frame_index),
+            ).fetchall()
+        if not rows:
+            return None
+        values = empty_frame()
+        for keypoint, x, y, visible in rows:
+            values[keypoint - 1] = (x, y, visible)
+        return values
+
+    def save_frame(self, video_id, frame_index, values):
+        """
+        Replace the annotations of one frame with a (35, 3) array (visible points are
+        stored, with visible = CONFIRMED or PREDICTED).
+        """
+        visible = np.flatnonzero(values[:, VISIBLE] > 0)
+        rows = [
+            (video_id, frame_index, int(k) + 1, float(values[k, 0]), float(values[k, 1]), int(values[k, VISIBLE]))
+            for k in visible
+        ]
+        with span("project.save_frame"), self.conn:
+            self.conn.execute(
+                "DELETE FROM annotations WHERE video_id = ? AND frame_index = ?",
+                (video_id, frame_index),
+            )
+            self.conn.executemany("INSERT INTO annotations VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def set_point(self, video_id, frame_index, keypoint_no, x, y, visible=1):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO annotations VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, frame_index, keypoint_no, float(x), float(y), int(visible)),
+            )
+
+    def annotated_frames(self, video_id):
+        """
+        Sorted frame indices that have at least one visible keypoint.
+        """
+        rows = self.conn.execute(
+            "SELECT DISTINCT frame_index FROM annotations WHERE video_id = ? AND visible > 0 ORDER BY frame_index",
+            (video_id,),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def annotated_counts(self, video_id):
+        """
+        (frame index, number of visible keypoints) of each annotated frame, in frame order.
+        """
+        return self.conn.execute(
+            "SELECT frame_index, COUNT(*) FROM annotations WHERE video_id = ? AND visible > 0 "
+            "GROUP BY frame_index ORDER BY frame_index",
+            (video_id,),
+        ).fetchall()
+
+    def frames_with(self, video_id, keypoint_no):
+        """
+        Sorted frame indices in which keypoint_no is visible (uses the keypoint index).
+        """
+        rows = self.conn.execute(
+            "SELECT frame_index FROM annotations WHERE video_id = ? AND keypoint = ? AND visible > 0 "
+            "ORDER BY frame_index",
+            (video_id, keypoint_no),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def frames_missing(self, video_id, keypoint_no):
+        """
+        Sorted annotated frame indices in which keypoint_no is not visible.
+        """
+        present = set(self.frames_with(video_id, keypoint_no))
+        return [i for i in self.annotated_frames(video_id) if i not in present]
+
+    def import_json_session(self, video_id, session):
+        """
+        Bulk-import a JSON session ({ frame_name: { keypoint_name: {...} } }, or a
+        path to one) for a video. Returns the number of frames imported.
+        """
+        if isinstance(session, str):
+            with open(session, "r") as f:
+                session = json.load(f)
+        rows = []
+        frames = []
+        for frame_name, annotations in session.items():
+            frame_index = frame_index_from_name(frame_name)
+            frames.append((video_id, frame_index))
+            for name, data in annotations.items():
+                if data.get("visible") == 1:
+                    rows.append((video_id, frame_index, KEYPOINT_INDEX[name] + 1,
+                                 float(data["x"]), float(data["y"]),
+                                 PREDICTED if data.get("predicted") else CONFIRMED))
+        with self.conn:
+            self.conn.executemany("DELETE FROM annotations WHERE video_id = ? AND frame_index = ?", frames)
+            self.conn.executemany("INSERT OR REPLACE INTO annotations VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return len(frames)
+
+    def iter_frames(self, video_id):
+        """
+        Yield (frame_index, values) for each annotated frame of a video in frame
+        order, streaming from SQLite so memory does not grow with the video.
+        """
+        values = None
+        current = None
+        cursor = self.conn.execute(
+            "SELECT frame_index, keypoint, x, y, visible FROM annotations WHERE video_id = ? "
+            "ORDER BY frame_index",
+            (video_id,),
+        )
+        for frame_index, keypoint, x, y, visible in cursor:
+            if frame_index != current:
+                if values is not None:
+                    yield current, values
+                current = frame_index
+                values = empty_frame()
+            values[keypoint - 1] = (x, y, visible)
+        if values is not None:
+            yield current, values
+
+    def export_json_session(self, video_id, frame_name):
+        """
+        Export one video's annotations in the JSON session format, naming frames
+        with frame_name(frame_index).
+        """
+        return {frame_name(index): frame_to_dict(values) for index, values in self.iter_frames(video_id)}
+
+class ProjectSessionView:
+    """
+    The annotations of one video in a ProjectStore, with the frame-name interface
+    AnnotationTool uses for its session. Frames are read from SQLite when first
+    viewed and every change is written through immediately.
+
+    Frames are stored under the video frame number encoded in their name, so a
+    strided extraction and the video itself share annotations.
+    """
+    def __init__(self, project, video_id, frame_source, max_cached=256):
+        self.project = project
+        self.video_id = video_id
+        self.frame_source = frame_source
+        self.max_cached = max_cached
+        self._cache = {}
+        self._names_by_index = None
+
+    def _index(self, frame_name):
+        return frame_index_from_name(frame_name)
+
+    def _name(self, frame_index):
+        if self._names_by_index is None:
+            names = (self.frame_source.frame_name(i) for i in range(len(self.frame_source)))
+            self._names_by_index = {frame_index_from_name(n): n for n in names}
+        return self._names_by_index.get(frame_index)
+
+    def __contains__(self, frame_name):
+        return self.get(frame_name) is not None
+
+    def __len__(self):
+        return len(self.project.annotated_frames(self.video_id))
+
+    def get(self, frame_name):
+        index = self._index(frame_name)
+        if index not in self._cache:
+            if len(self._cache) >= self.max_cached:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[index] = self.project.load_frame(self.video_id, index)
+        values = self._cache[index]
+        return None if values is None else values.copy()
+
+    def set(self, frame_name, values):
+        index = self._index(frame_name)
+        self.project.save_frame(self.video_id, index, values)
+        self._cache[index] = np.array(values, dtype=np.float32)
+
+    def set_point(self, frame_name, keypoint, x, y, visible=1):
+        k = keypoint if isinstance(keypoint, (int, np.integer)) else KEYPOINT_INDEX[keypoint]
+        index = self._index(frame_name)
+        self.project.set_point(self.video_id, index, k + 1, x, y, visible)
+        self._cache.pop(index, None)
+
+    def annotated_counts_by_name(self):
+        """
+        { frame_name: number of visible keypoints } of the annotated frames, from one query.
+        """
+        names = ((self._name(i), count) for i, count in self.project.annotated_counts(self.video_id))
+        return {name: count for name, count in names if name is not None}
+
+    def frames_with(self, keypoint):
+        k = keypoint if isinstance(keypoint, (int, np.integer)) else KEYPOINT_INDEX[keypoint]
+        names = (self._name(i) for i in self.project.frames_with(self.video_id, k + 1))
+        return [n for n in names if n is not None]
+
+    def frames_missing(self, keypoint):
+        k = keypoint if isinstance(keypoint, (int, np.integer)) else KEYPOINT_INDEX[keypoint]
+        names = (self._name(i) for i in self.project.frames_missing(self.video_id, k + 1))
+        return [n for n in names if n is not None]
+
+    def iter_frames(self):
+        for index, values in self.project.iter_frames(self.video_id):
+            name = self._name(index)
+            if name is not None:
+                yield name, values
+
+    def to_json_dict(self):
+        return self.project.export_json_session(
+            self.video_id, lambda i: self._name(i) or f"image{i + 1:03d}.jpg")
+
+    def save_json(self, path, indent=2):
+        with open(path, "w") as f:
+            json.dump(self.to_json_dict(), f, indent=indent)
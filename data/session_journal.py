@@ -0,0 +1,174 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from utils.lazy_import import lazy_import
+from data.annotation_store import AnnotationStore, CONFIRMED, PREDICTED, VISIBLE, empty_frame
+from utils.instrumentation import span
+
+np = lazy_import("numpy")
+
+JOURNAL_SUFFIX = ".journal"
+# Journal being folded into the snapshot by a running compaction
+COMPACTING_SUFFIX = ".journal.compacting"
+DEFAULT_COMPACT_EVERY = 2000
+
+def _apply_record(store, record):
+    frame_name = record["f"]
+    if "k" in record:
+        x, y, visible = record["v"]
+        store.set_point(frame_name, record["k"], x, y, visible)
+    else:
+        values = empty_frame()
+        for k, (x, y) in record["p"].items():
+            values[int(k)] = (x, y, CONFIRMED)
+        for k, (x, y) in record.get("q", {}).items():
+            values[int(k)] = (x, y, PREDICTED)
+        store.set(frame_name, values)
+
+def replay_journal(store, journal_path):
+    """
+    Apply the records of a journal file to store; returns the number applied.
+    A truncated last line (from a crash mid-write) is ignored.
+    """
+    if not os.path.exists(journal_path):
+        return 0
+    count = 0
+    with open(journal_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logging.warning("Skipping unreadable journal record in %s", journal_path)
+                continue
+            _apply_record(store, record)
+            count += 1
+    return count
+
+def recover_session(session_path):
+    """
+    Load the snapshot at session_path (if any) and replay its journals on top.
+
+    Returns:
+        tuple: (AnnotationStore, number of journal records replayed)
+    """
+    if os.path.exists(session_path):
+        store = AnnotationStore.load_json(session_path)
+    else:
+        store = AnnotationStore()
+    # A compaction that did not finish leaves its journal behind; it is older
+    # than the live journal, so it is replayed first.
+    replayed = replay_journal(store, session_path + COMPACTING_SUFFIX)
+    replayed += replay_journal(store, session_path + JOURNAL_SUFFIX)
+    return store, replayed
+
+class SessionJournal:
+    """
+    Append-only log of annotation changes next to a session snapshot.
+
+    Every change is written as one small JSON line, so saving costs O(change).
+    Once compact_every records have accumulated, compact() rotates the journal
+    and rewrites the snapshot from a copy of the store on a background thread;
+    changes made meanwhile go to the fresh journal, and recover_session() replays
+    whatever the snapshot does not contain yet.
+    """
+    def __init__(self, session_path, compact_every=DEFAULT_COMPACT_EVERY):
+        self.session_path = session_path
+        self.journal_path = session_path + JOURNAL_SUFFIX
+        self.compact_every = compact_every
+        self.records = 0
+        self._file = open(self.journal_path, "a")
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._compaction_error = None
+
+    def record_point(self, frame_name, keypoint_index, x, y, visible=1):
+        self._append({"f": frame_name, "k": int(keypoint_index), "v": [float(x), float(y), int(visible)]})
+
+    def record_frame(self, frame_name, values):
+        """
+        Record a whole (35, 3) frame, e.g. a prediction result; only visible points
+        are written, predicted ones under "q".
+        """
+        confirmed = np.flatnonzero(values[:, VISIBLE] == CONFIRMED)
+        record = {"f": frame_name, "p": {str(k): [float(values[k, 0]), float(values[k, 1])] for k in confirmed}}
+        predicted = np.flatnonzero(values[:, VISIBLE] == PREDICTED)
+        if len(predicted):
+            record["q"] = {str(k): [float(values[k, 0]), float(values[k, 1])] for k in predicted}
+        self._append(record)
+
+    def _append(self, record):
+        with span("journal.append"), self._lock:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            # Flush so the record survives the application crashing
+            self._file.flush()
+            self.records += 1
+
+    def needs_compaction(self):
+        return self.records >= self.compact_every and not self.is_compacting()
+
+    def is_compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact(self, store, wait=False):
+        """
+        Write a snapshot of store to the session path in the background and drop
+        the journal records it contains. store must not be modified while this
+        call copies it, so call it from the thread that owns the store.
+        """
+        if self.is_compacting():
+            if not wait:
+                return
+            self._compactor.join()
+        snapshot = store.copy()
+        pending_path = self.session_path + COMPACTING_SUFFIX
+        with self._lock:
+            self._file.close()
+            if os.path.exists(pending_path):
+                # An earlier compaction failed; keep its records ahead of the new ones
+                with open(self.journal_path, "r") as src, open(pending_path, "a") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, pending_path)
+            self._file = open(self.journal_path, "a")
+            self.records = 0
+        self._compaction_error = None
+        self._compactor = threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True)
+        self._compactor.start()
+        if wait:
+            self._compactor.join()
+
+    def _write_snapshot(self, snapshot):
+        tmp_path = self.session_path + ".tmp"
+        try:
+            snapshot.save_json(tmp_path, indent=None)
+            os.replace(tmp_path, self.session_path)
+            os.remove(self.session_path + COMPACTING_SUFFIX)
+        except OSError as e:
+            logging.exception("Session compaction failed; the journal is kept for recovery.")
+            self._compaction_error = e
+
+    def wait_for_compaction(self):
+        """
+        Block until the running compaction (if any) has written the snapshot.
+
+        Raises:
+            OSError: If the last compaction failed to write the snapshot.
+        """
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._compaction_error is not None:
+            raise self._compaction_error
+
+    def close(self, store=None):
+        """
+        Close the journal, compacting first (synchronously) if store is given.
+        """
+        if store is not None:
+            self.compact(store, wait=True)
+        elif self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,209 @@
+"""
+Split a video's frames into shard sessions for several annotators, and merge
+the shard sessions back into one.
+
+A shard is a contiguous range of frame indices with its own JSON session file;
+a manifest next to the shards records the ranges. Merging validates keypoint
+names, takes the union of the visible keypoints of every shard, and reports
+keypoints that overlapping shards placed at different positions.
+"""
+import os
+import json
+from utils.lazy_import import lazy_import
+from data.annotation_store import (
+    KEYPOINT_INDEX, KEYPOINT_NAMES, NUM_KEYPOINTS, VISIBLE, X, Y, AnnotationStore, frame_from_dict, frame_to_dict,
+)
+
+np = lazy_import("numpy")
+
+SHARD_MANIFEST_SUFFIX = ".shards.json"
+DEFAULT_CONFLICT_TOLERANCE = 2.0  # pixels
+
+def plan_shards(frame_count, shard_count, overlap=0):
+    """
+    Split [0, frame_count) into shard_count contiguous (start, end) ranges of
+    nearly equal size; each range is extended by overlap frames into the next one
+    so the annotators' work can be cross-checked where they meet.
+    """
+    if shard_count < 1:
+        raise ValueError("At least one shard is required.")
+    bounds = np.linspace(0, frame_count, min(shard_count, max(1, frame_count)) + 1).round().astype(int)
+    return [(int(s), int(min(frame_count, e + overlap))) for s, e in zip(bounds[:-1], bounds[1:])]
+
+def shard_path(output_dir, stem, number, shard_count):
+    width = len(str(shard_count))
+    return os.path.join(output_dir, f"{stem}.shard{number:0{width}d}of{shard_count}.json")
+
+def write_shards(frame_names, output_dir, stem, shard_count, overlap=0, seed=None):
+    """
+    Write one session file per shard plus a manifest.
+
+    Args:
+        frame_names (list): Frame names of the video, in frame order.
+        output_dir (str): Folder receiving the shard sessions.
+        stem (str): File name prefix, usually the video name.
+        shard_count (int): Number of shards.
+        overlap (int): Frames each shard shares with the next one.
+        seed (AnnotationStore): Existing annotations to copy into the shards.
+
+    Returns:
+        dict: The manifest ({"frame_count", "shards": [{"path", "start", "end", "first_frame", "last_frame"}]}).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards = []
+    ranges = plan_shards(len(frame_names), shard_count, overlap)
+    for number, (start, end) in enumerate(ranges, 1):
+        path = shard_path(output_dir, stem, number, len(ranges))
+        session = {}
+        if seed is not None:
+            for name in frame_names[start:end]:
+                values = seed.get(name)
+                if values is not None:
+                    session[name] = frame_to_dict(values)
+        with open(path, "w") as f:
+            json.dump(session, f, indent=2)
+        shards.append({
+            "path": os.path.basename(path),
+            "start": start,
+            "end": end,
+            "first_frame": frame_names[start] if start < end else None,
+            "last_frame": frame_names[end - 1] if start < end else None,
+        })
+    manifest = {"frame_count": len(frame_names), "overlap": overlap, "shards": shards}
+    with open(os.path.join(output_dir, stem + SHARD_MANIFEST_SUFFIX), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_shard_sessions(paths):
+    """
+    Load session files for merging, as (label, session dict) pairs labelled by file name.
+    A shard manifest among the paths stands for all of its shards; files named
+    more than once (e.g. by a glob and a manifest) are loaded once.
+    """
+    sessions = []
+    seen = set()
+    for path in paths:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if path.endswith(SHARD_MANIFEST_SUFFIX) and isinstance(data.get("shards"), list):
+            folder = os.path.dirname(path)
+            sessions += load_shard_sessions(
+                [os.path.join(folder, s["path"]) for s in data["shards"]
+                 if os.path.abspath(os.path.join(folder, s["path"])) not in seen])
+            seen.update(os.path.abspath(os.path.join(folder, s["path"])) for s in data["shards"])
+            continue
+        if os.path.abspath(path) in seen:
+            continue
+        seen.add(os.path.abspath(path))
+        sessions.append((os.path.basename(path), data))
+    return sessions
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _keypoint_problem(name, data):
+    """
+    Return what is wrong with one keypoint entry of a raw JSON session, or None
+    if frame_from_dict can read it.
+    """
+    if name not in KEYPOINT_INDEX:
+        return f"unknown keypoint {name!r}"
+    if not isinstance(data, dict):
+        return f"keypoint {name!r} is not an object"
+    if not _is_number(data.get("visible")):
+        return f"keypoint {name!r} has a missing or non-numeric visibility"
+    if data["visible"] == 1 and not (_is_number(data.get("x")) and _is_number(data.get("y"))):
+        return f"keypoint {name!r} has missing or non-numeric coordinates"
+    return None
+
+def validate_session_names(session, label=""):
+    """
+    Return a list of problems for keypoint names in a raw JSON session that are
+    not keypoints of the tool (the names of build_keypoint_dict / KEYPOINTS_DATA),
+    and for keypoint entries that are not {"visible", "x", "y"} objects with a
+    numeric "visible" and, for visible points, numeric "x" and "y".
+    """
+    problems = []
+    for frame_name, annotations in session.items():
+        if not isinstance(annotations, dict):
+            problems.append(f"{label}{frame_name}: annotations are not an object")
+            continue
+        for name, data in annotations.items():
+            problem = _keypoint_problem(name, data)
+            if problem is not None:
+                problems.append(f"{label}{frame_name}: {problem}")
+    return problems
+
+def merge_sessions(sessions, tolerance=DEFAULT_CONFLICT_TOLERANCE, prefer="first"):
+    """
+    Merge several sessions into one AnnotationStore.
+
+    Visible keypoints are combined across sessions. A conflict is a keypoint that
+    two sessions marked visible more than `tolerance` pixels apart; the value of
+    the first (or, with prefer="last", the last) session listed wins. Unknown
+    keypoint names and malformed entries are reported and skipped.
+
+    Args:
+        sessions (list): (label, session) pairs, session being a raw JSON dict or a path to one.
+        tolerance (float): Distance in pixels under which two positions agree.
+        prefer (str): "first" or "last".
+
+    Returns:
+        tuple: (store, conflicts, problems). conflicts is a list of
+        {"frame", "keypoint", "kept", "values": {label: [x, y]}}, problems a list of strings.
+    """
+    if prefer not in ("first", "last"):
+        raise ValueError(f"prefer must be 'first' or 'last', not {prefer!r}")
+    ordered = list(sessions) if prefer == "first" else list(reversed(list(sessions)))
+    labels = []
+    parsed = []
+    problems = []
+    for label, session in ordered:
+        if isinstance(session, str):
+            with open(session, "r") as f:
+                session = json.load(f)
+        problems += validate_session_names(session, f"{label}: ")
+        names = [n for n, a in session.items() if isinstance(a, dict)]
+        values = np.empty((len(names), NUM_KEYPOINTS, 3), dtype=np.float32)
+        for i, name in enumerate(names):
+            annotations = session[name]
+            # Invalid entries were reported above; each keypoint is checked so the valid ones still merge
+            values[i] = frame_from_dict({k: v for k, v in annotations.items() if _keypoint_problem(k, v) is None})
+        labels.append(label)
+        parsed.append((names, values))
+
+    # Merge whole sessions at once: rows of the merged array are the sorted union of frame names
+    all_names = sorted(set().union(*(names for names, _ in parsed)))
+    row_of = {name: i for i, name in enumerate(all_names)}
+    merged = np.zeros((len(all_names), NUM_KEYPOINTS, 3), dtype=np.float32)
+    merged[:, :, X:VISIBLE] = np.nan
+    owner = np.full((len(all_names), NUM_KEYPOINTS), -1, dtype=np.int16)  # session each keypoint came from
+    conflicts = []
+    for number, (names, values) in enumerate(parsed):
+        rows = np.array([row_of[n] for n in names], dtype=np.int64)
+        current = merged[rows]
+        old_visible = current[:, :, VISIBLE] > 0
+        new_visible = values[:, :, VISIBLE] > 0
+        distance = np.hypot(values[:, :, X] - current[:, :, X], values[:, :, Y] - current[:, :, Y])
+        for i, k in zip(*np.nonzero(old_visible & new_visible & (distance > tolerance))):
+            kept = labels[owner[rows[i], k]]
+            conflicts.append({
+                "frame": names[i],
+                "keypoint": KEYPOINT_NAMES[k],
+                "kept": kept,
+                "values": {
+                    kept: [float(current[i, k, X]), float(current[i, k, Y])],
+                    labels[number]: [float(values[i, k, X]), float(values[i, k, Y])],
+                },
+            })
+        added = new_visible & ~old_visible
+        current[added] = values[added]
+        merged[rows] = current
+        owner_rows = owner[rows]
+        owner_rows[added] = number
+        owner[rows] = owner_rows
+
+    store = AnnotationStore(capacity=len(all_names))
+    for name, values in zip(all_names, merged):
+        store.set(name, values)
+    return store, conflicts, problems
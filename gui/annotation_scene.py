@@ -1,66 +1,221 @@
 from PyQt6 import QtWidgets, QtGui, QtCore
+from data.annotation_store import CONFIRMED, PREDICTED, VISIBLE, empty_frame
+from utils.lazy_import import lazy_import
+from .frame_image import frame_to_qimage
+
+np = lazy_import("numpy")
+
+MARKER_RADIUS = 5
+TILE_SIZE = 512  # full-resolution tile edge, frame pixels
 
 class AnnotationScene(QtWidgets.QGraphicsScene):
+    """
+    Scene showing the current frame and its keypoint markers.
+
+    The frame pixmap item and one marker item per keypoint are created once and
+    reused: changing frames only swaps the pixmap and repositions, shows or
+    hides the markers whose annotations changed, so no Qt items are allocated.
+    Confirmed points are drawn as filled dots, predicted ones as rings.
+
+    Scene coordinates are always full-resolution frame pixels. The frame may be
+    shown as a downscaled proxy pixmap, scaled up to the frame size, with
+    full-resolution tiles laid over the region being inspected when zoomed in.
+
+    The optional pitch overlay draws the pitch lines projected through a
+    homography fitted to the visible annotations, as one path item that is
+    rebuilt only when a point changes.
+    """
+    # Emitted when the user places a keypoint: (keypoint index, x, y)
+    annotation_changed = QtCore.pyqtSignal(int, float, float)
+
     def __init__(self, keypoints_dict, parent=None):
         super().__init__(parent)
         self.keypoints_dict = keypoints_dict  # name -> { "color": QColor, ... }
+        # Column order of the annotation arrays (KEYPOINTS_DATA order)
+        self.keypoint_names = list(keypoints_dict)
+        self.keypoint_index = {name: i for i, name in enumerate(self.keypoint_names)}
         self.active_keypoint = None
-        self.annotations = {}
-        # Track drawn ellipse items per keypoint to avoid duplicates
-        self.annotation_items = {}
+        # (35, 3) array of (x, y, visible) for the current frame, created on first use
+        self._annotations = None
+
+        self.pixmap_item = QtWidgets.QGraphicsPixmapItem()
+        self.pixmap_item.setZValue(-1)
+        self.pixmap_item.setTransformationMode(QtCore.Qt.TransformationMode.SmoothTransformation)
+        self.addItem(self.pixmap_item)
+        # Full-resolution tiles shown for the current frame, keyed by (column, row),
+        # and hidden tile items kept for reuse
+        self._tiles = {}
+        self._tile_pool = []
+        # One marker per keypoint, centred on its item position, with the
+        # (pen, brush) of each VISIBLE state
+        self.marker_items = []
+        self._marker_styles = []
+        no_pen = QtGui.QPen(QtCore.Qt.PenStyle.NoPen)
+        no_brush = QtGui.QBrush(QtCore.Qt.BrushStyle.NoBrush)
+        for name in self.keypoint_names:
+            color = self.keypoints_dict[name]["color"]
+            ring = QtGui.QPen(color, 2)
+            ring.setCosmetic(True)
+            self._marker_styles.append({CONFIRMED: (no_pen, QtGui.QBrush(color)), PREDICTED: (ring, no_brush)})
+            item = QtWidgets.QGraphicsEllipseItem(
+                -MARKER_RADIUS, -MARKER_RADIUS, MARKER_RADIUS * 2, MARKER_RADIUS * 2)
+            item.setPen(no_pen)
+            item.setBrush(QtGui.QBrush(color))
+            item.setZValue(1)
+            item.setVisible(False)
+            self.addItem(item)
+            self.marker_items.append(item)
+
+        self.show_pitch_overlay = False
+        self.pitch_overlay_item = QtWidgets.QGraphicsPathItem()
+        pen = QtGui.QPen(QtGui.QColor(255, 235, 59, 200), 1.5)
+        pen.setCosmetic(True)  # constant width in view pixels at any zoom
+        self.pitch_overlay_item.setPen(pen)
+        self.pitch_overlay_item.setZValue(0.5)
+        self.pitch_overlay_item.setVisible(False)
+        self.addItem(self.pitch_overlay_item)
+        self._overlay_dirty = True
+
+    @property
+    def annotations(self):
+        if self._annotations is None:
+            self._annotations = empty_frame()
+        return self._annotations
+
+    @annotations.setter
+    def annotations(self, values):
+        self._annotations = values
+
+    def set_frame_pixmap(self, pixmap, frame_size=None):
+        """
+        Show pixmap as the current frame, keeping the existing markers. If the
+        pixmap is a proxy, frame_size is the (width, height) of the full frame.
+        """
+        self.clear_tiles()
+        width, height = frame_size or (pixmap.width(), pixmap.height())
+        self.pixmap_item.setPixmap(pixmap)
+        self.pixmap_item.setTransform(QtGui.QTransform.fromScale(
+            width / max(1, pixmap.width()), height / max(1, pixmap.height())))
+        if self.sceneRect() != QtCore.QRectF(0, 0, width, height):
+            self.setSceneRect(0, 0, width, height)
+
+    def proxy_scale(self):
+        """
+        Frame pixels per pixel of the displayed pixmap (1.0 at full resolution).
+        """
+        return self.pixmap_item.transform().m11()
+
+    def show_tiles(self, frame, rect):
+        """
+        Cover rect (scene coordinates) with full-resolution tiles cut from frame.
+        Tiles already shown for the current frame are kept.
+        """
+        height, width = frame.shape[:2]
+        left = max(0, int(rect.left()) // TILE_SIZE)
+        top = max(0, int(rect.top()) // TILE_SIZE)
+        right = min((width - 1) // TILE_SIZE, int(rect.right()) // TILE_SIZE)
+        bottom = min((height - 1) // TILE_SIZE, int(rect.bottom()) // TILE_SIZE)
+        for row in range(top, bottom + 1):
+            for column in range(left, right + 1):
+                if (column, row) in self._tiles:
+                    continue
+                if self._tile_pool:
+                    item = self._tile_pool.pop()
+                else:
+                    item = QtWidgets.QGraphicsPixmapItem()
+                    item.setZValue(-0.5)
+                    self.addItem(item)
+                x, y = column * TILE_SIZE, row * TILE_SIZE
+                tile = np.ascontiguousarray(frame[y:y + TILE_SIZE, x:x + TILE_SIZE])
+                item.setPixmap(QtGui.QPixmap.fromImage(frame_to_qimage(tile)))
+                item.setPos(x, y)
+                item.setVisible(True)
+                self._tiles[(column, row)] = item
+
+    def clear_tiles(self):
+        for item in self._tiles.values():
+            item.setVisible(False)
+            item.setPixmap(QtGui.QPixmap())
+            self._tile_pool.append(item)
+        self._tiles = {}
 
     def clear_annotations(self):
-        self.clear()
-        self.annotations = {}
-        self.annotation_items = {}
+        self.load_annotations(empty_frame())
 
     def mousePressEvent(self, event):
         if self.active_keypoint is None:
             return
         pos = event.scenePos()
-        
-        self.annotations[self.active_keypoint] = {
-            "visible": 1,
-            "x": int(pos.x()),
-            "y": int(pos.y())
-        }
-        
-        # Remove previous marker for this keypoint, if any
-        if self.active_keypoint in self.annotation_items:
-            self.removeItem(self.annotation_items[self.active_keypoint])
-
-        color = self.keypoints_dict[self.active_keypoint]["color"]
-        brush = QtGui.QBrush(color)
-        radius = 5
-        ellipse = self.addEllipse(
-            pos.x()-radius, pos.y()-radius, radius*2, radius*2,
-            QtGui.QPen(QtCore.Qt.PenStyle.NoPen), brush
-        )
-        self.annotation_items[self.active_keypoint] = ellipse
+
+        k = self.keypoint_index[self.active_keypoint]
+        self.annotations[k] = (int(pos.x()), int(pos.y()), CONFIRMED)
+        self.update_markers([k])
+        self._overlay_dirty = True
+        self.update_pitch_overlay()
+        self.annotation_changed.emit(k, float(self.annotations[k, 0]), float(self.annotations[k, 1]))
         super().mousePressEvent(event)
 
     def set_active_keypoint(self, keypoint_name):
         self.active_keypoint = keypoint_name
 
+    def update_markers(self, indices):
+        """
+        Reposition, restyle, show or hide the markers of the given keypoint indices
+        to match self.annotations.
+        """
+        for k in indices:
+            x, y, visible = self.annotations[k]
+            item = self.marker_items[k]
+            if visible > 0:
+                pen, brush = self._marker_styles[k].get(int(visible), self._marker_styles[k][CONFIRMED])
+                item.setPen(pen)
+                item.setBrush(brush)
+                item.setPos(float(x), float(y))
+                item.setVisible(True)
+            else:
+                item.setVisible(False)
+
     def load_annotations(self, annotations):
-        # Clear existing markers only (keep background)
-        for item in self.annotation_items.values():
-            self.removeItem(item)
-        self.annotation_items = {}
-
-        # Redraw markers from provided annotations
-        for kp_name, data in annotations.items():
-            if data.get("visible"):
-                color = self.keypoints_dict[kp_name]["color"]
-                brush = QtGui.QBrush(color)
-                radius = 5
-                ellipse = self.addEllipse(
-                    data["x"]-radius, data["y"]-radius, radius*2, radius*2,
-                    QtGui.QPen(QtCore.Qt.PenStyle.NoPen), brush
-                )
-                self.annotation_items[kp_name] = ellipse
-        # Replace annotations dict
-        self.annotations = dict(annotations)
+        """
+        Show a (35, 3) annotation array, updating only the markers that changed.
+        """
+        new_visible = annotations[:, VISIBLE] > 0
+        moved = (annotations[:, :VISIBLE] != self.annotations[:, :VISIBLE]).any(axis=1)
+        # Comparing the VISIBLE values also catches predicted points being confirmed
+        changed = (annotations[:, VISIBLE] != self.annotations[:, VISIBLE]) | (new_visible & moved)
+        self.annotations = np.array(annotations, dtype=np.float32)
+        self.update_markers(np.flatnonzero(changed))
+        if changed.any():
+            self._overlay_dirty = True
+            self.update_pitch_overlay()
+
+    def set_pitch_overlay(self, enabled):
+        self.show_pitch_overlay = enabled
+        self.update_pitch_overlay()
+
+    def update_pitch_overlay(self):
+        """
+        Rebuild the projected pitch-line path if the points changed since the last build.
+        """
+        if not self.show_pitch_overlay:
+            self.pitch_overlay_item.setVisible(False)
+            return
+        if self._overlay_dirty:
+            # Imported here: the homography helpers load OpenCV
+            from utils.homography import fit_pitch_homography, project_pitch_lines
+            self._overlay_dirty = False
+            valid = self.annotations[:, VISIBLE] > 0
+            H, _ = fit_pitch_homography(self.annotations[:, :VISIBLE], valid)
+            path = QtGui.QPainterPath()
+            if H is not None:
+                for (x0, y0), (x1, y1) in project_pitch_lines(H).tolist():
+                    path.moveTo(x0, y0)
+                    path.lineTo(x1, y1)
+            self.pitch_overlay_item.setPath(path)
+        self.pitch_overlay_item.setVisible(not self.pitch_overlay_item.path().isEmpty())
 
     def get_annotations(self):
-        return self.annotations
+        return self.annotations.copy()
+
+    def has_annotations(self):
+        return bool((self.annotations[:, VISIBLE] > 0).any())
@@ -1,18 +1,52 @@
 import os
-import json
+import time
 from PyQt6 import QtWidgets, QtGui, QtCore
 from .annotation_scene import AnnotationScene
 from .pitch_reference import PitchReference
-from utils.frame_extractor import extract_frames
+from .frame_prefetcher import DEFAULT_PREFETCH_RADIUS, FramePrefetcher
+from .frame_view import FrameView
+from .job_list import JobList
+from .job_scheduler import PRIORITY_HIGH, PRIORITY_LOW, JobScheduler
+from .timeline import Timeline
+from utils.extraction_cache import ExtractionCache, cached_video_path
+from utils.frame_source import DEFAULT_CACHE_BYTES, DEFAULT_PROXY_WIDTH, open_frame_source
+from utils.instrumentation import RECORDER, span, timed
+from utils.lazy_import import lazy_import
+from utils.trackers import FULL_FRAME, TRACKERS
 from data.keypoints_data import build_keypoint_dict
-from utils.keypoint_predictor import (
-    convert_annotations_to_array,
-    predict_keypoints,
-    update_annotations_with_predictions,
+from data.annotation_store import CONFIRMED, PREDICTED, VISIBLE, AnnotationStore
+from data.session_journal import SessionJournal, recover_session
+from data.project_store import ProjectSessionView, ProjectStore
+from data.session_shards import load_shard_sessions, merge_sessions
+
+# NumPy and OpenCV load on first use, and the modules built on OpenCV (prediction,
+# propagation, extraction, shot detection, geometry checks) are imported in the
+# methods that need them, so the window opens without loading either
+np = lazy_import("numpy")
+
+# (span name, overlay label) pairs shown by the timing overlay
+OVERLAY_SPANS = (
+    ("gui.load_frame", "load"),
+    ("frame_source.decode", "decode"),
+    ("gui.predict_next_frame", "predict"),
+    ("gui.save_current_annotations", "save"),
 )
 
+# Job groups: jobs reading the current frame source are cancelled when another
+# video is opened; session writes are left to finish when the window closes
+FRAME_JOBS = "frames"
+SESSION_JOBS = "session"
+
+# Full-resolution tiles replace the proxy once one proxy pixel covers more view pixels than this
+TILE_ZOOM_THRESHOLD = 1.25
+
+# QSettings location of the last opened video, session and project
+SETTINGS_ORGANIZATION = "pitch-annotation-tool"
+SETTINGS_APPLICATION = "annotation-tool"
+
 class AnnotationTool(QtWidgets.QMainWindow):
-    def __init__(self):
+    def __init__(self, frame_cache_bytes=DEFAULT_CACHE_BYTES, prefetch_radius=DEFAULT_PREFETCH_RADIUS,
+                 proxy_width=DEFAULT_PROXY_WIDTH):
         super().__init__()
         self.setWindowTitle("Pitch Keypoint Annotation Tool")
         self.resize(1300, 900)
@@ -21,10 +55,40 @@ class AnnotationTool(QtWidgets.QMainWindow):
         
         # Build keypoint dictionary.
         self.keypoints_dict = build_keypoint_dict()
-        self.session_annotations = {}
+        # Columnar (frames x 35 x (x, y, visible)) session; JSON is the import/export format.
+        self.session_annotations = AnnotationStore()
+        # Every change is appended to a journal next to the session file, which
+        # is replayed when the session is reopened after a crash.
+        self.session_path = None
+        self.journal = None
+        # Optional multi-video SQLite project; when open it replaces the JSON session.
+        self.project = None
         self.current_frame_index = 0
-        self.frames = []
+        # Frames are decoded on demand; the cache budget bounds decoded-frame memory.
+        self.frame_cache_bytes = frame_cache_bytes
+        self.frame_source = None
+        # Neighbouring frames are decoded ahead of navigation on worker threads.
+        self.prefetch_radius = prefetch_radius
+        self.prefetcher = None
+        # Frames wider than this are displayed from downscaled proxies (None: always full resolution)
+        self.proxy_width = proxy_width
+        # Loading, saving, prediction and extraction run as background jobs
+        self.scheduler = JobScheduler(parent=self)
+        self.propagation_worker = None
+        self.prediction_job = None
+        # Frames marked for keyframe interpolation (the two most recent are used)
+        self.keyframes = []
+        # When enabled, predictions are constrained by a homography to the pitch model.
+        self.use_homography = False
+        # Tracker backend used by prediction, propagation and interpolation (see utils.trackers)
+        self.tracker_name = FULL_FRAME
+        # Last geometry check: the session it checked, its report and the flagged frame names
+        self.geometry_session = None
+        self.last_geometry_report = None
+        self.geometry_flags = {}
         self.shortcut_buffer = ""  # Buffer to store typed digits.
+        # Remembers the last video, session and project for Reopen Last
+        self.settings = QtCore.QSettings(SETTINGS_ORGANIZATION, SETTINGS_APPLICATION)
         
         self.create_widgets()
         self.create_menus()
@@ -53,10 +117,12 @@ class AnnotationTool(QtWidgets.QMainWindow):
         self.frame_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
         
         # GraphicsView for annotation.
-        self.graphics_view = QtWidgets.QGraphicsView()
+        self.graphics_view = FrameView()
+        self.graphics_view.viewport_changed.connect(self.update_full_resolution_tiles)
         # Ensure the QGraphicsView does not capture key events.
         self.graphics_view.setFocusPolicy(QtCore.Qt.FocusPolicy.NoFocus)
         self.scene = AnnotationScene(self.keypoints_dict, parent=self)
+        self.scene.annotation_changed.connect(self.on_annotation_changed)
         self.graphics_view.setScene(self.scene)
         self.graphics_view.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
         self.graphics_view.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
@@ -66,21 +132,50 @@ class AnnotationTool(QtWidgets.QMainWindow):
         top_label_layout.addWidget(self.frame_label, stretch=1)
         top_label_layout.addWidget(self.shortcut_label, stretch=2)
         
-        # Vertical layout: labels on top, then the graphics view.
+        # Filmstrip and completeness heatmap; click to jump to a frame
+        self.timeline = Timeline()
+        self.timeline.frame_selected.connect(self.jump_to_frame)
+        self.timeline.set_session(self.session_annotations)
+
+        # Vertical layout: labels on top, then the graphics view and the timeline.
         self.central_frame_layout = QtWidgets.QVBoxLayout()
         self.central_frame_layout.addLayout(top_label_layout)
         self.central_frame_layout.addWidget(self.graphics_view)
+        self.central_frame_layout.addWidget(self.timeline)
         
-        # Right panel: pitch reference.
-        self.pitch_reference = PitchReference(self.keypoints_dict, parent=self)
+        # Right panel: pitch reference. Drawing it is the slowest part of building
+        # the window, so a placeholder holds its place until the window is shown.
+        self.pitch_reference = None
+        self.pitch_placeholder = QtWidgets.QWidget()
         
         # Main horizontal layout.
         central_widget = QtWidgets.QWidget()
-        h_layout = QtWidgets.QHBoxLayout(central_widget)
-        h_layout.addLayout(self.central_frame_layout, stretch=4)
-        h_layout.addWidget(self.pitch_reference, stretch=2)
+        self.main_layout = QtWidgets.QHBoxLayout(central_widget)
+        self.main_layout.addLayout(self.central_frame_layout, stretch=4)
+        self.main_layout.addWidget(self.pitch_placeholder, stretch=2)
         
         self.setCentralWidget(central_widget)
+        QtCore.QTimer.singleShot(0, self.create_pitch_reference)
+
+        # Timing overlay: last / p95 latency of the hot paths, refreshed while shown
+        self.timing_label = QtWidgets.QLabel()
+        self.timing_label.setFont(font)
+        self.timing_label.hide()
+        self.statusBar().addPermanentWidget(self.timing_label)
+        self.timing_timer = QtCore.QTimer(self)
+        self.timing_timer.setInterval(500)
+        self.timing_timer.timeout.connect(self.update_timing_overlay)
+
+        # Job list dock and a count of the active jobs in the status bar
+        self.job_list = JobList(self.scheduler)
+        self.job_dock = QtWidgets.QDockWidget("Jobs", self)
+        self.job_dock.setWidget(self.job_list)
+        self.addDockWidget(QtCore.Qt.DockWidgetArea.BottomDockWidgetArea, self.job_dock)
+        self.job_dock.hide()
+        self.jobs_label = QtWidgets.QLabel()
+        self.jobs_label.setFont(font)
+        self.statusBar().addPermanentWidget(self.jobs_label)
+        self.scheduler.jobs_changed.connect(self.update_jobs_label)
 
     def create_menus(self):
         menu = self.menuBar()
@@ -93,11 +188,49 @@ class AnnotationTool(QtWidgets.QMainWindow):
         save_session_action = QtGui.QAction("Save Session", self)
         save_session_action.triggered.connect(self.save_session)
         session_menu.addAction(save_session_action)
+
+        save_session_as_action = QtGui.QAction("Save Session As...", self)
+        save_session_as_action.triggered.connect(self.save_session_as)
+        session_menu.addAction(save_session_as_action)
+
+        merge_sessions_action = QtGui.QAction("Merge Sessions...", self)
+        merge_sessions_action.triggered.connect(self.merge_sessions_into_current)
+        session_menu.addAction(merge_sessions_action)
+
+        session_menu.addSeparator()
+        reopen_action = QtGui.QAction("Reopen Last Video and Session", self)
+        reopen_action.triggered.connect(self.reopen_last)
+        session_menu.addAction(reopen_action)
         
+        project_menu = menu.addMenu("Project")
+        open_project_action = QtGui.QAction("Open Project...", self)
+        open_project_action.triggered.connect(self.open_project)
+        project_menu.addAction(open_project_action)
+
+        import_project_action = QtGui.QAction("Import JSON Session into Project...", self)
+        import_project_action.triggered.connect(self.import_session_into_project)
+        project_menu.addAction(import_project_action)
+
+        close_project_action = QtGui.QAction("Close Project", self)
+        close_project_action.triggered.connect(self.close_project)
+        project_menu.addAction(close_project_action)
+
         video_menu = menu.addMenu("Video")
         load_video_action = QtGui.QAction("Load Video", self)
         load_video_action.triggered.connect(self.load_video)
         video_menu.addAction(load_video_action)
+
+        open_folder_action = QtGui.QAction("Open Frames Folder", self)
+        open_folder_action.triggered.connect(self.open_frames_folder)
+        video_menu.addAction(open_folder_action)
+
+        extract_action = QtGui.QAction("Extract Frames...", self)
+        extract_action.triggered.connect(self.extract_video_frames)
+        video_menu.addAction(extract_action)
+
+        extract_to_action = QtGui.QAction("Extract Frames to Folder...", self)
+        extract_to_action.triggered.connect(lambda: self.extract_video_frames(choose_folder=True))
+        video_menu.addAction(extract_to_action)
         
         nav_menu = menu.addMenu("Navigation")
         prev_frame_action = QtGui.QAction("Previous Frame", self)
@@ -108,16 +241,127 @@ class AnnotationTool(QtWidgets.QMainWindow):
         next_frame_action.triggered.connect(self.next_frame)
         nav_menu.addAction(next_frame_action)
 
+        next_missing_action = QtGui.QAction("Next Frame Missing Active Keypoint", self)
+        next_missing_action.triggered.connect(self.next_frame_missing_keypoint)
+        nav_menu.addAction(next_missing_action)
+
+        next_flagged_action = QtGui.QAction("Next Flagged Frame", self)
+        next_flagged_action.triggered.connect(self.next_flagged_frame)
+        nav_menu.addAction(next_flagged_action)
+
+        timeline_action = QtGui.QAction("Show Timeline", self)
+        timeline_action.setCheckable(True)
+        timeline_action.setChecked(True)
+        timeline_action.toggled.connect(self.timeline.setVisible)
+        nav_menu.addAction(timeline_action)
+
+        nav_stats_action = QtGui.QAction("Show Navigation Latency", self)
+        nav_stats_action.triggered.connect(self.show_navigation_stats)
+        nav_menu.addAction(nav_stats_action)
+
+        nav_menu.addSeparator()
+        timing_action = QtGui.QAction("Show Timing Overlay", self)
+        timing_action.setCheckable(True)
+        timing_action.setChecked(RECORDER.enabled)
+        timing_action.toggled.connect(self.set_timing_overlay)
+        nav_menu.addAction(timing_action)
+
+        export_trace_action = QtGui.QAction("Export Timing Trace...", self)
+        export_trace_action.triggered.connect(self.export_timing_trace)
+        nav_menu.addAction(export_trace_action)
+
         tools_menu = menu.addMenu("Tools")
         predict_action = QtGui.QAction("Predict Next Frame Keypoints", self)
         predict_action.triggered.connect(self.predict_next_frame_keypoints)
         tools_menu.addAction(predict_action)
+
+        propagate_to_action = QtGui.QAction("Propagate to Frame...", self)
+        propagate_to_action.triggered.connect(self.propagate_to_frame)
+        tools_menu.addAction(propagate_to_action)
+
+        propagate_cut_action = QtGui.QAction("Propagate Until Cut", self)
+        propagate_cut_action.triggered.connect(self.propagate_until_cut)
+        tools_menu.addAction(propagate_cut_action)
+
+        tools_menu.addSeparator()
+        mark_keyframe_action = QtGui.QAction("Mark Keyframe", self)
+        mark_keyframe_action.triggered.connect(self.mark_keyframe)
+        tools_menu.addAction(mark_keyframe_action)
+
+        interpolate_action = QtGui.QAction("Interpolate Between Keyframes", self)
+        interpolate_action.triggered.connect(self.interpolate_between_keyframes)
+        tools_menu.addAction(interpolate_action)
+
+        confirm_action = QtGui.QAction("Confirm Predicted Points", self)
+        confirm_action.triggered.connect(self.confirm_predicted_points)
+        tools_menu.addAction(confirm_action)
+
+        tools_menu.addSeparator()
+        check_geometry_action = QtGui.QAction("Check Geometry", self)
+        check_geometry_action.triggered.connect(lambda: self.check_geometry())
+        tools_menu.addAction(check_geometry_action)
+
+        geometry_report_action = QtGui.QAction("Save Geometry Report...", self)
+        geometry_report_action.triggered.connect(self.save_geometry_report)
+        tools_menu.addAction(geometry_report_action)
+
+        tools_menu.addSeparator()
+        tracker_menu = tools_menu.addMenu("Tracker")
+        tracker_group = QtGui.QActionGroup(self)
+        labels = [(FULL_FRAME, "Lucas-Kanade (Full Frame)")] + [(name, cls.label) for name, cls in TRACKERS.items()]
+        for name, label in labels:
+            action = QtGui.QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(name == self.tracker_name)
+            action.triggered.connect(lambda checked, n=name, l=label: self.set_tracker(n, l))
+            tracker_group.addAction(action)
+            tracker_menu.addAction(action)
+
+        homography_action = QtGui.QAction("Homography-Constrained Prediction", self)
+        homography_action.setCheckable(True)
+        homography_action.toggled.connect(self.set_use_homography)
+        tools_menu.addAction(homography_action)
+
+        pitch_overlay_action = QtGui.QAction("Show Pitch Overlay", self)
+        pitch_overlay_action.setCheckable(True)
+        pitch_overlay_action.toggled.connect(self.scene.set_pitch_overlay)
+        tools_menu.addAction(pitch_overlay_action)
+        
+        jobs_menu = menu.addMenu("Jobs")
+        show_jobs_action = self.job_dock.toggleViewAction()
+        show_jobs_action.setText("Show Job List")
+        jobs_menu.addAction(show_jobs_action)
+
+        cancel_jobs_action = QtGui.QAction("Cancel All Jobs", self)
+        cancel_jobs_action.triggered.connect(self.cancel_all_jobs)
+        jobs_menu.addAction(cancel_jobs_action)
         
-        keypoint_menu = menu.addMenu("Keypoints")
+        # The 35 keypoint actions are created when the menu is first opened
+        self.keypoint_menu = menu.addMenu("Keypoints")
+        self.keypoint_menu.aboutToShow.connect(self.fill_keypoint_menu)
+
+    def fill_keypoint_menu(self):
+        if not self.keypoint_menu.isEmpty():
+            return
         for kp_name, info in self.keypoints_dict.items():
             action = QtGui.QAction(kp_name, self)
             action.triggered.connect(lambda checked, n=kp_name: self.set_active_keypoint(n))
-            keypoint_menu.addAction(action)
+            self.keypoint_menu.addAction(action)
+
+    def create_pitch_reference(self):
+        """
+        Replace the placeholder with the pitch reference; called once the window
+        is shown, or earlier when a keypoint is selected first.
+        """
+        if self.pitch_reference is not None:
+            return
+        self.pitch_reference = PitchReference(self.keypoints_dict, parent=self)
+        self.main_layout.replaceWidget(self.pitch_placeholder, self.pitch_reference)
+        self.pitch_placeholder.deleteLater()
+        self.pitch_placeholder = None
+        if self.scene.active_keypoint is not None:
+            self.pitch_reference.highlight_keypoint_by_number(
+                self.keypoints_dict[self.scene.active_keypoint]["number"])
 
     def create_toolbar(self):
         toolbar = self.addToolBar("Main Toolbar")
@@ -162,50 +406,222 @@ class AnnotationTool(QtWidgets.QMainWindow):
 
     def predict_next_frame_keypoints(self):
         """
-        Predict keypoints for the next frame using optical flow (Lucas–Kanade).
-        Loads frames via OpenCV in grayscale to avoid QImage conversion pitfalls.
+        Predict keypoints for the next frame using optical flow (Lucas–Kanade) in a
+        background job, then move to the next frame if the user is still on this one.
+        Grayscale frames come from the frame source, so a frame already decoded
+        for display is not decoded again.
         """
         # Ensure next frame exists
         self.save_current_annotations()
-        if not self.frames or self.current_frame_index >= len(self.frames) - 1:
+        if self.frame_source is None or self.current_frame_index >= len(self.frame_source) - 1:
             self.statusBar().showMessage("No next frame available for prediction.")
             return
+        if self.prediction_job is not None and self.prediction_job.is_active():
+            self.statusBar().showMessage("A prediction is already running.")
+            return
 
-        current_path = self.frames[self.current_frame_index]
-        next_path = self.frames[self.current_frame_index + 1]
+        # Build previous points array from current frame's annotations
+        current_name = self.frame_source.frame_name(self.current_frame_index)
+        current_annotations = self.session_annotations.get(current_name)
+        if current_annotations is None:
+            self.statusBar().showMessage("No annotations on this frame to predict from.")
+            return
+        from utils.keypoint_predictor import (
+            annotations_to_points, predict_keypoints, predict_keypoints_with_homography, predictions_to_annotations,
+        )
+        prev_points = annotations_to_points(current_annotations)
+        source = self.frame_source
+        index = self.current_frame_index
+        use_homography = self.use_homography
+        tracker = self.tracker_name
 
-        try:
-            import cv2  # lazy import to avoid startup crashes if OpenCV is misinstalled
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "OpenCV Error", f"Failed to import OpenCV: {e}")
+        def predict_job(job):
+            with span("gui.predict_next_frame"):
+                current_img = source.read_gray(index)
+                next_img = source.read_gray(index + 1)
+                if current_img is None or next_img is None:
+                    raise ValueError("failed to load frames")
+                predict = predict_keypoints_with_homography if use_homography else predict_keypoints
+                with span("predict.optical_flow", homography=use_homography):
+                    predicted_points, status = predict(current_img, next_img, prev_points, tracker)
+                return predictions_to_annotations(predicted_points, status)
+
+        self.prediction_job = self.scheduler.run(
+            "Predict next frame", predict_job, PRIORITY_HIGH, FRAME_JOBS,
+            on_finished=lambda annotations: self.on_next_frame_predicted(source, index, annotations),
+            on_failed=lambda message: self.statusBar().showMessage(f"Prediction failed: {message}"),
+        )
+
+    def on_next_frame_predicted(self, source, index, annotations):
+        # Results for a video that has been closed, or of a cancelled job, are dropped
+        if source is not self.frame_source or self.prediction_job.is_cancelled():
             return
+        next_name = source.frame_name(index + 1)
+        self.session_annotations.set(next_name, annotations)
+        self.record_frame(next_name, annotations)
+        if self.current_frame_index == index:
+            self.current_frame_index += 1
+            self.load_frame()
+        elif self.current_frame_index == index + 1:
+            self.scene.load_annotations(annotations)
+        self.statusBar().showMessage("Predicted keypoints populated for next frame.")
+
+    def set_use_homography(self, enabled):
+        self.use_homography = enabled
+        mode = "homography-constrained" if enabled else "optical flow only"
+        self.statusBar().showMessage(f"Prediction mode: {mode}.")
 
-        current_img = cv2.imread(current_path, cv2.IMREAD_GRAYSCALE)
-        next_img = cv2.imread(next_path, cv2.IMREAD_GRAYSCALE)
-        if current_img is None or next_img is None:
-            self.statusBar().showMessage("Failed to load frames for prediction.")
+    def set_tracker(self, name, label):
+        self.tracker_name = name
+        self.statusBar().showMessage(f"Tracker: {label}.")
+
+    def propagate_to_frame(self):
+        if self.frame_source is None:
+            self.statusBar().showMessage("No video loaded.")
             return
+        target, ok = QtWidgets.QInputDialog.getInt(
+            self, "Propagate Keypoints", "Propagate to frame:",
+            len(self.frame_source), 1, len(self.frame_source),
+        )
+        if ok:
+            self.start_propagation(target - 1, min_tracked=1)
 
-        # Build previous points array from current frame's annotations
-        current_name = os.path.basename(current_path)
-        current_annotations = self.session_annotations.get(current_name, {})
-        keypoint_names = list(self.keypoints_dict.keys())
-        prev_points = convert_annotations_to_array(current_annotations, keypoint_names)
+    def propagate_until_cut(self):
+        """
+        Propagate forward until the next shot cut, or until tracking collapses. Cuts
+        recorded when the frames were extracted are used if there are any; otherwise
+        they are detected from the frames as propagation goes.
+        """
+        if self.frame_source is None:
+            self.statusBar().showMessage("No video loaded.")
+            return
+        from utils.frame_extractor import extracted_cut_indices
+        from utils.shot_detection import ShotDetector
+        cuts = extracted_cut_indices(self.frame_source)
+        self.start_propagation(len(self.frame_source) - 1, min_tracked=4, cuts=cuts,
+                               shot_detector=ShotDetector() if cuts is None else None)
 
-        try:
-            predicted_points, status = predict_keypoints(current_img, next_img, prev_points)
-        except Exception as e:
-            self.statusBar().showMessage(f"Prediction failed: {e}")
+    def start_propagation(self, end_index, min_tracked=1, cuts=None, shot_detector=None):
+        """
+        Propagate the current frame's keypoints to end_index on a background worker.
+        Predicted frames are written into the session as they arrive.
+        """
+        if self.propagation_worker is not None:
+            self.statusBar().showMessage("A propagation is already running.")
+            return
+        if end_index == self.current_frame_index:
             return
+        self.save_current_annotations()
+        current_name = self.frame_source.frame_name(self.current_frame_index)
+        current_annotations = self.session_annotations.get(current_name)
+        if current_annotations is None:
+            self.statusBar().showMessage("No annotations on this frame to propagate.")
+            return
+        from utils.keypoint_predictor import annotations_to_points
+        from .propagation_worker import PropagationWorker
+        start_points = annotations_to_points(current_annotations)
 
-        # Merge predictions into annotation format and move to next frame
-        predicted_annotations = update_annotations_with_predictions(keypoint_names, predicted_points, status)
-        next_name = os.path.basename(next_path)
-        self.session_annotations[next_name] = predicted_annotations
+        worker = PropagationWorker(
+            self.frame_source, self.current_frame_index, end_index, start_points,
+            min_tracked=min_tracked, use_homography=self.use_homography,
+            cuts=cuts, shot_detector=shot_detector, tracker=self.tracker_name, group=FRAME_JOBS,
+        )
+        worker.signals.frame_predicted.connect(self.on_frame_predicted)
+        self.start_worker(worker, "Propagating keypoints...")
 
-        self.current_frame_index += 1
-        self.load_frame()
-        self.statusBar().showMessage("Predicted keypoints populated for next frame.")
+    def start_worker(self, worker, label):
+        """
+        Run a propagation or interpolation worker as a job; its progress and Cancel
+        button are in the job list, which is shown.
+        """
+        worker.signals.finished.connect(self.on_propagation_finished)
+        worker.signals.failed.connect(self.on_propagation_finished)
+        self.propagation_worker = self.scheduler.submit(worker)
+        self.job_dock.show()
+        self.statusBar().showMessage(label)
+
+    def mark_keyframe(self):
+        """
+        Mark (or unmark) the current frame as an interpolation keyframe.
+        """
+        if self.frame_source is None:
+            self.statusBar().showMessage("No video loaded.")
+            return
+        index = self.current_frame_index
+        if index in self.keyframes:
+            self.keyframes.remove(index)
+        else:
+            self.keyframes = (self.keyframes + [index])[-2:]
+        marked = ", ".join(str(i + 1) for i in sorted(self.keyframes)) or "none"
+        self.statusBar().showMessage(f"Keyframes: {marked}.")
+
+    def interpolate_between_keyframes(self):
+        """
+        Fill every frame between the two marked keyframes with predicted points,
+        tracking from both keyframes in one background job.
+        """
+        if self.propagation_worker is not None:
+            self.statusBar().showMessage("A propagation is already running.")
+            return
+        if self.frame_source is None or len(self.keyframes) < 2:
+            self.statusBar().showMessage("Mark two keyframes first.")
+            return
+        self.save_current_annotations()
+        start, end = sorted(self.keyframes)
+        start_values = self.session_annotations.get(self.frame_source.frame_name(start))
+        end_values = self.session_annotations.get(self.frame_source.frame_name(end))
+        if start_values is None or end_values is None:
+            self.statusBar().showMessage("Both keyframes need annotations.")
+            return
+        if end - start < 2:
+            self.statusBar().showMessage("There are no frames between the keyframes.")
+            return
+        from .propagation_worker import InterpolationWorker
+        worker = InterpolationWorker(
+            self.frame_source, start, end, start_values, end_values, use_homography=self.use_homography,
+            tracker=self.tracker_name, group=FRAME_JOBS)
+        worker.signals.frame_predicted.connect(self.on_frame_interpolated)
+        self.start_worker(worker, "Interpolating keypoints...")
+
+    def on_frame_interpolated(self, index, annotations):
+        if self.propagation_worker is None or self.propagation_worker.frame_source is not self.frame_source:
+            return
+        # Points the annotator has confirmed on an in-between frame are kept
+        current = self.session_annotations.get(self.frame_source.frame_name(index))
+        if current is not None:
+            confirmed = current[:, VISIBLE] == CONFIRMED
+            annotations[confirmed] = current[confirmed]
+        self.on_frame_predicted(index, annotations)
+
+    def confirm_predicted_points(self):
+        """
+        Mark the predicted points of the current frame as checked by the annotator.
+        """
+        values = self.scene.get_annotations()
+        predicted = values[:, VISIBLE] == PREDICTED
+        if not predicted.any():
+            self.statusBar().showMessage("No predicted points on this frame.")
+            return
+        values[predicted, VISIBLE] = CONFIRMED
+        self.scene.load_annotations(values)
+        frame_name = self.frame_source.frame_name(self.current_frame_index)
+        self.session_annotations.set(frame_name, values)
+        self.record_frame(frame_name, values)
+        self.statusBar().showMessage(f"Confirmed {int(predicted.sum())} predicted points.")
+
+    def on_frame_predicted(self, index, annotations):
+        # Frames still arriving from a job on a video that has since been closed are dropped
+        if self.propagation_worker is None or self.propagation_worker.frame_source is not self.frame_source:
+            return
+        frame_name = self.frame_source.frame_name(index)
+        self.session_annotations.set(frame_name, annotations)
+        self.record_frame(frame_name, annotations)
+        if index == self.current_frame_index:
+            self.scene.load_annotations(annotations)
+
+    def on_propagation_finished(self, message):
+        self.propagation_worker = None
+        self.statusBar().showMessage(message)
 
     def space_pressed(self):
         """
@@ -235,34 +651,260 @@ class AnnotationTool(QtWidgets.QMainWindow):
             self, "Select Video File", "", "Video Files (*.mp4 *.avi)"
         )
         if video_path:
-            output_folder = "frames"
-            extract_frames(video_path, output_folder)
-            self.frames = sorted(
-                os.path.join(output_folder, f)
-                for f in os.listdir(output_folder)
-                if f.endswith(".jpg")
-            )
-            self.current_frame_index = 0
-            self.load_frame()
+            self.open_frames(video_path)
+
+    def open_frames_folder(self):
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Frames Folder")
+        if folder:
+            self.open_frames(folder)
+
+    def open_frames(self, path, recover=True):
+        """
+        Open a video file (decoded lazily) or a folder of extracted frames. A
+        video that has been extracted into the extraction cache before opens from
+        its extracted frames, proxies and shot cuts instead. The source is opened,
+        and its autosaved session recovered unless recover is False, in a
+        background job.
+        """
+        autosave = None
+        if recover and self.project is None and self.session_path is None:
+            # Autosave next to the video so a crash can be recovered by reopening it;
+            # frames from the extraction cache count as their video
+            video_path = cached_video_path(path) or path
+            autosave = os.path.splitext(video_path.rstrip(os.sep))[0] + ".session.json"
+        cache_bytes = self.frame_cache_bytes
+        extraction_options = self.extraction_options()
+
+        def open_job(job):
+            with span("gui.open_frames"):
+                source_path = path
+                if os.path.isfile(path):
+                    source_path = ExtractionCache().lookup(path, **extraction_options) or path
+                source = open_frame_source(source_path, cache_bytes)
+                recovered = None
+                if autosave is not None:
+                    try:
+                        recovered = recover_session(autosave)
+                    except (OSError, ValueError, KeyError) as e:
+                        recovered = e
+            if job.is_cancelled():
+                source.close()
+                return None
+            return source, recovered
+
+        self.scheduler.run(
+            f"Open {os.path.basename(path.rstrip(os.sep))}", open_job, PRIORITY_HIGH,
+            on_finished=lambda result: self.on_frames_opened(autosave, result),
+            on_failed=lambda message: QtWidgets.QMessageBox.critical(self, "Video Error", message),
+        )
+        self.statusBar().showMessage(f"Opening {path}...")
+
+    def extraction_options(self):
+        """
+        extract_frames options of the frames the tool extracts: display proxies and shot cuts.
+        """
+        return {"proxy_width": self.proxy_width, "detect_cuts": True}
+
+    def extract_video_frames(self, choose_folder=False):
+        """
+        Extract a video's frames, display proxies and shot cuts in a background
+        job, into the extraction cache or, with choose_folder, a folder the user
+        picks. A video already in the cache is not extracted again, and opening
+        the video later uses the cached frames. A cancelled extraction resumes
+        when started again.
+        """
+        video_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Select Video File", "", "Video Files (*.mp4 *.avi)"
+        )
+        if not video_path:
+            return
+        folder = None
+        if choose_folder:
+            folder = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Output Folder")
+            if not folder:
+                return
+        options = self.extraction_options()
+        # The cache must not evict the frames being shown
+        in_use = (self.frame_source.path,) if self.frame_source is not None else ()
+
+        def extract_job(job):
+            if folder is None:
+                return ExtractionCache().extract(video_path, progress=job.report, should_stop=job.is_cancelled,
+                                                 keep=in_use, **options)
+            from utils.frame_extractor import extract_frames
+            manifest = extract_frames(video_path, folder, progress=job.report, should_stop=job.is_cancelled,
+                                      **options)
+            return folder, manifest, False
+
+        self.scheduler.run(
+            f"Extract {os.path.basename(video_path)}", extract_job, PRIORITY_LOW,
+            on_finished=lambda result: self.on_frames_extracted(*result, cached=folder is None),
+            on_failed=lambda message: QtWidgets.QMessageBox.critical(self, "Extraction Error", message),
+        )
+        self.job_dock.show()
+
+    def on_frames_extracted(self, folder, manifest, reused, cached=False):
+        if not manifest["complete"]:
+            self.statusBar().showMessage(f"Extraction into {folder} stopped; extract again to resume.")
+            return
+        if reused:
+            self.statusBar().showMessage(f"Reusing the frames extracted earlier ({len(manifest['cuts'])} shot cuts).")
+        else:
+            self.statusBar().showMessage(f"Extracted frames to {folder} ({len(manifest['cuts'])} shot cuts).")
+        # Frames from the cache replace the video they came from; others open if nothing is open
+        if cached or self.frame_source is None:
+            if self.frame_source is None or self.frame_source.path != folder:
+                self.open_frames(folder)
+
+    def on_frames_opened(self, autosave, result):
+        if result is None:
+            return
+        source, recovered = result
+        self.save_current_annotations()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        if self.frame_source is not None:
+            # Jobs still reading the old source are cancelled; it is closed once they return
+            old_source = self.frame_source
+            stopping = self.scheduler.cancel_group(FRAME_JOBS)
+
+            def close_job(job):
+                for other in stopping:
+                    other.wait()
+                old_source.close()
+
+            self.scheduler.run("Close previous video", close_job, PRIORITY_LOW)
+        self.frame_source = source
+        self.settings.setValue("last_video", cached_video_path(source.path) or source.path)
+        self.prefetcher = FramePrefetcher(source, radius=self.prefetch_radius, proxy_width=self.proxy_width)
+        self.timeline.set_source(source)
+        self.current_frame_index = 0
+        self.keyframes = []
+        if self.project is not None:
+            self.attach_project_video()
+        elif self.session_path is None and autosave is not None:
+            if isinstance(recovered, Exception):
+                QtWidgets.QMessageBox.critical(self, "Session Error", f"Failed to load session: {recovered}")
+            else:
+                self.attach_session(autosave, *recovered)
+        self.load_frame()
 
+    @timed("gui.load_frame")
     def load_frame(self):
-        if not self.frames:
-            return
-        frame_path = self.frames[self.current_frame_index]
-        pixmap = QtGui.QPixmap(frame_path)
-        self.scene.clear_annotations()
-        self.scene.addPixmap(pixmap)
-        self.scene.setSceneRect(0, 0, pixmap.width(), pixmap.height())
-        self.graphics_view.fitInView(self.scene.sceneRect(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        if self.frame_source is None:
+            return
+        start = time.perf_counter()
+        image, cached = self.prefetcher.load(self.current_frame_index)
+        if image is None:
+            self.statusBar().showMessage(f"Failed to decode frame {self.current_frame_index + 1}.")
+            return
+        pixmap = QtGui.QPixmap.fromImage(image)
+        self.scene.set_frame_pixmap(pixmap, self.frame_source.frame_size())
+        self.graphics_view.refresh()
         self.frame_label.setText(f"Frame: {self.current_frame_index + 1}")
-        frame_name = os.path.basename(frame_path)
-        if frame_name in self.session_annotations:
-            ann = self.session_annotations[frame_name]
-            self.scene.load_annotations(ann)
+        frame_name = self.frame_source.frame_name(self.current_frame_index)
+        ann = self.session_annotations.get(frame_name)
+        with span("scene.load_annotations"):
+            if ann is not None:
+                self.scene.load_annotations(ann)
+            else:
+                self.scene.clear_annotations()
+        self.prefetcher.record_latency(time.perf_counter() - start, cached)
+        self.prefetcher.navigate(self.current_frame_index)
+        self.timeline.set_current(self.current_frame_index)
+
+    def update_full_resolution_tiles(self):
+        """
+        When zoomed in past the proxy's resolution, lay full-resolution tiles over the visible region.
+        """
+        if self.frame_source is None or self.scene.proxy_scale() <= 1.0:
+            return
+        if self.graphics_view.zoom() * self.scene.proxy_scale() <= TILE_ZOOM_THRESHOLD:
+            return
+        with span("gui.full_resolution_tiles"):
+            frame = self.frame_source.read(self.current_frame_index)
+            if frame is not None:
+                self.scene.show_tiles(frame, self.graphics_view.visible_scene_rect())
+
+    def show_navigation_stats(self):
+        """
+        Report frame load latency for prefetched (hit) and synchronously decoded (miss) frames.
+        """
+        if self.prefetcher is None:
+            self.statusBar().showMessage("No video loaded.")
+            return
+        stats = self.prefetcher.latency_stats()
+        hit, miss = stats["hit"], stats["miss"]
+        self.statusBar().showMessage(
+            f"Frame load - cached: {hit['count']} loads, mean {hit['mean_ms']:.1f} ms, p95 {hit['p95_ms']:.1f} ms | "
+            f"decoded: {miss['count']} loads, mean {miss['mean_ms']:.1f} ms, p95 {miss['p95_ms']:.1f} ms"
+        )
+
+    def set_timing_overlay(self, enabled):
+        """
+        Show or hide the timing overlay; recording is on while it is shown.
+        """
+        RECORDER.enable(enabled)
+        self.timing_label.setVisible(enabled)
+        if enabled:
+            self.update_timing_overlay()
+            self.timing_timer.start()
+        else:
+            self.timing_timer.stop()
+
+    def update_timing_overlay(self):
+        parts = []
+        for name, label in OVERLAY_SPANS:
+            stats = RECORDER.stats(name)
+            if stats is not None:
+                parts.append(f"{label} {stats['last_ms']:.1f}/{stats['p95_ms']:.1f}")
+        self.timing_label.setText(("ms last/p95: " + "  ".join(parts)) if parts else "Timing: no samples yet")
+
+    def export_timing_trace(self):
+        """
+        Write the recorded spans to a Chrome-trace JSON file (chrome://tracing, Perfetto).
+        """
+        fname, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Timing Trace", "trace.json", "JSON Files (*.json)")
+        if fname:
+            events = RECORDER.export_chrome_trace(fname)
+            self.statusBar().showMessage(f"Wrote {events} timing events to {fname}.")
+
+    def update_jobs_label(self):
+        active = len(self.scheduler.active_jobs())
+        self.jobs_label.setText(f"{active} jobs running" if active else "")
+
+    def cancel_all_jobs(self):
+        """
+        Cancel every job except session writes, which are never interrupted.
+        """
+        jobs = [job for job in self.scheduler.active_jobs() if job.group != SESSION_JOBS]
+        for job in jobs:
+            self.scheduler.cancel(job)
+        self.statusBar().showMessage(f"Cancelled {len(jobs)} jobs.")
+
+    def closeEvent(self, event):
+        self.scheduler.shutdown(finish_groups=(SESSION_JOBS,))
+        self.timeline.stop()
+        if self.journal is not None:
+            self.save_current_annotations()
+            self.journal.close(self.session_annotations)
+        if self.project is not None:
+            self.save_current_annotations()
+            self.project.close()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        super().closeEvent(event)
+
+    def jump_to_frame(self, index):
+        if self.frame_source is None or index == self.current_frame_index:
+            return
+        self.save_current_annotations()
+        self.current_frame_index = index
+        self.load_frame()
 
     def next_frame(self):
         self.save_current_annotations()
-        if self.current_frame_index < len(self.frames) - 1:
+        if self.frame_source is not None and self.current_frame_index < len(self.frame_source) - 1:
             self.current_frame_index += 1
             self.load_frame()
 
@@ -272,11 +914,115 @@ class AnnotationTool(QtWidgets.QMainWindow):
             self.current_frame_index -= 1
             self.load_frame()
 
+    def next_frame_missing_keypoint(self):
+        """
+        Jump to the next frame in which the active keypoint is not annotated.
+        """
+        keypoint = self.scene.active_keypoint
+        if self.frame_source is None or keypoint is None:
+            self.statusBar().showMessage("Load a video and select a keypoint first.")
+            return
+        self.save_current_annotations()
+        annotated = set(self.session_annotations.frames_with(keypoint))
+        for index in range(self.current_frame_index + 1, len(self.frame_source)):
+            if self.frame_source.frame_name(index) not in annotated:
+                self.current_frame_index = index
+                self.load_frame()
+                return
+        self.statusBar().showMessage(f"No later frame is missing {keypoint}.")
+
+    def check_geometry(self, jump=False):
+        """
+        Check every frame of the session against the pitch geometry in a job;
+        the flagged frames are then visited with Next Flagged Frame.
+        """
+        from utils.geometry_check import check_session
+        self.save_current_annotations()
+        session = self.session_annotations
+        if self.project is not None:
+            # SQLite connections belong to the thread that opened them, so the job opens its own
+            project_path = self.project.path
+            video_id = session.video_id
+            source = self.frame_source
+
+            def check_job(job):
+                project = ProjectStore(project_path)
+                try:
+                    return check_session(ProjectSessionView(project, video_id, source))
+                finally:
+                    project.close()
+        else:
+            snapshot = session.copy()
+
+            def check_job(job):
+                return check_session(snapshot)
+
+        self.scheduler.run("Check geometry", check_job, group=FRAME_JOBS,
+                           on_finished=lambda result: self.on_geometry_checked(session, result, jump),
+                           on_failed=lambda message: self.statusBar().showMessage(
+                               f"Geometry check failed: {message}"))
+        self.statusBar().showMessage("Checking geometry...")
+
+    def on_geometry_checked(self, session, result, jump):
+        if result is None or session is not self.session_annotations:
+            return
+        from utils.geometry_check import geometry_report
+        names, checked = result
+        self.geometry_session = session
+        self.last_geometry_report = geometry_report(names, checked)
+        self.geometry_flags = {frame["frame"]: frame for frame in self.last_geometry_report["frames"]}
+        summary = self.last_geometry_report["summary"]
+        self.statusBar().showMessage(
+            f"Geometry check: {summary['flagged']} of {summary['frames']} frames flagged "
+            f"({summary['reprojection']} reprojection, {summary['mirrored']} mirrored, {summary['order']} order).")
+        if jump and self.geometry_flags:
+            self.next_flagged_frame()
+
+    def next_flagged_frame(self):
+        """
+        Jump to the next frame flagged by the last geometry check, running the
+        check first if the current session has not been checked.
+        """
+        if self.frame_source is None:
+            self.statusBar().showMessage("Load a video first.")
+            return
+        if self.geometry_session is not self.session_annotations:
+            self.check_geometry(jump=True)
+            return
+        self.save_current_annotations()
+        for index in range(self.current_frame_index + 1, len(self.frame_source)):
+            frame = self.geometry_flags.get(self.frame_source.frame_name(index))
+            if frame is not None:
+                self.current_frame_index = index
+                self.load_frame()
+                points = ", ".join(frame["points"]) or "no single keypoint"
+                self.statusBar().showMessage(
+                    f"Flagged ({', '.join(frame['reasons'])}): {points}. Run Check Geometry again after fixing.")
+                return
+        self.statusBar().showMessage("No later frame was flagged by the geometry check.")
+
+    def save_geometry_report(self):
+        if self.geometry_session is not self.session_annotations:
+            self.statusBar().showMessage("Run Check Geometry first.")
+            return
+        fname, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Geometry Report", "", "JSON Files (*.json)")
+        if fname:
+            from utils.geometry_check import write_report
+            report = self.last_geometry_report
+            self.scheduler.run(f"Save {os.path.basename(fname)}", lambda job: write_report(fname, report),
+                               on_finished=lambda _: self.statusBar().showMessage(
+                                   f"Geometry report saved to {fname}."),
+                               on_failed=lambda message: QtWidgets.QMessageBox.critical(
+                                   self, "Report Error", f"Failed to save the report: {message}"))
+
+    @timed("gui.save_current_annotations")
     def save_current_annotations(self):
-        if not self.frames:
+        if self.frame_source is None:
             return
-        frame_name = os.path.basename(self.frames[self.current_frame_index])
-        self.session_annotations[frame_name] = self.scene.get_annotations()
+        frame_name = self.frame_source.frame_name(self.current_frame_index)
+        # Only allocate a row once the frame actually has annotations
+        if frame_name in self.session_annotations or self.scene.has_annotations():
+            self.session_annotations.set(frame_name, self.scene.get_annotations())
 
     def set_active_keypoint(self, keypoint_name):
         """
@@ -284,22 +1030,291 @@ class AnnotationTool(QtWidgets.QMainWindow):
         Highlights the keypoint in the pitch reference and sets it as active in the annotation scene.
         """
         keypoint_no = self.keypoints_dict[keypoint_name]["number"]
+        self.create_pitch_reference()
         self.pitch_reference.highlight_keypoint_by_number(keypoint_no)
         self.scene.set_active_keypoint(keypoint_name)
         self.statusBar().showMessage(f"Selected keypoint: {keypoint_no} - {keypoint_name}")
 
+    def attach_session(self, session_path, store, replayed=0):
+        """
+        Make session_path the current session with store, its contents as loaded
+        by recover_session, and journal all further changes next to it.
+        """
+        self.detach_session()
+        self.session_annotations = store
+        self.timeline.set_session(store)
+        self.session_path = session_path
+        self.settings.setValue("last_session", session_path)
+        try:
+            self.journal = SessionJournal(session_path)
+        except OSError as e:
+            self.statusBar().showMessage(f"Autosave disabled: {e}")
+        if replayed:
+            self.statusBar().showMessage(f"Recovered {replayed} unsaved changes from the journal.")
+
+    def detach_session(self):
+        if self.journal is not None:
+            # The snapshot is taken and the journal rotated here, on the thread that
+            # owns the store; writing the snapshot and closing finish in a job
+            journal = self.journal
+            journal.compact(self.session_annotations)
+            self.scheduler.run(f"Close {os.path.basename(self.session_path)}", lambda job: journal.close(),
+                               PRIORITY_LOW, SESSION_JOBS)
+            self.journal = None
+        self.session_path = None
+
+    def record_frame(self, frame_name, values):
+        """
+        Record that frame_name of the session was set to values: update the
+        timeline's completeness and journal the change.
+        """
+        self.timeline.update_frame(frame_name, values)
+        if self.journal is None:
+            return
+        self.journal.record_frame(frame_name, values)
+        self.maybe_compact_journal()
+
+    def on_annotation_changed(self, keypoint_index, x, y):
+        if self.frame_source is None:
+            return
+        frame_name = self.frame_source.frame_name(self.current_frame_index)
+        self.timeline.update_frame(frame_name, self.scene.annotations)
+        if self.project is not None:
+            # Project sessions write through to SQLite
+            self.session_annotations.set_point(frame_name, keypoint_index, x, y)
+            return
+        if self.journal is None:
+            return
+        self.journal.record_point(frame_name, keypoint_index, x, y)
+        self.maybe_compact_journal()
+
+    def maybe_compact_journal(self):
+        if self.journal.needs_compaction():
+            self.save_current_annotations()
+            self.journal.compact(self.session_annotations)
+
     def save_session(self):
+        """
+        Changes are already journaled; saving folds the journal into the session
+        file in the background.
+        """
+        if self.project is not None:
+            self.save_current_annotations()
+            self.statusBar().showMessage("Project changes are saved automatically.")
+            return
+        if self.journal is None:
+            self.save_session_as()
+            return
+        self.save_current_annotations()
+        journal = self.journal
+        if journal.is_compacting():
+            # An autosave is being written; save again once it is done
+            self.scheduler.run("Wait for autosave", lambda job: journal.wait_for_compaction(), group=SESSION_JOBS,
+                               on_finished=lambda _: self.save_session() if self.journal is journal else None,
+                               on_failed=self.on_save_failed)
+            return
+        journal.compact(self.session_annotations)
+        self.wait_for_save(journal, self.session_path)
+
+    def wait_for_save(self, journal, path):
+        """
+        Report the journal's running compaction (a save) once it has written path.
+        """
+        def save_job(job):
+            with span("gui.save_session"):
+                journal.wait_for_compaction()
+
+        self.scheduler.run(f"Save {os.path.basename(path)}", save_job, group=SESSION_JOBS,
+                           on_finished=lambda _: self.statusBar().showMessage(f"Session saved to {path}."),
+                           on_failed=self.on_save_failed)
+
+    def on_save_failed(self, message):
+        QtWidgets.QMessageBox.critical(self, "Session Error", f"Failed to save session: {message}")
+
+    def save_session_as(self):
         self.save_current_annotations()
         fname, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Session", "", "JSON Files (*.json)")
-        if fname:
-            with open(fname, "w") as f:
-                json.dump(self.session_annotations, f, indent=2)
-            self.statusBar().showMessage("Session saved.")
+        if fname and self.project is not None:
+            # Export the current video's project annotations; SQLite connections
+            # belong to the thread that opened them, so the job opens its own
+            project_path = self.project.path
+            video_id = self.session_annotations.video_id
+            source = self.frame_source
+
+            def export_job(job):
+                project = ProjectStore(project_path)
+                try:
+                    view = ProjectSessionView(project, video_id, source)
+                    view.save_json(fname)
+                    return len(view)
+                finally:
+                    project.close()
+
+            self.scheduler.run(f"Export {os.path.basename(fname)}", export_job, group=SESSION_JOBS,
+                               on_finished=lambda count: self.statusBar().showMessage(
+                                   f"Exported {count} project frames to {fname}."),
+                               on_failed=self.on_save_failed)
+        elif fname:
+            store = self.session_annotations
+            self.attach_session(fname, store)
+            if self.journal is not None:
+                # Compacting the fresh journal writes the whole session to fname
+                self.journal.compact(store)
+                self.wait_for_save(self.journal, fname)
+            else:
+                snapshot = store.copy()
+                self.scheduler.run(f"Save {os.path.basename(fname)}", lambda job: snapshot.save_json(fname),
+                                   group=SESSION_JOBS,
+                                   on_finished=lambda _: self.statusBar().showMessage(f"Session saved to {fname}."),
+                                   on_failed=self.on_save_failed)
 
     def load_session(self):
+        if self.project is not None:
+            self.import_session_into_project()
+            return
         fname, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Load Session", "", "JSON Files (*.json)")
         if fname:
-            with open(fname, "r") as f:
-                self.session_annotations = json.load(f)
-            self.load_frame()
+            self.open_session(fname)
+
+    def open_session(self, fname):
+        """
+        Load a JSON session, replaying its journal, in a background job.
+        """
+        def load_job(job):
+            with span("gui.load_session"):
+                return recover_session(fname)
+
+        self.scheduler.run(
+            f"Load {os.path.basename(fname)}", load_job, PRIORITY_HIGH,
+            on_finished=lambda result: self.on_session_loaded(fname, result),
+            on_failed=lambda message: QtWidgets.QMessageBox.critical(
+                self, "Session Error", f"Failed to load session: {message}"),
+        )
+
+    def on_session_loaded(self, fname, result):
+        store, replayed = result
+        self.save_current_annotations()
+        self.attach_session(fname, store, replayed)
+        self.load_frame()
+        if not replayed:
             self.statusBar().showMessage("Session loaded.")
+
+    def reopen_last(self):
+        """
+        Reopen the video and the session (or project) that were open last. The
+        video and session are loaded by parallel jobs.
+        """
+        project = self.settings.value("last_project")
+        session = self.settings.value("last_session")
+        video = self.settings.value("last_video")
+        reopened = []
+        if project and os.path.exists(project):
+            self.open_project_file(project)
+            reopened.append(project)
+        elif session and os.path.exists(session):
+            self.open_session(session)
+            reopened.append(session)
+        if video and os.path.exists(video):
+            # The session is already being loaded, so the video's autosave is not recovered
+            self.open_frames(video, recover=not reopened)
+            reopened.append(video)
+        if not reopened:
+            self.statusBar().showMessage("Nothing to reopen.")
+
+    def merge_sessions_into_current(self):
+        """
+        Merge shard sessions (or a shard manifest) into the current session. Keypoints
+        already in the current session win conflicts; conflicts are listed afterwards.
+        """
+        fnames, _ = QtWidgets.QFileDialog.getOpenFileNames(self, "Merge Sessions", "", "JSON Files (*.json)")
+        if not fnames:
+            return
+        self.save_current_annotations()
+        try:
+            sessions = [("current session", self.session_annotations.to_json_dict())]
+            sessions += load_shard_sessions(fnames)
+            merged, conflicts, problems = merge_sessions(sessions)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.critical(self, "Merge Error", f"Failed to merge sessions: {e}")
+            return
+        changed = 0
+        for frame_name, values in merged.iter_frames():
+            current = self.session_annotations.get(frame_name)
+            if current is None and not (values[:, VISIBLE] > 0).any():
+                continue
+            if current is None or not np.array_equal(current, values, equal_nan=True):
+                self.session_annotations.set(frame_name, values)
+                self.record_frame(frame_name, values)
+                changed += 1
+        self.load_frame()
+        summary = f"Merged {len(sessions) - 1} sessions: {changed} frames updated, {len(conflicts)} conflicts"
+        if problems:
+            summary += f", {len(problems)} invalid entries skipped"
+        self.statusBar().showMessage(summary + ".")
+        if conflicts or problems:
+            lines = [f"{c['frame']}/{c['keypoint']}: kept {c['kept']}" for c in conflicts[:30]] + problems[:10]
+            QtWidgets.QMessageBox.warning(self, "Merge Conflicts", summary + ".\n\n" + "\n".join(lines))
+
+    def open_project(self):
+        fname, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Open or Create Project", "", "Project Files (*.sqlite)",
+            options=QtWidgets.QFileDialog.Option.DontConfirmOverwrite,
+        )
+        if fname:
+            self.open_project_file(fname)
+
+    def open_project_file(self, path):
+        """
+        Open (or create) a SQLite project; the current video's annotations are then
+        read from and written to the project instead of a JSON session.
+        """
+        try:
+            project = ProjectStore(path)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Project Error", f"Failed to open project: {e}")
+            return
+        self.close_project()
+        self.project = project
+        self.settings.setValue("last_project", path)
+        if self.frame_source is not None:
+            self.attach_project_video()
+            self.load_frame()
+        self.statusBar().showMessage(f"Project opened: {path}")
+
+    def attach_project_video(self):
+        self.save_current_annotations()
+        self.detach_session()
+        # Frames from the extraction cache are registered as the video they came from
+        video_path = cached_video_path(self.frame_source.path) or self.frame_source.path
+        # Extracted frames have no frame rate; None keeps the one recorded for the video
+        video_id = self.project.add_video(video_path, len(self.frame_source), self.frame_source.fps or None)
+        self.session_annotations = ProjectSessionView(self.project, video_id, self.frame_source)
+        self.timeline.set_session(self.session_annotations)
+
+    def import_session_into_project(self):
+        if self.project is None or self.frame_source is None:
+            self.statusBar().showMessage("Open a project and a video first.")
+            return
+        fname, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Import Session", "", "JSON Files (*.json)")
+        if fname:
+            try:
+                count = self.project.import_json_session(self.session_annotations.video_id, fname)
+            except (OSError, ValueError, KeyError) as e:
+                QtWidgets.QMessageBox.critical(self, "Session Error", f"Failed to import session: {e}")
+                return
+            self.session_annotations = ProjectSessionView(
+                self.project, self.session_annotations.video_id, self.frame_source)
+            self.timeline.set_session(self.session_annotations)
+            self.load_frame()
+            self.statusBar().showMessage(f"Imported {count} frames into the project.")
+
+    def close_project(self):
+        if self.project is None:
+            return
+        self.save_current_annotations()
+        self.project.close()
+        self.project = None
+        self.settings.remove("last_project")
+        self.session_annotations = AnnotationStore()
+        self.timeline.set_session(self.session_annotations)
+        self.load_frame()
@@ -0,0 +1,18 @@
+from PyQt6 import QtGui
+
+def frame_to_qimage(frame, target_format=None):
+    """
+    Convert a BGR (or grayscale) uint8 NumPy frame into a QImage, optionally
+    converted to target_format. The returned image owns its pixels, so the
+    array can be released afterwards.
+    """
+    height, width = frame.shape[:2]
+    if frame.ndim == 2:
+        fmt = QtGui.QImage.Format.Format_Grayscale8
+    else:
+        fmt = QtGui.QImage.Format.Format_BGR888
+    image = QtGui.QImage(frame.data, width, height, frame.strides[0], fmt)
+    if target_format is not None and target_format != fmt:
+        # convertToFormat allocates a new image, which also detaches it from the array
+        return image.convertToFormat(target_format)
+    return image.copy()
@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+from PyQt6 import QtGui, QtCore
+from .frame_image import frame_to_qimage
+
+DEFAULT_PREFETCH_RADIUS = 4
+DEFAULT_PREFETCH_BYTES = 384 * 1024 * 1024
+
+class _DecodeTask(QtCore.QRunnable):
+    def __init__(self, prefetcher, index, generation):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.index = index
+        self.generation = generation
+
+    def run(self):
+        self.prefetcher._decode_into_cache(self.index, self.generation)
+
+class FramePrefetcher:
+    """
+    Decodes frames around the current one into QImages on a QThreadPool.
+
+    Frames ahead in the direction the user is navigating are prefetched
+    `radius` deep; a shorter window is kept behind. Images are converted to
+    the native pixmap format on the worker so that QPixmap.fromImage on the GUI
+    thread is cheap. With proxy_width set, the downscaled display proxy of each
+    frame is decoded instead of the full-resolution frame. Load latencies are
+    recorded separately for cache hits and misses so the effect of prefetching
+    can be reported.
+    """
+    def __init__(self, frame_source, radius=DEFAULT_PREFETCH_RADIUS, max_bytes=DEFAULT_PREFETCH_BYTES,
+                 proxy_width=None):
+        self.frame_source = frame_source
+        self.proxy_width = proxy_width
+        self.radius = radius
+        self.max_bytes = max_bytes
+        self.direction = 1
+        self.last_index = None
+        self.nbytes = 0
+        self._images = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._latencies = {True: [], False: []}
+        self.pool = QtCore.QThreadPool()
+        # Decoding from one VideoCapture is serialised anyway; two threads keep
+        # one decode and one format conversion in flight.
+        self.pool.setMaxThreadCount(2)
+
+    def get(self, index):
+        """
+        Return the cached QImage for `index`, or None if it is not ready yet.
+        """
+        with self._lock:
+            image = self._images.get(index)
+            if image is not None:
+                self._images.move_to_end(index)
+            return image
+
+    def load(self, index):
+        """
+        Return (QImage, was_cached) for `index`, decoding synchronously on a miss.
+        """
+        image = self.get(index)
+        if image is not None:
+            return image, True
+        image = self._decode(index)
+        if image is not None:
+            self._store(index, image)
+        return image, False
+
+    def navigate(self, index):
+        """
+        Record a move to `index` and queue decoding of the frames around it.
+        """
+        if self.last_index is not None and index != self.last_index:
+            self.direction = 1 if index > self.last_index else -1
+        self.last_index = index
+
+        # Drop queued work for the old neighbourhood before scheduling the new one
+        self.pool.clear()
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            cached = set(self._images)
+
+        behind = max(1, self.radius // 4)
+        order = [index + self.direction * k for k in range(1, self.radius + 1)]
+        order += [index - self.direction * k for k in range(1, behind + 1)]
+        for i in order:
+            if 0 <= i < len(self.frame_source) and i not in cached:
+                self.pool.start(_DecodeTask(self, i, generation))
+
+    def record_latency(self, seconds, cached):
+        samples = self._latencies[cached]
+        samples.append(seconds)
+        if len(samples) > 1000:
+            del samples[:-1000]
+
+    def latency_stats(self):
+        """
+        Return {"hit": {...}, "miss": {...}} with count, mean and p95 load latency in ms.
+        """
+        stats = {}
+        for cached, label in ((True, "hit"), (False, "miss")):
+            samples = sorted(self._latencies[cached])
+            if samples:
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                stats[label] = {
+                    "count": len(samples),
+                    "mean_ms": 1000.0 * sum(samples) / len(samples),
+                    "p95_ms": 1000.0 * p95,
+                }
+            else:
+                stats[label] = {"count": 0, "mean_ms": 0.0, "p95_ms": 0.0}
+        return stats
+
+    def shutdown(self):
+        self.pool.clear()
+        self.pool.waitForDone()
+        with self._lock:
+            self._images.clear()
+            self.nbytes = 0
+
+    def _decode(self, index):
+        if self.proxy_width:
+            frame = self.frame_source.read_proxy(index, self.proxy_width)
+        else:
+            frame = self.frame_source.read(index)
+        if frame is None:
+            return None
+        return frame_to_qimage(frame, QtGui.QImage.Format.Format_RGB32)
+
+    def _decode_into_cache(self, index, generation):
+        with self._lock:
+            if generation != self._generation or index in self._images:
+                return
+        image = self._decode(index)
+        if image is not None:
+            self._store(index, image)
+
+    def _store(self, index, image):
+        with self._lock:
+            old = self._images.pop(index, None)
+            if old is not None:
+                self.nbytes -= old.sizeInBytes()
+            self._images[index] = image
+            self.nbytes += image.sizeInBytes()
+            while self.nbytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self.nbytes -= evicted.sizeInBytes()
@@ -0,0 +1,71 @@
+from PyQt6 import QtWidgets, QtCore
+
+ZOOM_STEP = 1.25
+MAX_ZOOM = 16.0  # view pixels per frame pixel
+
+class FrameView(QtWidgets.QGraphicsView):
+    """
+    Graphics view for the annotation scene with mouse-wheel zoom.
+
+    The frame is fitted to the view until the user zooms in; the fit is kept
+    across frame changes and window resizes. viewport_changed is emitted once
+    control returns to the event loop after any zoom, scroll or resize, so the
+    intermediate states of a frame change or fit do not trigger refinement.
+    """
+    viewport_changed = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fitted = True
+        self.setTransformationAnchor(QtWidgets.QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self._changed_timer = QtCore.QTimer(self)
+        self._changed_timer.setSingleShot(True)
+        self._changed_timer.setInterval(0)
+        self._changed_timer.timeout.connect(self.viewport_changed)
+        self.horizontalScrollBar().valueChanged.connect(lambda value: self._changed_timer.start())
+        self.verticalScrollBar().valueChanged.connect(lambda value: self._changed_timer.start())
+
+    def zoom(self):
+        """
+        Current scale in view pixels per scene (full-resolution frame) pixel.
+        """
+        return self.transform().m11()
+
+    def fit(self):
+        self.fitted = True
+        self.fitInView(self.sceneRect(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        self._changed_timer.start()
+
+    def refresh(self):
+        """
+        Re-fit after the scene changed, unless the user has zoomed in.
+        """
+        if self.fitted:
+            self.fit()
+        else:
+            self._changed_timer.start()
+
+    def visible_scene_rect(self):
+        return self.mapToScene(self.viewport().rect()).boundingRect().intersected(self.sceneRect())
+
+    def fit_zoom(self):
+        rect = self.sceneRect()
+        viewport = self.viewport().rect()
+        return min(viewport.width() / rect.width(), viewport.height() / rect.height())
+
+    def wheelEvent(self, event):
+        if self.scene() is None or self.sceneRect().isEmpty():
+            return
+        factor = ZOOM_STEP if event.angleDelta().y() > 0 else 1 / ZOOM_STEP
+        target = min(MAX_ZOOM, self.zoom() * factor)
+        if target <= self.fit_zoom():
+            self.fit()
+            return
+        self.fitted = False
+        step = target / self.zoom()
+        self.scale(step, step)
+        self._changed_timer.start()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
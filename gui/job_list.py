@@ -0,0 +1,67 @@
+import time
+from PyQt6 import QtWidgets, QtCore
+from .job_scheduler import RUNNING
+
+REFRESH_MS = 200
+
+class JobList(QtWidgets.QWidget):
+    """
+    Shows the scheduler's jobs with their state and progress, and cancels the
+    selected ones. Progress is polled from the jobs while any are active rather
+    than redrawn on every progress signal.
+    """
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.tree = QtWidgets.QTreeWidget()
+        self.tree.setHeaderLabels(["Job", "Status", "Progress", "Time"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.tree.header().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)
+
+        cancel_button = QtWidgets.QPushButton("Cancel Selected")
+        cancel_button.clicked.connect(self.cancel_selected)
+        clear_button = QtWidgets.QPushButton("Clear Finished")
+        clear_button.clicked.connect(self.scheduler.clear_finished)
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(cancel_button)
+        buttons.addWidget(clear_button)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.tree)
+        layout.addLayout(buttons)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.scheduler.jobs_changed.connect(self.refresh)
+
+    def refresh(self):
+        selected = {id(item.data(0, QtCore.Qt.ItemDataRole.UserRole)) for item in self.tree.selectedItems()}
+        self.tree.clear()
+        now = time.perf_counter()
+        for job in reversed(self.scheduler.jobs):
+            if job.total:
+                progress = f"{job.done}/{job.total} ({100 * job.done // job.total}%)"
+            else:
+                progress = ""
+            elapsed = ""
+            if job.started is not None:
+                elapsed = f"{(job.ended or now) - job.started:.1f} s"
+            status = job.state if job.error is None else f"{job.state}: {job.error}"
+            item = QtWidgets.QTreeWidgetItem([job.name, status, progress, elapsed])
+            item.setData(0, QtCore.Qt.ItemDataRole.UserRole, job)
+            self.tree.addTopLevelItem(item)
+            item.setSelected(id(job) in selected)
+        # Poll progress only while something is running
+        if any(job.state == RUNNING for job in self.scheduler.jobs):
+            if not self.timer.isActive():
+                self.timer.start()
+        else:
+            self.timer.stop()
+
+    def cancel_selected(self):
+        for item in self.tree.selectedItems():
+            self.scheduler.cancel(item.data(0, QtCore.Qt.ItemDataRole.UserRole))
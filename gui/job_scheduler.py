@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from PyQt6 import QtCore
+
+# Thread pool priorities; higher runs first among queued jobs
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+MAX_FINISHED_JOBS = 20  # finished jobs kept for the job list
+
+class JobSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(int, int)  # done, total
+    finished = QtCore.pyqtSignal(object)    # return value of execute()
+    failed = QtCore.pyqtSignal(str)         # error message
+    state_changed = QtCore.pyqtSignal()
+
+class Job(QtCore.QRunnable):
+    """
+    A unit of background work run by a JobScheduler.
+
+    The work is func(job), or execute() in a subclass. It should poll
+    is_cancelled() and call report(done, total) as it goes. When it returns,
+    finished is emitted with its result, also after a cancellation, so partial
+    results can be reported; an exception emits failed instead. Signals are
+    delivered on the GUI thread.
+    """
+    signals_class = JobSignals
+
+    def __init__(self, name, func=None, priority=PRIORITY_NORMAL, group=None):
+        super().__init__()
+        # The scheduler keeps the job for its list, so Qt must not delete it
+        self.setAutoDelete(False)
+        self.signals = self.signals_class()
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.group = group
+        self.state = QUEUED
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.ended = None
+        self._cancelled = False
+        self._finished_event = threading.Event()
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def is_active(self):
+        return self.state not in FINISHED_STATES
+
+    def report(self, done, total):
+        self.done = done
+        self.total = total
+        self.signals.progress.emit(done, total)
+
+    def wait(self, timeout=None):
+        """
+        Block until the job has finished; returns False on timeout.
+        """
+        return self._finished_event.wait(timeout)
+
+    def execute(self):
+        return self.func(self)
+
+    def _set_state(self, state):
+        self.state = state
+        if state == RUNNING:
+            self.started = time.perf_counter()
+        elif state in FINISHED_STATES:
+            self.ended = time.perf_counter()
+        self.signals.state_changed.emit()
+
+    def run(self):
+        if self._cancelled:
+            self._set_state(CANCELLED)
+            self._finished_event.set()
+            return
+        self._set_state(RUNNING)
+        try:
+            result = self.execute()
+        except Exception as e:
+            logging.exception("Job %r failed", self.name)
+            self.error = str(e)
+            self._set_state(FAILED)
+            self._finished_event.set()
+            self.signals.failed.emit(self.error)
+            return
+        self._set_state(CANCELLED if self._cancelled else DONE)
+        self._finished_event.set()
+        self.signals.finished.emit(result)
+
+class JobScheduler(QtCore.QObject):
+    """
+    Runs Jobs on a private QThreadPool, highest priority first, and keeps the
+    list of queued, running and recently finished jobs for display.
+
+    The pool is separate from the frame prefetcher's, so long jobs never delay
+    decoding the frames the user is navigating to.
+    """
+    jobs_changed = QtCore.pyqtSignal()
+
+    def __init__(self, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(max_threads or max(2, QtCore.QThread.idealThreadCount() // 2))
+        self.jobs = []
+
+    def submit(self, job):
+        """
+        Queue a job and return it.
+        """
+        job.signals.state_changed.connect(self._on_state_changed)
+        self.jobs.append(job)
+        self.pool.start(job, job.priority)
+        self.jobs_changed.emit()
+        return job
+
+    def run(self, name, func, priority=PRIORITY_NORMAL, group=None, on_finished=None, on_failed=None):
+        """
+        Queue func(job) as a job; on_finished(result) and on_failed(message) are
+        called on the GUI thread.
+        """
+        job = Job(name, func, priority, group)
+        if on_finished is not None:
+            job.signals.finished.connect(on_finished)
+        if on_failed is not None:
+            job.signals.failed.connect(on_failed)
+        return self.submit(job)
+
+    def cancel(self, job):
+        job.cancel()
+        # A job that has not started yet is taken off the queue straight away
+        if job.state == QUEUED and self.pool.tryTake(job):
+            job.run()
+
+    def cancel_group(self, group):
+        """
+        Cancel the active jobs of a group; returns them so callers can wait on them.
+        """
+        jobs = [job for job in self.jobs if job.group == group and job.is_active()]
+        for job in jobs:
+            self.cancel(job)
+        return jobs
+
+    def active_jobs(self):
+        return [job for job in self.jobs if job.is_active()]
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if job.is_active()]
+        self.jobs_changed.emit()
+
+    def shutdown(self, finish_groups=()):
+        """
+        Cancel all jobs except those of finish_groups, which are left to complete
+        (e.g. writing sessions), and wait for the running ones to return.
+        """
+        for job in self.active_jobs():
+            if job.group not in finish_groups:
+                self.cancel(job)
+        self.pool.waitForDone()
+
+    def _on_state_changed(self):
+        finished = [job for job in self.jobs if not job.is_active()]
+        if len(finished) > MAX_FINISHED_JOBS:
+            drop = set(finished[:len(finished) - MAX_FINISHED_JOBS])
+            self.jobs = [job for job in self.jobs if job not in drop]
+        self.jobs_changed.emit()
@@ -0,0 +1,91 @@
+from PyQt6 import QtCore
+from .job_scheduler import PRIORITY_NORMAL, Job, JobSignals
+from utils.keypoint_predictor import interpolate_keyframes, predictions_to_annotations, propagate_keypoints
+
+class PropagationSignals(JobSignals):
+    frame_predicted = QtCore.pyqtSignal(int, object)  # frame index, (35, 3) annotations
+
+class PropagationWorker(Job):
+    """
+    Propagates keypoints over a frame range as a scheduler job.
+
+    Results are emitted per frame so the GUI can write them into the session as
+    they arrive; cancel() stops the run after the current frame. The job's
+    result is a summary message.
+    """
+    signals_class = PropagationSignals
+
+    def __init__(self, frame_source, start_index, end_index, start_points,
+                 min_tracked=1, use_homography=False, cuts=None, shot_detector=None, tracker=None,
+                 priority=PRIORITY_NORMAL, group=None):
+        super().__init__("Propagate keypoints", priority=priority, group=group)
+        self.frame_source = frame_source
+        self.start_index = start_index
+        self.end_index = end_index
+        self.start_points = start_points
+        self.min_tracked = min_tracked
+        self.use_homography = use_homography
+        self.cuts = cuts
+        self.shot_detector = shot_detector
+        self.tracker = tracker
+
+    def execute(self):
+        total = abs(self.end_index - self.start_index)
+        done = 0
+        self.report(done, total)
+        try:
+            for index, points, status in propagate_keypoints(
+                self.frame_source, self.start_index, self.end_index, self.start_points,
+                min_tracked=self.min_tracked, should_stop=self.is_cancelled,
+                use_homography=self.use_homography, cuts=self.cuts, shot_detector=self.shot_detector,
+                tracker=self.tracker,
+            ):
+                annotations = predictions_to_annotations(points, status)
+                done += 1
+                self.signals.frame_predicted.emit(index, annotations)
+                self.report(done, total)
+        except Exception as e:
+            raise RuntimeError(f"Propagation failed after {done} frames: {e}") from e
+        if self.is_cancelled():
+            return f"Propagation cancelled after {done} frames."
+        if done < total:
+            return f"Propagated {done} frames; stopped at a shot cut or where tracking was lost."
+        return f"Propagated {done} frames."
+
+class InterpolationWorker(Job):
+    """
+    Fills the frames between two keyframes with interpolate_keyframes as a scheduler job.
+
+    The frames are only known once both tracking directions have run, so they
+    are emitted together at the end; progress is reported per tracking step.
+    Emits the same signals as PropagationWorker.
+    """
+    signals_class = PropagationSignals
+
+    def __init__(self, frame_source, start_index, end_index, start_values, end_values, use_homography=False,
+                 tracker=None, priority=PRIORITY_NORMAL, group=None):
+        super().__init__("Interpolate keyframes", priority=priority, group=group)
+        self.frame_source = frame_source
+        self.start_index = start_index
+        self.end_index = end_index
+        self.start_values = start_values
+        self.end_values = end_values
+        self.use_homography = use_homography
+        self.tracker = tracker
+
+    def execute(self):
+        try:
+            values = interpolate_keyframes(
+                self.frame_source, self.start_index, self.end_index, self.start_values, self.end_values,
+                use_homography=self.use_homography, should_stop=self.is_cancelled, progress=self.report,
+                tracker=self.tracker,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Interpolation failed: {e}") from e
+        if values is None:
+            return "Interpolation cancelled."
+        for offset, annotations in enumerate(values, 1):
+            self.signals.frame_predicted.emit(self.start_index + offset, annotations)
+        filled = int((values[:, :, 2] > 0).sum())
+        return (f"Interpolated {len(values)} frames ({filled} predicted points) "
+                f"between frames {self.start_index + 1} and {self.end_index + 1}.")
@@ -0,0 +1,343 @@
+import threading
+from collections import OrderedDict
+from PyQt6 import QtWidgets, QtGui, QtCore
+from .frame_image import frame_to_qimage
+from data.annotation_store import NUM_KEYPOINTS, VISIBLE
+from utils.lazy_import import lazy_import
+from utils.thumbnail_cache import DEFAULT_THUMBNAIL_WIDTH, ThumbnailCache
+
+np = lazy_import("numpy")
+
+THUMBNAIL_GAP = 2
+BAR_HEIGHT = 4       # completeness bar under each thumbnail
+HEATMAP_HEIGHT = 12  # completeness of the whole video
+MARGIN = 3
+MAX_THUMBNAILS = 512  # decoded thumbnails kept in memory
+EMPTY_COLOR = QtGui.QColor(60, 60, 60)
+CURRENT_COLOR = QtGui.QColor(255, 200, 0)
+
+def completeness_colors():
+    """
+    Return NUM_KEYPOINTS + 1 RGB32 colours, indexed by the number of annotated
+    keypoints: grey for none, then red through yellow to green for all of them.
+    """
+    colors = [EMPTY_COLOR.rgb()]
+    for count in range(1, NUM_KEYPOINTS + 1):
+        colors.append(QtGui.QColor.fromHsv(round(120 * count / NUM_KEYPOINTS), 220, 220).rgb())
+    return colors
+
+class _ThumbnailSignals(QtCore.QObject):
+    loaded = QtCore.pyqtSignal(object, int, QtGui.QImage)  # thumbnail cache, frame index, image
+
+class _ThumbnailTask(QtCore.QRunnable):
+    def __init__(self, timeline, cache, index, generation):
+        super().__init__()
+        self.timeline = timeline
+        self.cache = cache
+        self.index = index
+        self.generation = generation
+
+    def run(self):
+        self.timeline._load_thumbnail(self.cache, self.index, self.generation)
+
+class Timeline(QtWidgets.QWidget):
+    """
+    Filmstrip of the frames around the current one above a heatmap of the whole
+    video, both coloured by how many of the 35 keypoints each frame has.
+    Clicking a thumbnail or the heatmap emits frame_selected.
+
+    Thumbnails are made on a worker thread and cached on disk (see
+    utils.thumbnail_cache). Per-frame keypoint counts are read from the session
+    once after it is attached and then kept up to date through update_frame, so
+    painting never looks at the session; a change only recolours the heatmap
+    column of its frame.
+    """
+    frame_selected = QtCore.pyqtSignal(int)
+
+    def __init__(self, thumbnail_width=DEFAULT_THUMBNAIL_WIDTH, parent=None):
+        super().__init__(parent)
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_height = round(thumbnail_width * 9 / 16)
+        self.frame_source = None
+        self.thumbnails = None
+        self.session = None
+        self.current_index = 0
+        self.counts = None  # annotated keypoints per frame index, read on first paint
+        self._counts_loaded = False
+        self._frame_indices = {}
+        self._colors = completeness_colors()
+        self._color_table = None
+        self._images = OrderedDict()
+        self._heatmap = None  # RGB32 colour per heatmap column
+        self._heatmap_starts = None
+        self._heatmap_image = None
+        self._scrubbing = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._signals = _ThumbnailSignals()
+        self._signals.loaded.connect(self._on_thumbnail_loaded)
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self._update_height()
+
+    def _update_height(self):
+        self.setFixedHeight(2 * MARGIN + self.thumbnail_height + BAR_HEIGHT + THUMBNAIL_GAP + HEATMAP_HEIGHT)
+
+    def set_source(self, frame_source):
+        """
+        Show the frames of frame_source (None clears the timeline).
+        """
+        self.stop()
+        self.frame_source = frame_source
+        self.thumbnails = None
+        self._images.clear()
+        self._frame_indices = {}
+        self.current_index = 0
+        if frame_source is not None:
+            self.thumbnails = ThumbnailCache(frame_source, self.thumbnail_width)
+            size = frame_source.frame_size()
+            if size is not None:
+                self.thumbnail_height = max(1, round(self.thumbnail_width * size[1] / size[0]))
+                self._update_height()
+            self._frame_indices = {frame_source.frame_name(i): i for i in range(len(frame_source))}
+        self._counts_loaded = False
+        self.update()
+        self.request_thumbnails()
+
+    def set_session(self, session):
+        """
+        Show the keypoint counts of session (an AnnotationStore or ProjectSessionView).
+        They are read once, when the timeline is next painted; later changes come
+        through update_frame.
+        """
+        self.session = session
+        self._counts_loaded = False
+        self.update()
+
+    def _load_counts(self):
+        self._counts_loaded = True
+        self.counts = None
+        if self.frame_source is not None:
+            self.counts = np.zeros(len(self.frame_source), dtype=np.int32)
+            if self.session is not None:
+                for frame_name, count in self.session.annotated_counts_by_name().items():
+                    index = self._frame_indices.get(frame_name)
+                    if index is not None:
+                        self.counts[index] = count
+        self._heatmap = None
+
+    def update_frame(self, frame_name, values):
+        """
+        Record that frame_name now has the (35, 3) annotations values.
+        """
+        index = self._frame_indices.get(frame_name)
+        # Counts not read yet will include this change when they are
+        if index is None or not self._counts_loaded or self.counts is None:
+            return
+        count = int(np.count_nonzero(values[:, VISIBLE] > 0))
+        if count == self.counts[index]:
+            return
+        self.counts[index] = count
+        if self._heatmap is not None:
+            columns = self._heatmap_columns(index)
+            self._color_columns(columns)
+            self._heatmap_image = None
+            heatmap = self._heatmap_rect()
+            self.update(heatmap.x() + int(columns[0]), heatmap.y(), len(columns), heatmap.height())
+        slot = self._slot_rect(index)
+        if slot is not None:
+            self.update(slot.adjusted(-2, -2, 2, 2))
+
+    def set_current(self, index):
+        if index == self.current_index:
+            return
+        self.current_index = index
+        self.request_thumbnails()
+        self.update()
+
+    def stop(self):
+        """
+        Drop queued thumbnails and wait for the one being made.
+        """
+        with self._lock:
+            self._generation += 1
+        self.pool.clear()
+        self.pool.waitForDone()
+
+    def _slot_count(self):
+        width = self.width() - 2 * MARGIN + THUMBNAIL_GAP
+        return max(1, width // (self.thumbnail_width + THUMBNAIL_GAP))
+
+    def _first_slot_index(self):
+        frames = len(self.frame_source)
+        slots = self._slot_count()
+        return max(0, min(self.current_index - slots // 2, frames - slots))
+
+    def _slot_rect(self, index):
+        """
+        Rectangle of the thumbnail of frame index, or None if it is not in the strip.
+        """
+        if self.frame_source is None:
+            return None
+        slot = index - self._first_slot_index()
+        if not 0 <= slot < min(self._slot_count(), len(self.frame_source)):
+            return None
+        x = MARGIN + slot * (self.thumbnail_width + THUMBNAIL_GAP)
+        return QtCore.QRect(x, MARGIN, self.thumbnail_width, self.thumbnail_height + BAR_HEIGHT)
+
+    def _heatmap_rect(self):
+        y = MARGIN + self.thumbnail_height + BAR_HEIGHT + THUMBNAIL_GAP
+        return QtCore.QRect(MARGIN, y, max(1, self.width() - 2 * MARGIN), HEATMAP_HEIGHT)
+
+    def _build_heatmap(self):
+        """
+        Colour each heatmap column by the mean keypoint count of the frames it covers.
+        """
+        width = self._heatmap_rect().width()
+        frames = len(self.counts)
+        self._heatmap_starts = np.arange(width + 1, dtype=np.int64) * frames // width
+        self._heatmap = np.empty(width, dtype=np.uint32)
+        if self._color_table is None:
+            self._color_table = np.array(self._colors, dtype=np.uint32)
+        self._color_columns(np.arange(width))
+        self._heatmap_image = None
+
+    def _heatmap_columns(self, index):
+        starts = self._heatmap_starts
+        # With fewer frames than columns a frame spans several columns
+        ends = np.maximum(starts[1:], starts[:-1] + 1)
+        return np.flatnonzero((starts[:-1] <= index) & (index < ends))
+
+    def _color_columns(self, columns):
+        starts = self._heatmap_starts[columns]
+        ends = np.maximum(self._heatmap_starts[columns + 1], starts + 1)
+        if len(columns) == len(self._heatmap):
+            sums = np.add.reduceat(self.counts, starts)
+        else:
+            sums = np.array([self.counts[a:b].sum() for a, b in zip(starts, ends)])
+        means = np.rint(sums / (ends - starts)).astype(np.int64)
+        # Any annotation at all is shown, however sparse the column is
+        means[(means == 0) & (sums > 0)] = 1
+        self._heatmap[columns] = self._color_table[means]
+
+    def _heatmap_qimage(self):
+        if self._heatmap_image is None:
+            pixels = self._heatmap
+            self._heatmap_image = QtGui.QImage(
+                pixels.data, len(pixels), 1, 4 * len(pixels), QtGui.QImage.Format.Format_RGB32).copy()
+        return self._heatmap_image
+
+    def request_thumbnails(self):
+        """
+        Queue the thumbnails of the strip, then those one strip to either side.
+        """
+        if self.frame_source is None:
+            return
+        self.pool.clear()
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        slots = self._slot_count()
+        first = self._first_slot_index()
+        order = list(range(first, first + slots))
+        order += [i for k in range(1, slots + 1) for i in (first + slots - 1 + k, first - k)]
+        for i in order:
+            if 0 <= i < len(self.frame_source) and i not in self._images:
+                self.pool.start(_ThumbnailTask(self, self.thumbnails, i, generation))
+
+    def _load_thumbnail(self, cache, index, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+        path = cache.get(index)
+        image = QtGui.QImage(path) if path is not None else None
+        if image is None or image.isNull():
+            thumbnail = cache.create(index)
+            if thumbnail is None:
+                return
+            image = frame_to_qimage(thumbnail, QtGui.QImage.Format.Format_RGB32)
+        self._signals.loaded.emit(cache, index, image)
+
+    def _on_thumbnail_loaded(self, cache, index, image):
+        if cache is not self.thumbnails:
+            return
+        self._images[index] = image
+        self._images.move_to_end(index)
+        while len(self._images) > MAX_THUMBNAILS:
+            self._images.popitem(last=False)
+        slot = self._slot_rect(index)
+        if slot is not None:
+            self.update(slot)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.palette().window())
+        if self.frame_source is None or not len(self.frame_source):
+            painter.setPen(self.palette().color(QtGui.QPalette.ColorRole.PlaceholderText))
+            painter.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter, "No video loaded")
+            return
+        if not self._counts_loaded:
+            self._load_counts()
+        first = self._first_slot_index()
+        last = min(first + self._slot_count(), len(self.frame_source))
+        for index in range(first, last):
+            rect = self._slot_rect(index)
+            if not rect.intersects(event.rect()):
+                continue
+            image_rect = QtCore.QRect(rect.x(), rect.y(), rect.width(), self.thumbnail_height)
+            image = self._images.get(index)
+            if image is not None:
+                painter.drawImage(image_rect, image)
+            else:
+                painter.fillRect(image_rect, EMPTY_COLOR)
+                painter.setPen(QtGui.QColor("white"))
+                painter.drawText(image_rect, QtCore.Qt.AlignmentFlag.AlignCenter, str(index + 1))
+            bar = QtCore.QRect(rect.x(), image_rect.bottom() + 1, rect.width(), BAR_HEIGHT)
+            painter.fillRect(bar, QtGui.QColor.fromRgb(self._colors[int(self.counts[index])]))
+            if index == self.current_index:
+                painter.setPen(QtGui.QPen(CURRENT_COLOR, 2))
+                painter.drawRect(rect.adjusted(-1, -1, 1, 1))
+        heatmap = self._heatmap_rect()
+        if self._heatmap is None or len(self._heatmap) != heatmap.width():
+            self._build_heatmap()
+        painter.drawImage(heatmap, self._heatmap_qimage())
+        x = heatmap.x() + self.current_index * heatmap.width() // len(self.frame_source)
+        painter.setPen(QtGui.QPen(CURRENT_COLOR, 2))
+        painter.drawLine(x, heatmap.top(), x, heatmap.bottom())
+
+    def _index_at(self, pos):
+        if self.frame_source is None or not len(self.frame_source):
+            return None
+        heatmap = self._heatmap_rect()
+        if self._scrubbing or pos.y() >= heatmap.top():
+            x = min(max(pos.x() - heatmap.x(), 0), heatmap.width() - 1)
+            return x * len(self.frame_source) // heatmap.width()
+        slot = (pos.x() - MARGIN) // (self.thumbnail_width + THUMBNAIL_GAP)
+        index = self._first_slot_index() + slot
+        if 0 <= slot < self._slot_count() and index < len(self.frame_source):
+            return index
+        return None
+
+    def mousePressEvent(self, event):
+        if event.button() != QtCore.Qt.MouseButton.LeftButton:
+            return
+        pos = event.position().toPoint()
+        self._scrubbing = pos.y() >= self._heatmap_rect().top()
+        index = self._index_at(pos)
+        if index is not None and index != self.current_index:
+            self.frame_selected.emit(index)
+
+    def mouseMoveEvent(self, event):
+        # Dragging along the heatmap scrubs through the video
+        if not self._scrubbing:
+            return
+        index = self._index_at(event.position().toPoint())
+        if index is not None and index != self.current_index:
+            self.frame_selected.emit(index)
+
+    def mouseReleaseEvent(self, event):
+        self._scrubbing = False
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.request_thumbnails()
@@ -1,12 +1,67 @@
 import sys
-from PyQt6 import QtWidgets
-from gui.annotation_tool import AnnotationTool
+import time
+import argparse
+from utils.frame_source import DEFAULT_PROXY_WIDTH
+from utils.instrumentation import RECORDER
+
+STARTUP_TIMEOUT = 60.0  # seconds --startup-time waits for --reopen to finish
 
 def main():
-    app = QtWidgets.QApplication(sys.argv)
-    window = AnnotationTool()
+    parser = argparse.ArgumentParser(description="Pitch keypoint annotation tool.")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Record timing spans from startup and write a Chrome trace to PATH on exit.")
+    parser.add_argument("--proxy-width", type=int, default=DEFAULT_PROXY_WIDTH,
+                        help="Display frames wider than this from downscaled proxies (0 disables).")
+    parser.add_argument("--reopen", action="store_true",
+                        help="Reopen the last video and session (or project).")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Print how long start-up takes and where the time goes, then exit.")
+    args, qt_args = parser.parse_known_args()
+    if args.trace:
+        RECORDER.enable()
+    profile = None
+    if args.startup_time:
+        from utils.startup_profile import StartupProfile
+        profile = StartupProfile()
+        profile.install()
+
+    # Imported after parsing the arguments so --startup-time can time them
+    from PyQt6 import QtWidgets
+    if profile:
+        profile.phase("import PyQt6")
+    from gui.annotation_tool import AnnotationTool
+    if profile:
+        profile.phase("import the annotation tool")
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    if profile:
+        profile.phase("create the application")
+    window = AnnotationTool(proxy_width=args.proxy_width or None)
+    if profile:
+        profile.phase("build the window")
     window.show()
-    sys.exit(app.exec())
+    if profile:
+        # Paints the window and runs the deferred widget construction
+        app.processEvents()
+        profile.phase("show the window")
+        # Worker threads import while reopening, which the import hook does not track
+        profile.uninstall()
+    if args.reopen:
+        window.reopen_last()
+        if profile:
+            deadline = time.perf_counter() + STARTUP_TIMEOUT
+            while window.scheduler.active_jobs() and time.perf_counter() < deadline:
+                app.processEvents()
+                time.sleep(0.005)
+            app.processEvents()
+            profile.phase("reopen the last video and session")
+    if profile:
+        profile.report()
+        window.close()
+        sys.exit(0)
+    status = app.exec()
+    if args.trace:
+        RECORDER.export_chrome_trace(args.trace)
+    sys.exit(status)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,303 @@
+"""
+Export annotated frames as COCO-keypoints or YOLO-pose training datasets.
+
+Frames and annotations are streamed: annotations come from
+AnnotationStore/ProjectSessionView.iter_frames(), COCO JSON is written record by
+record, and images are copied or resized by a process pool with a bounded number
+of chunks in flight, so memory stays flat for sessions of any length.
+
+Layout written to output_dir:
+
+    coco:  images/{train,val}/<frame>  annotations/{train,val}.json
+    yolo:  images/{train,val}/<frame>  labels/{train,val}/<frame stem>.txt  data.yaml
+"""
+import os
+import json
+import zlib
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import cv2
+import numpy as np
+from data.annotation_store import KEYPOINT_NAMES, NUM_KEYPOINTS, PREDICTED, VISIBLE
+from data.keypoints_data import CONNECTIONS, KEYPOINTS_DATA
+from utils.frame_source import fit_width, open_frame_source
+
+EXPORT_FORMATS = ("coco", "yolo")
+SPLITS = ("train", "val")
+CATEGORY_NAME = "pitch"
+DEFAULT_CHUNK_FRAMES = 256
+# What to do with PREDICTED points nobody has confirmed: export them as labelled,
+# export them as unlabelled (visibility 0), or leave out frames that have any
+PREDICTED_MODES = ("keep", "drop", "skip")
+
+def split_of(frame_name, val_fraction, seed=0):
+    """
+    Deterministically assign a frame to "train" or "val" from a hash of its name,
+    so the split is stable across runs and needs no global shuffle.
+    """
+    if val_fraction <= 0:
+        return "train"
+    bucket = zlib.crc32(f"{seed}:{frame_name}".encode()) / 2**32
+    return "val" if bucket < val_fraction else "train"
+
+def flip_index():
+    """
+    Keypoint index each keypoint maps to when the image is mirrored left-right
+    (the flip_idx of YOLO-pose), derived from the pitch coordinates.
+    """
+    position = {(x, y): i for i, (_, x, y, _) in enumerate(KEYPOINTS_DATA)}
+    return [position.get((105 - x, y), i) for i, (_, x, y, _) in enumerate(KEYPOINTS_DATA)]
+
+def keypoint_bbox(points, width, height):
+    """
+    Bounding box (x, y, w, h) of the points, clipped to the image; None if there are none.
+    """
+    if len(points) == 0:
+        return None
+    x0, y0 = np.clip(points.min(axis=0), 0, [width, height])
+    x1, y1 = np.clip(points.max(axis=0), 0, [width, height])
+    return float(x0), float(y0), float(x1 - x0), float(y1 - y0)
+
+def coco_record(values, scale, width, height, image_id, annotation_id):
+    """
+    Build the COCO annotation of one frame; COCO visibility 2 marks labelled points.
+    """
+    visible = values[:, VISIBLE] > 0
+    keypoints = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float64)
+    keypoints[visible, :2] = values[visible, :2] * scale
+    keypoints[visible, 2] = 2
+    bbox = keypoint_bbox(keypoints[visible, :2], width, height) or (0.0, 0.0, 0.0, 0.0)
+    return {
+        "id": annotation_id,
+        "image_id": image_id,
+        "category_id": 1,
+        "keypoints": [round(v, 2) for v in keypoints.reshape(-1).tolist()],
+        "num_keypoints": int(np.count_nonzero(visible)),
+        "bbox": [round(v, 2) for v in bbox],
+        "area": round(bbox[2] * bbox[3], 2),
+        "iscrowd": 0,
+    }
+
+def yolo_label(values, scale, width, height):
+    """
+    Build the YOLO-pose label line of one frame (class, normalised box, then x y v per keypoint),
+    or "" if no keypoint is visible.
+    """
+    visible = values[:, VISIBLE] > 0
+    points = values[:, :2] * scale
+    bbox = keypoint_bbox(points[visible], width, height)
+    if bbox is None:
+        return ""
+    x, y, w, h = bbox
+    fields = ["0", f"{(x + w / 2) / width:.6f}", f"{(y + h / 2) / height:.6f}", f"{w / width:.6f}", f"{h / height:.6f}"]
+    for k in range(NUM_KEYPOINTS):
+        if visible[k]:
+            fields += [f"{points[k, 0] / width:.6f}", f"{points[k, 1] / height:.6f}", "2"]
+        else:
+            fields += ["0", "0", "0"]
+    return " ".join(fields) + "\n"
+
+def _export_images(source_path, items, max_width, jpeg_quality):
+    """
+    Write the frames of items [(frame index, destination path)] resized to max_width.
+    Runs in a worker process; returns the number of images written.
+    """
+    source = open_frame_source(source_path, cache_bytes=0)
+    written = 0
+    try:
+        for index, path in items:
+            # Folder frames that need no resizing or re-encoding are copied as is
+            src = getattr(source, "paths", None)
+            if src is not None and max_width is None and os.path.splitext(src[index])[1] == os.path.splitext(path)[1]:
+                shutil.copyfile(src[index], path)
+                written += 1
+                continue
+            frame = source.read(index)
+            if frame is None:
+                continue
+            frame = fit_width(frame, max_width) if max_width else frame
+            if cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]):
+                written += 1
+    finally:
+        source.close()
+    return written
+
+def _write_data_yaml(output_dir):
+    names = ", ".join(f"'{n}'" for n in KEYPOINT_NAMES)
+    with open(os.path.join(output_dir, "data.yaml"), "w") as f:
+        f.write(f"path: {os.path.abspath(output_dir)}\n")
+        f.write("train: images/train\n")
+        f.write("val: images/val\n")
+        f.write(f"kpt_shape: [{NUM_KEYPOINTS}, 3]\n")
+        f.write(f"flip_idx: {flip_index()}\n")
+        f.write(f"names:\n  0: {CATEGORY_NAME}\n")
+        f.write(f"kpt_names: [{names}]\n")
+
+class _CocoWriter:
+    """
+    Streams one COCO split to disk: images are written straight into the output
+    file while annotations go to a temporary file appended at the end.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w")
+        self.pending = tempfile.TemporaryFile("w+", dir=os.path.dirname(path))
+        self.images = 0
+        self.annotations = 0
+        self.file.write('{"info": {"description": "Pitch keypoints"}, "images": [')
+
+    def add(self, image, annotation):
+        self.file.write((",\n" if self.images else "\n") + json.dumps(image))
+        self.images += 1
+        if annotation is not None:
+            self.pending.write((",\n" if self.annotations else "\n") + json.dumps(annotation))
+            self.annotations += 1
+
+    def close(self):
+        category = {
+            "id": 1,
+            "name": CATEGORY_NAME,
+            "supercategory": CATEGORY_NAME,
+            "keypoints": KEYPOINT_NAMES,
+            "skeleton": [list(c) for c in CONNECTIONS],
+        }
+        self.file.write('\n], "annotations": [')
+        self.pending.seek(0)
+        shutil.copyfileobj(self.pending, self.file)
+        self.pending.close()
+        self.file.write(f'\n], "categories": [{json.dumps(category)}]}}\n')
+        self.file.close()
+
+def export_dataset(session, source_path, output_dir, fmt="coco", val_fraction=0.1, seed=0,
+                   max_width=None, jpeg_quality=95, workers=None,
+                   chunk_frames=DEFAULT_CHUNK_FRAMES, predicted="keep", progress=None):
+    """
+    Export the annotated frames of a session as a training dataset.
+
+    Args:
+        session: AnnotationStore or ProjectSessionView (anything with iter_frames()).
+        source_path (str): Video, frame store or frames folder the session annotates.
+        output_dir (str): Dataset root folder.
+        fmt (str): "coco" or "yolo".
+        val_fraction (float): Fraction of frames assigned to the validation split.
+        seed (int): Changes the (deterministic) train/val assignment.
+        max_width (int): Downscale images (and keypoints) to at most this width.
+        jpeg_quality (int): JPEG quality of written images.
+        workers (int): Image worker processes (default: CPU count). 1 runs inline.
+        chunk_frames (int): Frames per image job.
+        predicted (str): How unconfirmed PREDICTED points are exported: "keep"
+            (default) labels them like confirmed points, "drop" exports only the
+            confirmed points of each frame, and "skip" leaves out frames that
+            still have predicted points. Frames left with no confirmed point by
+            "drop" are not exported either.
+        progress (callable): Called as progress(done_frames, total_frames).
+
+    Returns:
+        dict: Number of frames exported per split.
+
+    Raises:
+        ValueError: If the format or predicted mode is unknown or the source has no readable frames.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported dataset format: {fmt}")
+    if predicted not in PREDICTED_MODES:
+        raise ValueError(f"predicted must be one of {', '.join(PREDICTED_MODES)}, not {predicted!r}")
+    source = open_frame_source(source_path, cache_bytes=0)
+    try:
+        frame_size = source.frame_size()
+        index_of = {source.frame_name(i): i for i in range(len(source))}
+    finally:
+        source.close()
+    if frame_size is None:
+        raise ValueError(f"No readable frames in {source_path}")
+    scale = min(1.0, max_width / frame_size[0]) if max_width else 1.0
+    width = int(round(frame_size[0] * scale))
+    height = int(round(frame_size[1] * scale))
+    total = len(session)
+
+    for split in SPLITS:
+        os.makedirs(os.path.join(output_dir, "images", split), exist_ok=True)
+        if fmt == "yolo":
+            os.makedirs(os.path.join(output_dir, "labels", split), exist_ok=True)
+    writers = {}
+    if fmt == "coco":
+        os.makedirs(os.path.join(output_dir, "annotations"), exist_ok=True)
+        writers = {s: _CocoWriter(os.path.join(output_dir, "annotations", f"{s}.json")) for s in SPLITS}
+    else:
+        _write_data_yaml(output_dir)
+
+    counts = {s: 0 for s in SPLITS}
+    done = 0
+    chunk = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    in_flight = set()
+    max_in_flight = 2 * (workers or os.cpu_count() or 1)
+
+    def submit(items):
+        nonlocal done
+        # Frame order keeps video decoding sequential within a chunk
+        items.sort()
+        if pool is None:
+            _export_images(source_path, items, max_width, jpeg_quality)
+            done += len(items)
+            if progress:
+                progress(done, total)
+            return
+        # Bound the queued work so memory does not grow with the session
+        while len(in_flight) >= max_in_flight:
+            collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        future = pool.submit(_export_images, source_path, items, max_width, jpeg_quality)
+        future.frames = len(items)
+        in_flight.add(future)
+
+    def collect(finished):
+        nonlocal done
+        for future in finished:
+            in_flight.discard(future)
+            future.result()
+            done += future.frames
+            if progress:
+                progress(done, total)
+
+    try:
+        for frame_name, values in session.iter_frames():
+            index = index_of.get(frame_name)
+            if index is None:
+                continue
+            unconfirmed = values[:, VISIBLE] == PREDICTED
+            if predicted != "keep" and unconfirmed.any():
+                # An unreviewed frame must not become a training image without keypoints
+                if predicted == "skip" or not (values[:, VISIBLE] > 0)[~unconfirmed].any():
+                    continue
+                values = values.copy()
+                values[unconfirmed] = (np.nan, np.nan, 0)
+            split = split_of(frame_name, val_fraction, seed)
+            image_name = os.path.splitext(frame_name)[0] + ".jpg"
+            chunk.append((index, os.path.join(output_dir, "images", split, image_name)))
+            counts[split] += 1
+            if fmt == "coco":
+                image_id = index + 1
+                writer = writers[split]
+                annotation = None
+                if (values[:, VISIBLE] > 0).any():
+                    annotation = coco_record(values, scale, width, height, image_id, writer.annotations + 1)
+                writer.add({"id": image_id, "file_name": image_name, "width": width, "height": height},
+                           annotation)
+            else:
+                label_path = os.path.join(output_dir, "labels", split, os.path.splitext(frame_name)[0] + ".txt")
+                with open(label_path, "w") as f:
+                    f.write(yolo_label(values, scale, width, height))
+            if len(chunk) >= chunk_frames:
+                submit(chunk)
+                chunk = []
+        if chunk:
+            submit(chunk)
+        if in_flight:
+            collect(wait(in_flight).done)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if pool is not None:
+            pool.shutdown()
+    return counts
@@ -0,0 +1,254 @@
+"""
+Content-addressed cache of extracted frames.
+
+Each extraction is stored in <cache root>/<key>/, where key hashes a fast
+fingerprint of the video's contents together with the extraction parameters,
+so extracting the same video with the same settings again reuses the frames
+straight away, wherever the video has been moved or copied to, and different
+videos or settings never share a folder:
+
+    cache = ExtractionCache()
+    folder, manifest, reused = cache.extract("match.mp4", proxy_width=1920, detect_cuts=True)
+
+Each entry holds the frames and manifest written by extract_frames, which also
+lets an interrupted extraction resume, plus entry.json with the source video,
+the parameters, the size on disk and when the entry was last used. Once the
+cache grows past max_bytes, the least recently used entries are deleted.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import logging
+import threading
+
+DEFAULT_CACHE_BYTES = 20 * 2**30
+CACHE_ENV = "PITCH_EXTRACTION_CACHE"  # overrides the default cache folder
+ENTRY_NAME = "entry.json"
+# The fingerprint hashes the file size and this many evenly spaced samples, including the first and last bytes
+FINGERPRINT_SAMPLES = 8
+FINGERPRINT_SAMPLE_BYTES = 1 << 20
+# Incomplete entries unused for this long are taken to be abandoned and may be evicted
+STALE_SECONDS = 24 * 3600
+# extract_frames arguments that do not change what is extracted
+RUN_ARGUMENTS = ("video_path", "output_folder", "workers", "chunk_frames", "progress", "should_stop")
+
+_lock = threading.Lock()
+
+def default_cache_dir():
+    """
+    Return the cache folder: $PITCH_EXTRACTION_CACHE, else extractions/ under the
+    user cache folder ($XDG_CACHE_HOME or ~/.cache).
+    """
+    if os.environ.get(CACHE_ENV):
+        return os.environ[CACHE_ENV]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "pitch-annotation-tool", "extractions")
+
+def video_fingerprint(video_path):
+    """
+    Hash the size of a file and a few evenly spaced 1 MiB samples of it.
+
+    Reading at most FINGERPRINT_SAMPLES MiB takes milliseconds even for hours of
+    video, while any re-encode, trim or different recording changes the result.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    if size <= FINGERPRINT_SAMPLES * FINGERPRINT_SAMPLE_BYTES:
+        offsets = [0]
+        sample_bytes = size
+    else:
+        last = size - FINGERPRINT_SAMPLE_BYTES
+        offsets = [last * i // (FINGERPRINT_SAMPLES - 1) for i in range(FINGERPRINT_SAMPLES)]
+        sample_bytes = FINGERPRINT_SAMPLE_BYTES
+    with open(video_path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+def extraction_params(**options):
+    """
+    Return every extract_frames parameter that changes the output, with the
+    defaults filled in, so equivalent calls give the same cache key.
+    """
+    from utils.frame_extractor import extract_frames
+    bound = inspect.signature(extract_frames).bind_partial(None, None, **options)
+    bound.apply_defaults()
+    return {name: value for name, value in bound.arguments.items() if name not in RUN_ARGUMENTS}
+
+def cache_key(fingerprint, params):
+    payload = json.dumps({"video": fingerprint, "params": params}, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+def folder_bytes(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _load_entry(folder):
+    try:
+        with open(os.path.join(folder, ENTRY_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_entry(folder, entry):
+    path = os.path.join(folder, ENTRY_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f, indent=2)
+    os.replace(tmp_path, path)
+
+def cached_video_path(folder):
+    """
+    Return the video a cache entry folder was extracted from, or None if folder
+    is not a cache entry.
+    """
+    entry = _load_entry(folder)
+    return entry.get("video") if entry else None
+
+class ExtractionCache:
+    """
+    Frames extracted by extract_frames, stored by video content and parameters,
+    with least-recently-used eviction above max_bytes.
+    """
+    def __init__(self, root=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def entry_folder(self, key):
+        return os.path.join(self.root, key)
+
+    def key(self, video_path, **options):
+        return cache_key(video_fingerprint(video_path), extraction_params(**options))
+
+    def lookup(self, video_path, **options):
+        """
+        Return the folder of a complete extraction of video_path with these
+        extract_frames options, or None if there is none yet.
+        """
+        folder = self.entry_folder(self.key(video_path, **options))
+        entry = _load_entry(folder)
+        if entry is None or not entry.get("complete"):
+            return None
+        self._touch(folder, entry)
+        return folder
+
+    def extract(self, video_path, progress=None, should_stop=None, workers=None, keep=(), **options):
+        """
+        Extract video_path into the cache, or reuse an earlier extraction.
+
+        Args:
+            video_path (str): Path to the video file.
+            progress (callable): Passed on to extract_frames.
+            should_stop (callable): Passed on to extract_frames; a stopped
+                extraction resumes on the next call with the same options.
+            workers (int): Passed on to extract_frames.
+            keep (iterable): Entry folders in use elsewhere, which eviction after
+                the extraction must not delete.
+            **options: extract_frames parameters (stride, fmt, proxy_width, ...).
+
+        Returns:
+            tuple: (entry folder, extraction manifest, True if it was reused
+            without extracting anything).
+        """
+        from utils.frame_extractor import extract_frames, load_manifest
+        params = extraction_params(**options)
+        fingerprint = video_fingerprint(video_path)
+        folder = self.entry_folder(cache_key(fingerprint, params))
+        entry = _load_entry(folder)
+        if entry is not None and entry.get("complete"):
+            manifest = load_manifest(folder)
+            if manifest is not None and manifest.get("complete"):
+                # The same contents may have been opened from another path since
+                entry["video"] = os.path.abspath(video_path)
+                self._touch(folder, entry)
+                return folder, manifest, True
+        os.makedirs(folder, exist_ok=True)
+        now = time.time()
+        entry = {
+            "video": os.path.abspath(video_path),
+            "fingerprint": fingerprint,
+            "params": params,
+            "complete": False,
+            "bytes": 0,
+            "created": now,
+            "last_used": now,
+        }
+        _save_entry(folder, entry)
+        try:
+            manifest = extract_frames(video_path, folder, workers=workers, progress=progress,
+                                      should_stop=should_stop, **options)
+        except Exception:
+            if load_manifest(folder) is None:
+                # Nothing was extracted (e.g. invalid parameters), so leave no entry behind
+                shutil.rmtree(folder, ignore_errors=True)
+            raise
+        entry["complete"] = manifest["complete"]
+        entry["bytes"] = folder_bytes(folder)
+        entry["last_used"] = time.time()
+        _save_entry(folder, entry)
+        if manifest["complete"]:
+            self.evict(keep=(folder,) + tuple(keep))
+        return folder, manifest, False
+
+    def _touch(self, folder, entry):
+        entry["last_used"] = time.time()
+        try:
+            _save_entry(folder, entry)
+        except OSError as e:
+            logging.warning("Could not update %s: %s", folder, e)
+
+    def entries(self):
+        """
+        Return (folder, entry) for every cache entry, least recently used first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in os.listdir(self.root):
+            folder = os.path.join(self.root, name)
+            entry = _load_entry(folder) if os.path.isdir(folder) else None
+            if entry is not None:
+                found.append((folder, entry))
+        return sorted(found, key=lambda item: item[1].get("last_used", 0))
+
+    def total_bytes(self):
+        return sum(entry.get("bytes", 0) for _, entry in self.entries())
+
+    def evict(self, max_bytes=None, keep=()):
+        """
+        Delete least recently used entries until the cache is at most max_bytes
+        (default: self.max_bytes). Entries in keep are never deleted, nor are
+        incomplete ones used in the last STALE_SECONDS, which may still be being
+        extracted.
+
+        Returns:
+            list: The deleted entry folders.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        keep = {os.path.abspath(folder) for folder in keep}
+        stale = time.time() - STALE_SECONDS
+        with _lock:
+            entries = self.entries()
+            total = sum(entry.get("bytes", 0) for _, entry in entries)
+            removed = []
+            for folder, entry in entries:
+                if total <= max_bytes:
+                    break
+                if os.path.abspath(folder) in keep:
+                    continue
+                if not entry.get("complete") and entry.get("last_used", 0) > stale:
+                    continue
+                shutil.rmtree(folder, ignore_errors=True)
+                total -= entry.get("bytes", 0)
+                removed.append(folder)
+        return removed
@@ -1,16 +1,301 @@
 import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import cv2
+import numpy as np
+from utils.frame_source import PROXY_FOLDER, fit_width, frame_name
+from utils.frame_store import HEADER_NAME, create_frame_store, is_frame_store, open_store_arrays
+from utils.shot_detection import DEFAULT_CUT_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD, ShotDetector
 
-def extract_frames(video_path, output_folder):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+MANIFEST_NAME = "manifest.json"
+FORMAT_EXTENSIONS = {"jpg": "jpg", "png": "png", "raw": "npy", "store": None}
+DEFAULT_CHUNK_FRAMES = 250
+
+def _write_frame(path, frame, fmt, jpeg_quality, png_compression):
+    if fmt == "raw":
+        np.save(path, frame)
+        return True
+    if fmt == "png":
+        return cv2.imwrite(path, frame, [cv2.IMWRITE_PNG_COMPRESSION, png_compression])
+    return cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+
+def _extract_chunk(video_path, output_folder, start, end, stride, frame_count,
+                   fmt, jpeg_quality, png_compression, proxy_width=None, shots=None, prime=False):
+    """
+    Decode frames [start, end) of the video and write every `stride`-th one, plus
+    its display proxy if proxy_width is set. Runs in a worker process.
+
+    With shots ({"cut_threshold", "duplicate_threshold", "drop_duplicates"}) the
+    kept frames are analysed for shot cuts and near-duplicates; if prime is set,
+    the kept frame before the chunk is decoded too so that a cut on the chunk
+    boundary is found.
+
+    Returns:
+        tuple: (frames written, {"cuts": [frame index], "dropped": count} or None).
+    """
     cap = cv2.VideoCapture(video_path)
-    frame_count = 0
-    while True:
+    detector = None
+    if shots is not None:
+        detector = ShotDetector(shots["cut_threshold"], shots["duplicate_threshold"])
+    first = start - stride if detector is not None and prime else start
+    if first > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    if first < start:
+        ret, frame = cap.read()
+        if ret:
+            detector.prime(frame)
+        for _ in range(stride - 1):
+            cap.grab()
+    ext = FORMAT_EXTENSIONS[fmt]
+    if fmt == "store":
+        store_bgr, store_gray = open_store_arrays(output_folder, mode="r+")
+        with open(os.path.join(output_folder, HEADER_NAME), "r") as f:
+            store_start = json.load(f)["start_frame"]
+    written = 0
+    cuts = []
+    dropped = 0
+    for index in range(start, end):
+        if (index - start) % stride:
+            # grab() advances the decoder without the cost of converting the frame
+            if not cap.grab():
+                break
+            continue
         ret, frame = cap.read()
         if not ret:
             break
-        frame_count += 1
-        filename = os.path.join(output_folder, f"image{frame_count:03d}.jpg")
-        cv2.imwrite(filename, frame)
+        if detector is not None:
+            cut, duplicate = detector.update(frame)
+            if cut:
+                cuts.append(index)
+            if duplicate and shots["drop_duplicates"]:
+                dropped += 1
+                continue
+        if fmt == "store":
+            slot = (index - store_start) // stride
+            store_bgr[slot] = frame
+            store_gray[slot] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            written += 1
+            continue
+        name = frame_name(index, frame_count, ext)
+        if _write_frame(os.path.join(output_folder, name), frame, fmt, jpeg_quality, png_compression):
+            written += 1
+        if proxy_width and frame.shape[1] > proxy_width:
+            _write_frame(os.path.join(output_folder, PROXY_FOLDER, name), fit_width(frame, proxy_width),
+                         fmt, jpeg_quality, png_compression)
+    cap.release()
+    if fmt == "store":
+        store_bgr.flush()
+        store_gray.flush()
+    return written, ({"cuts": cuts, "dropped": dropped} if detector is not None else None)
+
+def load_manifest(output_folder):
+    """
+    Return the extraction manifest in output_folder, or None if there is none.
+    """
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.warning("Ignoring unreadable extraction manifest: %s", path)
+        return None
+
+def _save_manifest(output_folder, manifest):
+    # Write to a temporary file and rename so an interrupted save never leaves a
+    # truncated manifest behind.
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def plan_chunks(start_frame, end_frame, stride, chunk_frames=DEFAULT_CHUNK_FRAMES):
+    """
+    Split [start_frame, end_frame) into chunks of about chunk_frames frames.
+    Chunk boundaries are aligned to the stride so every chunk starts on a kept frame.
+    """
+    step = max(stride, (chunk_frames // stride) * stride)
+    return [(s, min(s + step, end_frame)) for s in range(start_frame, end_frame, step)]
+
+def extract_frames(video_path, output_folder, stride=1, start_time=None, end_time=None,
+                   fmt="jpg", jpeg_quality=95, png_compression=3, workers=None,
+                   chunk_frames=DEFAULT_CHUNK_FRAMES, proxy_width=None, detect_cuts=False,
+                   drop_duplicates=False, cut_threshold=DEFAULT_CUT_THRESHOLD,
+                   duplicate_threshold=DEFAULT_DUPLICATE_THRESHOLD, progress=None, should_stop=None):
+    """
+    Extract frames from a video into output_folder using a pool of worker processes.
+
+    The selected frame range is split into chunks that are decoded independently.
+    A manifest in output_folder records the extraction parameters and the
+    completed chunks, so calling this again after an interruption only extracts
+    the chunks that are still missing.
+
+    With detect_cuts, the kept frames are analysed with utils.shot_detection as
+    they are decoded: the manifest lists the frames that start a new shot under
+    "cuts" (video frame indices) and "cut_frames" (frame names), which
+    propagation uses to stop at camera cuts. drop_duplicates also skips writing
+    frames that nearly repeat the last frame written.
+
+    Args:
+        video_path (str): Path to the video file.
+        output_folder (str): Folder that receives the frames and the manifest.
+        stride (int): Keep every stride-th frame.
+        start_time (float): Start of the range in seconds (default: beginning).
+        end_time (float): End of the range in seconds (default: end of video).
+        fmt (str): "jpg", "png", "raw" (one uncompressed .npy per frame) or "store"
+            (a memory-mapped frame store with a grayscale plane, see utils.frame_store).
+        jpeg_quality (int): JPEG quality, 0-100.
+        png_compression (int): PNG compression level, 0-9.
+        workers (int): Number of worker processes (default: CPU count). 1 runs inline.
+        chunk_frames (int): Approximate number of frames per chunk.
+        proxy_width (int): Also write display proxies at most this wide into the
+            "proxies" sub-folder (image formats only; frames already narrow enough get none).
+        detect_cuts (bool): Record the shot cuts in the manifest.
+        drop_duplicates (bool): Skip near-duplicate frames (image formats only); implies detect_cuts.
+        cut_threshold (float): Cut score above which a frame starts a new shot.
+        duplicate_threshold (float): Mean thumbnail difference up to which a frame is a duplicate.
+        progress (callable): Called as progress(done_frames, total_frames) after each chunk.
+        should_stop (callable): Polled between chunks; when it returns True, chunks
+            not started yet are skipped and the manifest is returned incomplete, to
+            be resumed by a later call.
+
+    Returns:
+        dict: The extraction manifest.
+
+    Raises:
+        ValueError: If the video cannot be opened or the parameters are invalid.
+    """
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unsupported frame format: {fmt}")
+    if stride < 1:
+        raise ValueError("Stride must be at least 1.")
+    if drop_duplicates and fmt == "store":
+        raise ValueError("Near-duplicate frames cannot be dropped from a frame store, whose slots are fixed.")
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     cap.release()
+
+    start_frame = int(round(start_time * fps)) if start_time is not None and fps else 0
+    end_frame = int(round(end_time * fps)) if end_time is not None and fps else frame_count
+    start_frame = max(0, start_frame)
+    end_frame = min(frame_count, end_frame)
+
+    params = {
+        "stride": stride,
+        "start_frame": start_frame,
+        "end_frame": end_frame,
+        "format": fmt,
+        "jpeg_quality": jpeg_quality,
+        "png_compression": png_compression,
+    }
+    if proxy_width and fmt != "store":
+        params["proxy_width"] = proxy_width
+    if detect_cuts or drop_duplicates:
+        params["shots"] = {
+            "cut_threshold": cut_threshold,
+            "duplicate_threshold": duplicate_threshold,
+            "drop_duplicates": drop_duplicates,
+        }
+    stat = os.stat(video_path)
+    video_info = {
+        "path": os.path.abspath(video_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "frame_count": frame_count,
+        "fps": fps,
+    }
+
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    if "proxy_width" in params:
+        os.makedirs(os.path.join(output_folder, PROXY_FOLDER), exist_ok=True)
+
+    manifest = load_manifest(output_folder)
+    if manifest is None or manifest.get("video") != video_info or manifest.get("params") != params:
+        manifest = {"video": video_info, "params": params, "completed_chunks": [], "complete": False}
+        if "shots" in params:
+            manifest.update({"cuts": [], "cut_frames": [], "dropped_frames": 0})
+        if fmt == "store":
+            create_frame_store(output_folder, len(range(start_frame, end_frame, stride)), height, width,
+                               fps=fps, source_frame_count=frame_count, start_frame=start_frame, stride=stride)
+    elif fmt == "store" and not is_frame_store(output_folder):
+        raise ValueError(f"Manifest found but frame store is missing in {output_folder}")
+    chunks = plan_chunks(start_frame, end_frame, stride, chunk_frames)
+    done = {tuple(c) for c in manifest["completed_chunks"]}
+    pending = [c for c in chunks if c not in done]
+
+    def kept(chunk):
+        return len(range(chunk[0], chunk[1], stride))
+
+    total = sum(kept(c) for c in chunks)
+    done_frames = total - sum(kept(c) for c in pending)
+    if progress:
+        progress(done_frames, total)
+
+    name_ext = FORMAT_EXTENSIONS[fmt] or "jpg"
+
+    def finish_chunk(chunk, analysis):
+        nonlocal done_frames
+        if analysis is not None:
+            manifest["cuts"] = sorted(manifest["cuts"] + analysis["cuts"])
+            manifest["cut_frames"] = [frame_name(i, frame_count, name_ext) for i in manifest["cuts"]]
+            manifest["dropped_frames"] += analysis["dropped"]
+        manifest["completed_chunks"].append(list(chunk))
+        _save_manifest(output_folder, manifest)
+        done_frames += kept(chunk)
+        if progress:
+            progress(done_frames, total)
+
+    args = (stride, frame_count, fmt, jpeg_quality, png_compression, params.get("proxy_width"), params.get("shots"))
+    if workers == 1 or len(pending) <= 1:
+        for chunk in pending:
+            if should_stop and should_stop():
+                break
+            _, analysis = _extract_chunk(video_path, output_folder, chunk[0], chunk[1], *args,
+                                         prime=chunk[0] > start_frame)
+            finish_chunk(chunk, analysis)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_extract_chunk, video_path, output_folder, chunk[0], chunk[1], *args,
+                            prime=chunk[0] > start_frame): chunk
+                for chunk in pending
+            }
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                _, analysis = future.result()
+                finish_chunk(futures[future], analysis)
+                if should_stop and should_stop():
+                    # Running chunks finish; the others are left for a resume
+                    for other in futures:
+                        other.cancel()
+
+    if len(manifest["completed_chunks"]) < len(chunks):
+        return manifest  # stopped early
+    manifest["complete"] = True
+    _save_manifest(output_folder, manifest)
+    return manifest
+
+def extracted_cut_indices(frame_source):
+    """
+    Return the source indices of the frames that start a new shot, as recorded
+    by extract_frames(detect_cuts=True), or None if the source was not analysed.
+    """
+    path = getattr(frame_source, "path", None)
+    if path is None or not os.path.isdir(path):
+        return None
+    manifest = load_manifest(path)
+    if manifest is None or "cut_frames" not in manifest:
+        return None
+    cut_frames = set(manifest["cut_frames"])
+    return {i for i in range(len(frame_source)) if frame_source.frame_name(i) in cut_frames}
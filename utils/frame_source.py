@@ -0,0 +1,266 @@
+# utils/frame_source.py
+import os
+import threading
+from collections import OrderedDict
+from utils.instrumentation import count, span
+from utils.lazy_import import lazy_import
+
+# Not needed until a frame is decoded; see utils.lazy_import
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".npy")
+# Display proxies are downscaled to at most this width; 1080p and smaller frames are shown as is
+DEFAULT_PROXY_WIDTH = 1920
+# Sub-folder of an extracted frames folder holding pre-generated proxies with the same file names
+PROXY_FOLDER = "proxies"
+
+def frame_name(index, frame_count, ext="jpg"):
+    """
+    Return the session key for a 0-based frame index.
+
+    Names match the ones the frame extractor writes ("image001.jpg", ...), padded
+    to enough digits for frame_count so that they also sort correctly.
+    """
+    width = max(3, len(str(frame_count)))
+    return f"image{index + 1:0{width}d}.{ext}"
+
+def fit_width(frame, max_width):
+    """
+    Downscale frame (keeping its aspect ratio) so it is at most max_width pixels wide.
+    """
+    if frame is None or frame.shape[1] <= max_width:
+        return frame
+    height = max(1, round(frame.shape[0] * max_width / frame.shape[1]))
+    return cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+
+class FrameCache:
+    """
+    Thread-safe LRU cache of decoded frames bounded by a total byte budget.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            frame = self._items.get(key)
+            if frame is not None:
+                self._items.move_to_end(key)
+            return frame
+
+    def put(self, key, frame):
+        size = frame.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._items[key] = frame
+            self.nbytes += size
+            # Evict least recently used frames until we are back under budget
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+class FrameSource:
+    """
+    Random access to the frames of a video, decoded on demand.
+
+    Subclasses implement _decode(index) (BGR) and may override _decode_gray(index).
+    Decoded frames are kept in a shared FrameCache so that repeated reads of the
+    same frame (display, then prediction) only decode once.
+    """
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.cache = FrameCache(cache_bytes)
+        self.fps = 0.0
+        self._frame_size = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def frame_name(self, index):
+        return frame_name(index, len(self))
+
+    def frame_size(self):
+        """
+        Return the full-resolution (width, height) of the frames, or None if no frame decodes.
+        """
+        if self._frame_size is None and len(self):
+            frame = self.read(0)
+            if frame is not None:
+                self._frame_size = (frame.shape[1], frame.shape[0])
+        return self._frame_size
+
+    def read_proxy(self, index, max_width=DEFAULT_PROXY_WIDTH):
+        """
+        Return frame `index` as a BGR array at most max_width pixels wide, for display.
+        Frames that are already narrow enough are returned at full resolution.
+        """
+        if not 0 <= index < len(self):
+            return None
+        key = (index, "proxy", max_width)
+        frame = self.cache.get(key)
+        if frame is None:
+            with span("frame_source.decode_proxy", index=index):
+                frame = self._decode_proxy(index, max_width)
+            if frame is not None:
+                self.cache.put(key, frame)
+        return frame
+
+    def read(self, index):
+        """
+        Return frame `index` as a BGR uint8 array, or None if it cannot be decoded.
+        """
+        if not 0 <= index < len(self):
+            return None
+        frame = self.cache.get((index, "bgr"))
+        if frame is None:
+            count("frame_source.cache_miss")
+            with span("frame_source.decode", index=index):
+                frame = self._decode(index)
+            if frame is not None:
+                self.cache.put((index, "bgr"), frame)
+        return frame
+
+    def read_gray(self, index):
+        """
+        Return frame `index` as a grayscale uint8 array, or None if it cannot be decoded.
+        """
+        if not 0 <= index < len(self):
+            return None
+        frame = self.cache.get((index, "gray"))
+        if frame is None:
+            count("frame_source.cache_miss")
+            with span("frame_source.decode_gray", index=index):
+                frame = self._decode_gray(index)
+            if frame is not None:
+                self.cache.put((index, "gray"), frame)
+        return frame
+
+    def _decode(self, index):
+        raise NotImplementedError
+
+    def _decode_proxy(self, index, max_width):
+        return fit_width(self.read(index), max_width)
+
+    def _decode_gray(self, index):
+        frame = self.read(index)
+        if frame is None:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def close(self):
+        self.cache.clear()
+
+class VideoFrameSource(FrameSource):
+    """
+    Decodes frames straight from a video file with cv2.VideoCapture.
+
+    Sequential reads continue from the current decoder position; any other access
+    seeks first.
+    """
+    def __init__(self, video_path, cache_bytes=DEFAULT_CACHE_BYTES):
+        super().__init__(cache_bytes)
+        self.path = video_path
+        self._cap = cv2.VideoCapture(video_path)
+        if not self._cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+        self._frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self._frame_size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                            int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self._next_index = 0
+        # VideoCapture is not safe to use from several threads at once
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._frame_count
+
+    def _decode(self, index):
+        with self._lock:
+            if index != self._next_index:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = self._cap.read()
+            if not ret:
+                # Force a seek on the next read; the decoder position is unknown
+                self._next_index = -1
+                return None
+            self._next_index = index + 1
+            return frame
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._cap.release()
+
+class FolderFrameSource(FrameSource):
+    """
+    Reads frames from a folder of extracted images, sorted by filename.
+    """
+    def __init__(self, folder, cache_bytes=DEFAULT_CACHE_BYTES):
+        super().__init__(cache_bytes)
+        self.path = folder
+        self.paths = sorted(
+            os.path.join(folder, f)
+            for f in os.listdir(folder)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+
+    def __len__(self):
+        return len(self.paths)
+
+    def frame_name(self, index):
+        return os.path.basename(self.paths[index])
+
+    def _decode(self, index):
+        path = self.paths[index]
+        if path.endswith(".npy"):
+            return np.load(path)
+        return cv2.imread(path, cv2.IMREAD_COLOR)
+
+    def _decode_proxy(self, index, max_width):
+        path = self.paths[index]
+        proxy_path = os.path.join(self.path, PROXY_FOLDER, os.path.basename(path))
+        if os.path.exists(proxy_path):
+            frame = np.load(proxy_path) if proxy_path.endswith(".npy") else cv2.imread(proxy_path, cv2.IMREAD_COLOR)
+            if frame is not None:
+                return frame
+        size = self.frame_size()
+        if path.lower().endswith((".jpg", ".jpeg")) and size is not None and size[0] > max_width:
+            # libjpeg can decode at 1/2, 1/4 or 1/8 scale, skipping most of the work
+            for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                 (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if size[0] // factor >= max_width:
+                    return fit_width(cv2.imread(path, flag), max_width)
+        return super()._decode_proxy(index, max_width)
+
+    def _decode_gray(self, index):
+        if self.paths[index].endswith(".npy"):
+            return super()._decode_gray(index)
+        # Decoding straight to grayscale is cheaper than decoding colour and converting
+        return cv2.imread(self.paths[index], cv2.IMREAD_GRAYSCALE)
+
+def open_frame_source(path, cache_bytes=DEFAULT_CACHE_BYTES):
+    """
+    Open a video file, a frame store or a folder of extracted frames as a FrameSource.
+    """
+    # Imported here because frame_store builds on this module
+    from utils.frame_store import FrameStoreSource, is_frame_store
+    if is_frame_store(path):
+        return FrameStoreSource(path)
+    if os.path.isdir(path):
+        return FolderFrameSource(path, cache_bytes)
+    return VideoFrameSource(path, cache_bytes)
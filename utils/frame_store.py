@@ -0,0 +1,99 @@
+# utils/frame_store.py
+import os
+import json
+import numpy as np
+from utils.frame_source import FrameSource, frame_name
+
+HEADER_NAME = "header.json"
+BGR_NAME = "frames_bgr.npy"
+GRAY_NAME = "frames_gray.npy"
+FORMAT_VERSION = 1
+# Only display proxies go through the cache, since full frames are read straight from the map
+PROXY_CACHE_BYTES = 128 * 1024 * 1024
+
+def is_frame_store(path):
+    return os.path.isfile(os.path.join(path, HEADER_NAME))
+
+def create_frame_store(store_path, frame_count, height, width, fps=0.0,
+                       source_frame_count=None, start_frame=0, stride=1):
+    """
+    Allocate an empty frame store on disk.
+
+    The store is a folder holding a small JSON header and two .npy arrays that are
+    memory-mapped when read: frames_bgr.npy (N, H, W, 3) and frames_gray.npy (N, H, W).
+    Frame i of the store is frame start_frame + i * stride of the source video.
+
+    Returns:
+        dict: The header that was written.
+    """
+    if not os.path.exists(store_path):
+        os.makedirs(store_path)
+    header = {
+        "version": FORMAT_VERSION,
+        "frame_count": frame_count,
+        "height": height,
+        "width": width,
+        "fps": fps,
+        "source_frame_count": source_frame_count if source_frame_count is not None else frame_count,
+        "start_frame": start_frame,
+        "stride": stride,
+    }
+    # open_memmap writes the .npy header up front, so workers can map the files r+
+    bgr = np.lib.format.open_memmap(
+        os.path.join(store_path, BGR_NAME), mode="w+", dtype=np.uint8,
+        shape=(frame_count, height, width, 3))
+    gray = np.lib.format.open_memmap(
+        os.path.join(store_path, GRAY_NAME), mode="w+", dtype=np.uint8,
+        shape=(frame_count, height, width))
+    del bgr, gray
+    with open(os.path.join(store_path, HEADER_NAME), "w") as f:
+        json.dump(header, f, indent=2)
+    return header
+
+def open_store_arrays(store_path, mode="r"):
+    """
+    Memory-map the BGR and grayscale arrays of a frame store.
+    """
+    bgr = np.load(os.path.join(store_path, BGR_NAME), mmap_mode=mode)
+    gray = np.load(os.path.join(store_path, GRAY_NAME), mmap_mode=mode)
+    return bgr, gray
+
+class FrameStoreSource(FrameSource):
+    """
+    FrameSource over a memory-mapped frame store.
+
+    read() and read_gray() return views into the mapped arrays, so nothing is
+    decoded or copied and the decoded-frame cache is not used. The cache only
+    keeps display proxies, so each frame is resized once per proxy width.
+    """
+    def __init__(self, store_path, cache_bytes=PROXY_CACHE_BYTES):
+        super().__init__(cache_bytes)
+        self.path = store_path
+        with open(os.path.join(store_path, HEADER_NAME), "r") as f:
+            self.header = json.load(f)
+        self.fps = self.header.get("fps", 0.0)
+        self._bgr, self._gray = open_store_arrays(store_path)
+        self._frame_size = (self._bgr.shape[2], self._bgr.shape[1])
+
+    def __len__(self):
+        return self.header["frame_count"]
+
+    def frame_name(self, index):
+        # Use the source video's frame numbering so sessions match the video source
+        source_index = self.header["start_frame"] + index * self.header["stride"]
+        return frame_name(source_index, self.header["source_frame_count"])
+
+    def read(self, index):
+        if not 0 <= index < len(self):
+            return None
+        return self._bgr[index]
+
+    def read_gray(self, index):
+        if not 0 <= index < len(self):
+            return None
+        return self._gray[index]
+
+    def close(self):
+        super().close()
+        self._bgr = None
+        self._gray = None
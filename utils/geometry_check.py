@@ -0,0 +1,302 @@
+"""
+Session-wide geometric consistency check of keypoint annotations.
+
+The annotated points of every frame are compared with the pitch model: a
+homography from PITCH_POINTS to the image is fitted to all frames at once (a
+batched normalised DLT, reweighted a few times so that a single wrong point
+does not pull the fit) and each point's reprojection error is measured.
+Swapped left/right points and keypoints picked with the wrong digit shortcut
+show up as:
+
+    reprojection  a point far from where the fitted homography puts it
+                  (needs 5 or more points; 4 points are always fitted exactly)
+    mirrored      the fitted homography mirrors or folds the pitch, which no
+                  camera can do (needs 4 points spread over the pitch)
+    order         two points on one pitch line in the wrong left/right or
+                  far/near order in the image; this assumes the main broadcast
+                  camera, so it is only used for frames without a homography
+
+Everything is array arithmetic over chunks of frames; there is no per-frame
+Python loop, so a 100k-frame session is checked in seconds.
+"""
+import json
+import numpy as np
+from data.annotation_store import KEYPOINT_NAMES, NUM_KEYPOINTS, VISIBLE, X, Y
+from utils.homography import MIN_PITCH_SPREAD, PITCH_POINTS
+
+DEFAULT_MAX_ERROR = 10.0  # pixels
+ORDER_TOLERANCE = 2.0  # pixels two points may be out of order before it counts
+SAME_LINE_TOLERANCE = 0.5  # metres between pitch coordinates on "the same line"
+COLLINEAR_TOLERANCE = 0.1  # metres from a line for a keypoint to count as on it
+REWEIGHT_ITERATIONS = 3
+CHUNK_FRAMES = 8192  # frames fitted per batch, bounds the temporary arrays to ~100 MB
+
+# Reasons a frame is flagged, as bits of the "reasons" array
+REPROJECTION = 1
+MIRRORED = 2
+ORDER = 4
+REASON_NAMES = {REPROJECTION: "reprojection", MIRRORED: "mirrored", ORDER: "order"}
+
+def _ordered_pairs(along, across):
+    """
+    Index arrays (a, b) of the keypoints on one pitch line across `across` with
+    a before b along `along`.
+    """
+    pts = PITCH_POINTS.astype(np.float64)
+    same_line = np.abs(pts[:, None, across] - pts[None, :, across]) < SAME_LINE_TOLERANCE
+    return np.nonzero(same_line & (pts[:, None, along] < pts[None, :, along]))
+
+# (image axis, pairs): left of on the pitch is left of in the image, far is above near
+ORDER_PAIRS = ((X, _ordered_pairs(0, 1)), (Y, _ordered_pairs(1, 0)))
+
+def _pitch_lines():
+    """
+    Membership matrix (35, lines) of the keypoints on each pitch line through
+    three or more of them.
+    """
+    pts = PITCH_POINTS.astype(np.float64)
+    lines = set()
+    for i in range(len(pts)):
+        for j in range(i + 1, len(pts)):
+            direction = (pts[j] - pts[i]) / np.linalg.norm(pts[j] - pts[i])
+            offset = pts - pts[i]
+            on_line = np.abs(direction[0] * offset[:, 1] - direction[1] * offset[:, 0]) < COLLINEAR_TOLERANCE
+            if np.count_nonzero(on_line) >= 3:
+                lines.add(tuple(np.flatnonzero(on_line)))
+    membership = np.zeros((len(pts), len(lines)), dtype=np.float32)
+    for column, members in enumerate(sorted(lines)):
+        membership[list(members), column] = 1
+    return membership
+
+# A homography needs four points with no three on a line: frames whose points
+# all but one lie on one of these lines do not define one
+PITCH_LINES = _pitch_lines()
+
+def _normalisation(points, mask):
+    """
+    Similarity transforms (F, 3, 3) moving the masked points of each frame to
+    their centroid and scaling their mean distance from it to sqrt(2), as in
+    Hartley's normalised DLT, and whether each frame had a usable scale.
+    """
+    count = np.maximum(mask.sum(axis=1), 1)
+    centre = (points * mask[:, :, None]).sum(axis=1) / count[:, None]
+    distance = np.linalg.norm(points - centre[:, None, :], axis=2)
+    mean_distance = (distance * mask).sum(axis=1) / count
+    usable = mean_distance > 1e-9
+    scale = np.sqrt(2) / np.where(usable, mean_distance, 1.0)
+    T = np.zeros((len(points), 3, 3))
+    T[:, 0, 0] = T[:, 1, 1] = scale
+    T[:, :2, 2] = -scale[:, None] * centre
+    T[:, 2, 2] = 1
+    return T, usable
+
+def _pitch_spread(mask):
+    """
+    Vectorised has_pitch_spread: extent (metres) of the masked pitch points of
+    each frame across their narrowest direction, shape (F,).
+    """
+    pts = PITCH_POINTS.astype(np.float64)
+    count = np.maximum(mask.sum(axis=1), 1)
+    centre = mask @ pts / count[:, None]
+    d = pts[None, :, :] - centre[:, None, :]
+    w = mask / count[:, None]
+    a = (w * d[:, :, 0] ** 2).sum(axis=1)
+    b = (w * d[:, :, 0] * d[:, :, 1]).sum(axis=1)
+    c = (w * d[:, :, 1] ** 2).sum(axis=1)
+    # Smallest eigenvalue of the 2x2 covariance [[a, b], [b, c]]
+    smallest = (a + c) / 2 - np.sqrt(((a - c) / 2) ** 2 + b ** 2)
+    return np.sqrt(np.maximum(smallest, 0))
+
+def _fit_homographies(pitch, image, weights):
+    """
+    Weighted DLT for a batch of frames: the homographies (F, 3, 3) mapping the
+    normalised pitch points (35, 2) to the normalised image points (F, 35, 2)
+    that minimise the weighted algebraic error, with the bottom row of unit
+    length. Points with weight 0 are ignored.
+
+    With p = (x, y, 1) the pitch point and (u, v) its image, A^T W A of the DLT
+    only holds sums of w * p p^T scaled by 1, u, v and u^2 + v^2, which are four
+    (F, 35) @ (35, 9) products. The first two rows of H are linear in the bottom
+    row h3, so eliminating them leaves a 3x3 eigenproblem per frame instead of 9x9.
+    """
+    frames = len(image)
+    p = np.hstack([pitch, np.ones((len(pitch), 1))])
+    outer = (p[:, :, None] * p[:, None, :]).reshape(len(p), 9)
+    u, v = image[:, :, 0], image[:, :, 1]
+    S = (weights @ outer).reshape(frames, 3, 3)
+    Su = ((weights * u) @ outer).reshape(frames, 3, 3)
+    Sv = ((weights * v) @ outer).reshape(frames, 3, 3)
+    Suv = ((weights * (u ** 2 + v ** 2)) @ outer).reshape(frames, 3, 3)
+    # Frames without points get an identity so the batched inverse does not fail
+    S += np.eye(3) * (weights.sum(axis=1) == 0)[:, None, None]
+    S_inverse = np.linalg.inv(S)
+    Gu = S_inverse @ Su
+    Gv = S_inverse @ Sv
+    # Minimising over h1 = Gu h3 and h2 = Gv h3 leaves the Schur complement
+    R = Suv - Su @ Gu - Sv @ Gv
+    _, vectors = np.linalg.eigh((R + R.transpose(0, 2, 1)) / 2)
+    h3 = vectors[:, :, 0]
+    return np.stack([(Gu @ h3[:, :, None])[:, :, 0], (Gv @ h3[:, :, None])[:, :, 0], h3], axis=1)
+
+def _check_chunk(values, max_error):
+    frames = len(values)
+    image = values[:, :, X:VISIBLE].astype(np.float64)
+    visible = (values[:, :, VISIBLE] > 0) & ~np.isnan(image).any(axis=2)
+    image = np.where(visible[:, :, None], image, 0.0)
+    counts = visible.sum(axis=1)
+
+    T_pitch, _ = _normalisation(PITCH_POINTS.astype(np.float64)[None], np.ones((1, NUM_KEYPOINTS), dtype=bool))
+    T_image, usable = _normalisation(image, visible)
+    off_line = counts - (visible.astype(np.float32) @ PITCH_LINES).max(axis=1, initial=0)
+    fitted = (counts >= 4) & (off_line >= 2) & (_pitch_spread(visible) >= MIN_PITCH_SPREAD) & usable
+
+    pitch_h = np.hstack([PITCH_POINTS.astype(np.float64), np.ones((NUM_KEYPOINTS, 1))])
+    pitch_n = (pitch_h @ T_pitch[0].T)[:, :2]
+    # Only frames that can define a homography are fitted
+    rows = np.flatnonzero(fitted)
+    mask = visible[rows]
+    points = image[rows]
+    scale = T_image[rows, 0, 0]
+    shift = T_image[rows, :2, 2]
+    points_n = points * scale[:, None, None] + shift[:, None, :]
+    # T_image^-1 undoes the per-frame normalisation
+    T_inverse = np.zeros((len(rows), 3, 3))
+    T_inverse[:, 0, 0] = T_inverse[:, 1, 1] = 1 / scale
+    T_inverse[:, :2, 2] = -shift / scale[:, None]
+    T_inverse[:, 2, 2] = 1
+
+    weights = mask.astype(np.float64)
+    for _ in range(REWEIGHT_ITERATIONS + 1):
+        H = T_inverse @ _fit_homographies(pitch_n, points_n, weights) @ T_pitch[0]
+        projected = pitch_h @ H.transpose(0, 2, 1)
+        w = projected[:, :, 2]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            squared = ((projected[:, :, :2] / w[:, :, None] - points) ** 2).sum(axis=2)
+        squared = np.where(mask & np.isfinite(squared), squared, np.inf)
+        # Cauchy weights: points several max_errors off barely count in the next fit
+        weights = np.where(mask, 1 / (1 + squared / max_error ** 2), 0.0)
+
+    errors = np.full(visible.shape, np.nan, dtype=np.float32)
+    errors[rows] = np.where(mask, np.sqrt(squared), np.nan)
+    # Every keypoint is in front of the camera, so det(H) * w must be positive
+    # at all of them; a negative sign mirrors the pitch, mixed signs fold it
+    orientation = np.linalg.det(H)[:, None] * w
+    mirrored = np.zeros(frames, dtype=bool)
+    mirrored[rows] = (mask & ~(orientation > 0)).any(axis=1)
+    point_flags = (errors > max_error) & (counts > 4)[:, None]
+
+    order_violations = np.zeros(frames, dtype=np.int32)
+    order_points = np.zeros_like(visible)
+    for axis, (a, b) in ORDER_PAIRS:
+        wrong = visible[:, a] & visible[:, b] & (image[:, a, axis] > image[:, b, axis] + ORDER_TOLERANCE)
+        order_violations += wrong.sum(axis=1)
+        # Both points of a wrong pair are blamed: (frames, pairs) @ (pairs, 35) counts per point
+        pair_points = np.zeros((len(a), NUM_KEYPOINTS), dtype=np.float32)
+        pair_points[np.arange(len(a)), a] = 1
+        pair_points[np.arange(len(b)), b] = 1
+        order_points |= (wrong.astype(np.float32) @ pair_points) > 0
+
+    reasons = np.zeros(frames, dtype=np.uint8)
+    reasons[point_flags.any(axis=1)] |= REPROJECTION
+    reasons[mirrored] |= MIRRORED
+    use_order = ~fitted & (order_violations > 0)
+    reasons[use_order] |= ORDER
+    point_flags |= order_points & use_order[:, None]
+    return {
+        "errors": errors,
+        "fitted": fitted,
+        "order_violations": order_violations,
+        "reasons": reasons,
+        "point_flags": point_flags,
+    }
+
+def check_values(values, max_error=DEFAULT_MAX_ERROR, chunk_frames=CHUNK_FRAMES):
+    """
+    Check the geometric consistency of the annotations of many frames.
+
+    Args:
+        values (np.array): Annotations of shape (frames, 35, 3), e.g. AnnotationStore.values.
+        max_error (float): Reprojection error in pixels above which a point is flagged.
+        chunk_frames (int): Frames processed per batch.
+
+    Returns:
+        dict: Arrays over the frames: "errors" (frames, 35) reprojection errors in
+        pixels (NaN where no homography was fitted or the point is not visible),
+        "fitted" (frames,) whether a homography was fitted, "order_violations"
+        (frames,) the number of point pairs out of order, "reasons" (frames,) a
+        bitmask of REPROJECTION, MIRRORED and ORDER (0 for consistent frames) and
+        "point_flags" (frames, 35) the points blamed for a reprojection or order flag.
+    """
+    values = np.asarray(values, dtype=np.float32).reshape(-1, NUM_KEYPOINTS, 3)
+    chunks = [_check_chunk(values[start:start + chunk_frames], float(max_error))
+              for start in range(0, len(values), chunk_frames)]
+    if not chunks:
+        chunks = [_check_chunk(values, float(max_error))]
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+def session_values(session):
+    """
+    Frame names and a (frames, 35, 3) array of a session: an AnnotationStore's
+    columns as is, other sessions (e.g. ProjectSessionView) read with iter_frames.
+    """
+    if hasattr(session, "values") and hasattr(session, "frame_names"):
+        return session.frame_names(), session.values
+    names = []
+    rows = []
+    for name, values in session.iter_frames():
+        names.append(name)
+        rows.append(values)
+    if not rows:
+        return names, np.zeros((0, NUM_KEYPOINTS, 3), dtype=np.float32)
+    return names, np.stack(rows)
+
+def check_session(session, max_error=DEFAULT_MAX_ERROR):
+    """
+    check_values over a whole session; returns (frame_names, result).
+    """
+    names, values = session_values(session)
+    return names, check_values(values, max_error)
+
+def reason_names(reasons):
+    """
+    Names of the reasons set in a reasons bitmask, e.g. ["reprojection", "mirrored"].
+    """
+    return [name for bit, name in REASON_NAMES.items() if int(reasons) & bit]
+
+def geometry_report(frame_names, result, max_error=DEFAULT_MAX_ERROR):
+    """
+    Build a JSON-serialisable report of the flagged frames of a check_values result.
+
+    Each flagged frame lists its reasons, the largest reprojection error and the
+    blamed keypoints with their errors (None for points blamed by the order check).
+    """
+    reasons = result["reasons"]
+    errors = result["errors"]
+    flagged = np.flatnonzero(reasons)
+    frames = []
+    for i in flagged:
+        frame_errors = errors[i]
+        worst = np.nanmax(frame_errors) if result["fitted"][i] and not np.isnan(frame_errors).all() else None
+        frames.append({
+            "frame": frame_names[i],
+            "reasons": reason_names(reasons[i]),
+            "max_error": None if worst is None else round(float(worst), 2),
+            "order_violations": int(result["order_violations"][i]),
+            "points": {
+                KEYPOINT_NAMES[k]: None if np.isnan(frame_errors[k]) else round(float(frame_errors[k]), 2)
+                for k in np.flatnonzero(result["point_flags"][i])
+            },
+        })
+    summary = {
+        "frames": len(reasons),
+        "fitted": int(np.count_nonzero(result["fitted"])),
+        "flagged": len(flagged),
+        "max_error": max_error,
+    }
+    for bit, name in REASON_NAMES.items():
+        summary[name] = int(np.count_nonzero(reasons & bit))
+    return {"summary": summary, "frames": frames}
+
+def write_report(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,137 @@
+# utils/homography.py
+import cv2
+import numpy as np
+from data.keypoints_data import CONNECTIONS, KEYPOINTS_DATA
+
+# Metric pitch coordinates of the keypoints, in KEYPOINTS_DATA order, shape (35, 2)
+PITCH_POINTS = np.array([(x, y) for _, x, y, _ in KEYPOINTS_DATA], dtype=np.float32)
+
+CIRCLE_RADIUS = 9.15  # centre circle and penalty arc radius, metres
+CURVE_SEGMENTS = 48  # segments per full circle when drawing curves
+
+DEFAULT_RANSAC_THRESHOLD = 5.0
+# Points whose pitch positions span less than this (in metres) across their
+# narrowest direction are treated as collinear and cannot define a homography.
+MIN_PITCH_SPREAD = 2.0
+
+def has_pitch_spread(valid):
+    """
+    Return True if the pitch points selected by the boolean mask `valid` are
+    numerous and spread out enough (not all on one line) to fit a homography.
+    """
+    if np.count_nonzero(valid) < 4:
+        return False
+    pts = PITCH_POINTS[valid]
+    centered = pts - pts.mean(axis=0)
+    # Smallest singular value ~ extent across the narrowest direction
+    spread = np.linalg.svd(centered, compute_uv=False)[-1] / np.sqrt(len(pts))
+    return spread >= MIN_PITCH_SPREAD
+
+def fit_pitch_homography(image_points, valid, ransac_threshold=DEFAULT_RANSAC_THRESHOLD):
+    """
+    Fit a homography mapping pitch coordinates (metres) to image pixels.
+
+    Args:
+        image_points (np.array): Array of shape (35, 2) or (35, 1, 2), in KEYPOINTS_DATA order.
+        valid (np.array): Boolean mask of the points to fit from.
+        ransac_threshold (float): Maximum reprojection error in pixels for an inlier.
+
+    Returns:
+        tuple: (H, inliers) where H is a 3x3 matrix and inliers a boolean mask of
+        shape (35,), or (None, None) if the points cannot define a homography.
+    """
+    valid = np.asarray(valid, dtype=bool)
+    if not has_pitch_spread(valid):
+        return None, None
+    src = PITCH_POINTS[valid]
+    dst = np.asarray(image_points, dtype=np.float32).reshape(-1, 2)[valid]
+    H, mask = cv2.findHomography(src, dst, cv2.RANSAC, ransac_threshold)
+    if H is None:
+        return None, None
+    inliers = np.zeros(len(PITCH_POINTS), dtype=bool)
+    inliers[np.flatnonzero(valid)] = mask.reshape(-1).astype(bool)
+    if not has_pitch_spread(inliers):
+        return None, None
+    return H, inliers
+
+def project_pitch_points(H, pitch_points=PITCH_POINTS):
+    """
+    Project pitch coordinates (N, 2) into the image with homography H; returns (N, 2).
+    """
+    pts = np.asarray(pitch_points, dtype=np.float32).reshape(-1, 1, 2)
+    return cv2.perspectiveTransform(pts, np.asarray(H, dtype=np.float64)).reshape(-1, 2)
+
+def constrain_with_homography(points, status, frame_shape, ransac_threshold=DEFAULT_RANSAC_THRESHOLD):
+    """
+    Replace tracked keypoints by the reprojection of the pitch model.
+
+    A RANSAC homography is fitted from the successfully tracked points to the
+    pitch model, then all 35 keypoints are reprojected in one call. Tracked
+    points that are RANSAC outliers are thereby corrected, and untracked points
+    are filled in. Points that project outside the frame are marked as not found.
+    If no homography can be fitted the input is returned unchanged.
+
+    Args:
+        points (np.array): Tracked points, shape (35, 1, 2), in KEYPOINTS_DATA order.
+        status (np.array): Tracking status, shape (35, 1).
+        frame_shape (tuple): Shape of the frame, used to discard off-screen points.
+        ransac_threshold (float): Maximum reprojection error in pixels for an inlier.
+
+    Returns:
+        tuple: (points, status) with the same shapes as the inputs.
+    """
+    flat = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    valid = (np.asarray(status).reshape(-1) == 1) & ~np.isnan(flat).any(axis=1)
+    H, _ = fit_pitch_homography(flat, valid, ransac_threshold)
+    if H is None:
+        return points, status
+    projected = project_pitch_points(H)
+    height, width = frame_shape[:2]
+    inside = (
+        (projected[:, 0] >= 0) & (projected[:, 0] < width)
+        & (projected[:, 1] >= 0) & (projected[:, 1] < height)
+    )
+    projected[~inside] = np.nan
+    new_status = inside.astype(np.uint8).reshape(-1, 1)
+    return projected.reshape(-1, 1, 2), new_status
+
+def _pitch_line_segments():
+    """
+    Pitch markings as line segments in metres, shape (N, 2, 2): the CONNECTIONS
+    lines, the centre circle and both penalty arcs (curves as short segments).
+    """
+    by_number = {no: (x, y) for no, x, y, _ in KEYPOINTS_DATA}
+    segments = [(by_number[a], by_number[b]) for a, b in CONNECTIONS]
+
+    def arc(cx, cy, start, stop):
+        steps = max(2, int(round(CURVE_SEGMENTS * (stop - start) / (2 * np.pi))))
+        angles = np.linspace(start, stop, steps + 1)
+        pts = np.stack([cx + CIRCLE_RADIUS * np.cos(angles), cy + CIRCLE_RADIUS * np.sin(angles)], axis=1)
+        return list(zip(pts[:-1], pts[1:]))
+
+    segments += arc(52.5, 34, 0, 2 * np.pi)
+    # Penalty arcs: the part of the circle around each spot outside the penalty box
+    half = np.arccos((16.5 - 11) / CIRCLE_RADIUS)
+    segments += arc(11, 34, -half, half)
+    segments += arc(94, 34, np.pi - half, np.pi + half)
+    return np.array(segments, dtype=np.float64)
+
+# Pitch markings as segments in metres, shape (N, 2, 2)
+PITCH_LINE_SEGMENTS = _pitch_line_segments()
+
+def project_pitch_lines(H, segments=PITCH_LINE_SEGMENTS):
+    """
+    Project pitch line segments (N, 2, 2) into the image with homography H in one call.
+
+    Segments with an end behind the camera (non-positive homogeneous w) are dropped.
+
+    Returns:
+        np.array: Image segments of shape (M, 2, 2), M <= N.
+    """
+    pts = segments.reshape(-1, 2)
+    homogeneous = np.hstack([pts, np.ones((len(pts), 1))]) @ np.asarray(H, dtype=np.float64).T
+    w = homogeneous[:, 2]
+    in_front = (w > 1e-9).reshape(-1, 2).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        projected = (homogeneous[:, :2] / w[:, None]).reshape(-1, 2, 2)
+    return projected[in_front]
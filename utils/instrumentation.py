@@ -0,0 +1,176 @@
+"""
+Lightweight timing spans and counters for the interactive hot paths.
+
+Instrumentation is off by default. While disabled, span() returns a shared
+no-op context manager and count() returns after one attribute check, so the
+calls can stay in place permanently. While enabled, each span is recorded with
+its thread and start time. Spans can be summarised (last / p95 latency per
+name) or exported as a Chrome trace (chrome://tracing, Perfetto).
+"""
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+MAX_EVENTS = 200000  # spans kept for trace export
+MAX_SAMPLES = 500  # recent durations kept per span name for percentiles
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder._record(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+class Recorder:
+    """
+    Collects spans and counters. Use the module-level RECORDER through span(),
+    count() and timed().
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._samples = {}
+        self._counters = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._samples.clear()
+            self._counters.clear()
+            self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            value = self._counters.get(name, 0) + n
+            self._counters[name] = value
+            self._events.append(("C", name, time.perf_counter_ns(), value, threading.get_ident(), None))
+
+    def _record(self, name, start_ns, duration_ns, args):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=MAX_SAMPLES)
+            samples.append(duration_ns)
+            self._events.append(("X", name, start_ns, duration_ns, threading.get_ident(), args))
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def stats(self, name):
+        """
+        Return {"count", "last_ms", "mean_ms", "p95_ms"} over the recent spans of
+        name, or None if none were recorded.
+        """
+        with self._lock:
+            samples = list(self._samples.get(name, ()))
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            "count": len(samples),
+            "last_ms": samples[-1] / 1e6,
+            "mean_ms": sum(samples) / len(samples) / 1e6,
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] / 1e6,
+        }
+
+    def summary(self):
+        """
+        Return {span name: stats(name)} for every span name recorded.
+        """
+        with self._lock:
+            names = list(self._samples)
+        return {name: self.stats(name) for name in names}
+
+    def chrome_trace(self):
+        """
+        Return the recorded events in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            origin = self._origin_ns
+        trace = []
+        for kind, name, start_ns, value, tid, args in events:
+            ts = (start_ns - origin) / 1000.0
+            if kind == "X":
+                event = {"name": name, "cat": name.split(".", 1)[0], "ph": "X",
+                         "ts": ts, "dur": value / 1000.0, "pid": pid, "tid": tid}
+                if args:
+                    event["args"] = args
+            else:
+                event = {"name": name, "ph": "C", "ts": ts, "pid": pid, "tid": tid, "args": {name: value}}
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        """
+        Write the recorded events to path as Chrome-trace JSON; returns the event count.
+        """
+        trace = self.chrome_trace()
+        with open(path, "w") as f:
+            json.dump(trace, f)
+        return len(trace["traceEvents"])
+
+RECORDER = Recorder()
+
+def span(name, **args):
+    """
+    Context manager timing the enclosed block as `name` (no-op while disabled).
+    """
+    return RECORDER.span(name, **args)
+
+def count(name, n=1):
+    """
+    Add n to the counter `name` (no-op while disabled).
+    """
+    RECORDER.count(name, n)
+
+def timed(name):
+    """
+    Decorator recording each call of the function as a span named `name`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return func(*args, **kwargs)
+            with RECORDER.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -2,15 +2,83 @@
 import cv2
 import numpy as np
 import logging
+from utils.homography import constrain_with_homography
+from utils.trackers import get_tracker
+from data.annotation_store import CONFIRMED, NUM_KEYPOINTS, PREDICTED, VISIBLE, empty_frame
 
-def predict_keypoints(prev_frame, next_frame, prev_points):
+LK_WIN_SIZE = (15, 15)
+LK_MAX_LEVEL = 2
+LK_CRITERIA = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+# Keyframe interpolation: a tracking step whose forward-backward error exceeds
+# MAX_FB_ERROR pixels loses the point, and where the forward and backward
+# tracks still disagree by more than MAX_TRACK_DISAGREEMENT pixels after drift
+# correction the point is left unfilled.
+MAX_FB_ERROR = 1.0
+MAX_TRACK_DISAGREEMENT = 8.0
+
+def build_pyramid(frame):
+    """
+    Build the Lucas-Kanade image pyramid for a grayscale frame.
+
+    The result can be passed to predict_keypoints in place of the frame, so that
+    when propagating through a sequence each frame's pyramid is built only once
+    and reused as the "previous" pyramid of the next step.
+
+    Returns:
+        list: Pyramid levels, finest first, from cv2.buildOpticalFlowPyramid.
+    """
+    _, pyramid = cv2.buildOpticalFlowPyramid(frame, LK_WIN_SIZE, LK_MAX_LEVEL, withDerivatives=False)
+    return list(pyramid)
+
+def prepare_frame(frame, tracker=None):
+    """
+    Prepare a grayscale frame for repeated tracking: its pyramid for the default
+    full-frame Lucas-Kanade, the frame itself for ROI trackers, which crop it.
+    """
+    return build_pyramid(frame) if get_tracker(tracker) is None else frame
+
+def _track_pyramids(prev_pyramid, next_pyramid, prev_points):
+    """
+    Coarse-to-fine Lucas-Kanade over prebuilt pyramids.
+
+    OpenCV's Python binding only accepts single images, so the pyramid levels
+    are tracked one at a time with maxLevel=0, each seeded with the upscaled
+    result of the coarser level; this mirrors what calcOpticalFlowPyrLK does
+    internally.
     """
-    Predict keypoints in the next frame using Lucas-Kanade optical flow.
+    top = min(len(prev_pyramid), len(next_pyramid)) - 1
+    points = prev_points.reshape(-1, 1, 2).astype(np.float32)
+    next_points = np.full_like(points, np.nan)
+    status = np.zeros((len(points), 1), dtype=np.uint8)
+    valid = ~np.isnan(points.reshape(-1, 2)).any(axis=1)
+    if not valid.any():
+        return next_points, status
+
+    tracked = points[valid]
+    guess = tracked / float(2 ** top)
+    for level in range(top, -1, -1):
+        level_points = tracked / float(2 ** level)
+        guess, level_status, _ = cv2.calcOpticalFlowPyrLK(
+            prev_pyramid[level], next_pyramid[level], level_points, guess,
+            winSize=LK_WIN_SIZE, maxLevel=0, criteria=LK_CRITERIA,
+            flags=cv2.OPTFLOW_USE_INITIAL_FLOW,
+        )
+        if level > 0:
+            guess = guess * 2.0
+    next_points[valid] = guess
+    status[valid] = level_status
+    return next_points, status
+
+def predict_keypoints(prev_frame, next_frame, prev_points, tracker=None):
+    """
+    Predict keypoints in the next frame using Lucas-Kanade optical flow, or
+    another backend from utils.trackers.
     
     Args:
-        prev_frame (np.array): Grayscale image of frame N.
-        next_frame (np.array): Grayscale image of frame N+1.
+        prev_frame (np.array): Grayscale image of frame N, or its pyramid from build_pyramid.
+        next_frame (np.array): Grayscale image of frame N+1, or its pyramid from build_pyramid.
         prev_points (np.array): Array of shape (N, 1, 2) containing keypoint positions in frame N.
+        tracker: Tracker name or instance (see utils.trackers); None tracks over the whole frame.
     
     Returns:
         next_points (np.array): Predicted keypoint positions in frame N+1.
@@ -25,16 +93,30 @@ def predict_keypoints(prev_frame, next_frame, prev_points):
         if prev_points is None or len(prev_points) == 0:
             raise ValueError("No previous keypoint positions provided.")
 
-        # Ensure the frames are 2D (grayscale)
-        if len(prev_frame.shape) != 2 or len(next_frame.shape) != 2:
+        # Ensure the frames are 2D (grayscale); pyramids are checked on their base level
+        prev_base = prev_frame[0] if isinstance(prev_frame, (list, tuple)) else prev_frame
+        next_base = next_frame[0] if isinstance(next_frame, (list, tuple)) else next_frame
+        if len(prev_base.shape) != 2 or len(next_base.shape) != 2:
             raise ValueError("Input frames must be grayscale images (2D arrays).")
+
+        tracker = get_tracker(tracker)
+        if tracker is not None:
+            # ROI trackers crop the full-resolution base level
+            return tracker.track(prev_base, next_base, prev_points)
         
         lk_params = dict(
-            winSize  = (15, 15),
-            maxLevel = 2,
-            criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+            winSize  = LK_WIN_SIZE,
+            maxLevel = LK_MAX_LEVEL,
+            criteria = LK_CRITERIA
         )
         
+        if isinstance(prev_frame, (list, tuple)) or isinstance(next_frame, (list, tuple)):
+            if not isinstance(prev_frame, (list, tuple)):
+                prev_frame = build_pyramid(prev_frame)
+            if not isinstance(next_frame, (list, tuple)):
+                next_frame = build_pyramid(next_frame)
+            return _track_pyramids(prev_frame, next_frame, prev_points)
+
         next_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_frame, next_frame, prev_points, None, **lk_params)
         return next_points, status
     except Exception as e:
@@ -63,6 +145,38 @@ def convert_annotations_to_array(annotations, keypoint_names):
     arr = np.array(points, dtype=np.float32).reshape(-1, 1, 2)
     return arr
 
+def annotations_to_points(values):
+    """
+    Vectorized counterpart of convert_annotations_to_array for the columnar store.
+
+    Args:
+        values (np.array): Frame annotations of shape (35, 3) holding (x, y, visible).
+
+    Returns:
+        np.array: Array of shape (35, 1, 2) of type np.float32, NaN for invisible points.
+    """
+    points = np.array(values[:, :2], dtype=np.float32)
+    points[values[:, VISIBLE] <= 0] = np.nan
+    return points.reshape(-1, 1, 2)
+
+def predictions_to_annotations(predicted_points, status):
+    """
+    Vectorized counterpart of update_annotations_with_predictions for the columnar store.
+
+    Args:
+        predicted_points (np.array): Array of shape (35, 1, 2) containing predicted positions.
+        status (np.array): Status array indicating if prediction succeeded (1) or not (0).
+
+    Returns:
+        np.array: Frame annotations of shape (35, 3); failed or NaN points are not visible.
+    """
+    flat = predicted_points.reshape(-1, 2)
+    found = (status.reshape(-1) == 1) & ~np.isnan(flat).any(axis=1)
+    values = empty_frame()
+    values[found, :2] = flat[found]
+    values[found, VISIBLE] = CONFIRMED
+    return values
+
 def update_annotations_with_predictions(keypoint_names, predicted_points, status):
     """
     Update a dictionary of annotations using predicted keypoint positions.
@@ -91,3 +205,228 @@ def update_annotations_with_predictions(keypoint_names, predicted_points, status
         else:
             updated_annotations[name] = {"visible": 0}
     return updated_annotations
+
+def predict_keypoints_with_homography(prev_frame, next_frame, prev_points, tracker=None):
+    """
+    Predict keypoints with optical flow, then fit a RANSAC homography from the
+    tracked points to the pitch model and reproject all keypoints.
+
+    prev_points must hold all keypoints in KEYPOINTS_DATA order. Flow outliers are
+    replaced by their reprojection and untracked keypoints are filled in; if no
+    homography can be fitted the plain optical flow result is returned.
+
+    Returns:
+        tuple: (next_points, status) as for predict_keypoints.
+    """
+    next_points, status = predict_keypoints(prev_frame, next_frame, prev_points, tracker)
+    base = next_frame[0] if isinstance(next_frame, (list, tuple)) else next_frame
+    return constrain_with_homography(next_points, status, base.shape)
+
+def propagate_keypoints(frame_source, start_index, end_index, start_points,
+                        min_tracked=4, should_stop=None, use_homography=False,
+                        cuts=None, shot_detector=None, tracker=None):
+    """
+    Propagate keypoints frame by frame from start_index towards end_index.
+
+    Each frame's pyramid (for the full-frame tracker) is built once and reused for the following step. Points
+    that fail to track are dropped (NaN) for the rest of the run. Propagation stops
+    early, without yielding that frame, when fewer than min_tracked points survive
+    (which is what happens at a camera cut), or when should_stop() returns True.
+    It also stops before crossing a known shot cut, or a cut that shot_detector
+    finds in the grayscale frames on the way.
+
+    Args:
+        frame_source (FrameSource): Source of grayscale frames.
+        start_index (int): Frame whose keypoints are given in start_points.
+        end_index (int): Last frame to predict (inclusive); may be before start_index.
+        start_points (np.array): Array of shape (N, 1, 2), NaN for unannotated points.
+        min_tracked (int): Stop when fewer points than this are still tracked.
+        should_stop (callable): Polled before every step; return True to cancel.
+        use_homography (bool): Constrain every frame with predict_keypoints_with_homography.
+        cuts (set): Indices of the frames that start a new shot.
+        shot_detector (ShotDetector): Detects cuts on the fly when cuts are not known.
+        tracker: Tracker name or instance (see utils.trackers); None tracks over the whole frame.
+
+    Yields:
+        tuple: (frame_index, predicted_points, status) for every predicted frame.
+    """
+    step = 1 if end_index >= start_index else -1
+    prev_frame = frame_source.read_gray(start_index)
+    if prev_frame is None:
+        raise ValueError(f"Failed to load frame {start_index}.")
+    # One instance for the whole run, so per-tracker state (e.g. DIS) is set up once
+    tracker = get_tracker(tracker)
+    prev_pyramid = prepare_frame(prev_frame, tracker)
+    if shot_detector is not None:
+        shot_detector.reset()
+        shot_detector.update(prev_frame)
+    points = np.array(start_points, dtype=np.float32)
+    for index in range(start_index + step, end_index + step, step):
+        if should_stop is not None and should_stop():
+            return
+        # The cut between two frames belongs to the later one, whichever way we go
+        if cuts is not None and max(index, index - step) in cuts:
+            return
+        next_frame = frame_source.read_gray(index)
+        if next_frame is None:
+            return
+        if shot_detector is not None and shot_detector.update(next_frame)[0]:
+            return
+        next_pyramid = prepare_frame(next_frame, tracker)
+        if use_homography:
+            next_points, status = predict_keypoints_with_homography(prev_pyramid, next_pyramid, points, tracker)
+        else:
+            next_points, status = predict_keypoints(prev_pyramid, next_pyramid, points, tracker)
+        lost = (status.reshape(-1) != 1) | np.isnan(next_points.reshape(-1, 2)).any(axis=1)
+        if np.count_nonzero(~lost) < min_tracked:
+            return
+        next_points[lost] = np.nan
+        status[lost] = 0
+        yield index, next_points, status
+        points = next_points
+        prev_pyramid = next_pyramid
+
+def track_with_fb_check(prev_pyramid, next_pyramid, points, max_fb_error=MAX_FB_ERROR, tracker=None):
+    """
+    Track points one step forward, then back again, and drop the points that do
+    not return to within max_fb_error pixels of where they started.
+
+    Returns:
+        tuple: (next_points (N, 1, 2), fb_error (N,)), NaN for lost points.
+    """
+    next_points, status = predict_keypoints(prev_pyramid, next_pyramid, points, tracker)
+    back_points, back_status = predict_keypoints(next_pyramid, prev_pyramid, next_points, tracker)
+    fb_error = np.linalg.norm((back_points - points).reshape(-1, 2), axis=1)
+    lost = ((status.reshape(-1) != 1) | (back_status.reshape(-1) != 1)
+            | np.isnan(fb_error) | (fb_error > max_fb_error))
+    next_points[lost] = np.nan
+    fb_error[lost] = np.nan
+    return next_points, fb_error
+
+def _track_through(frame_source, indices, points, max_fb_error, should_stop, progress, tracker):
+    """
+    Track points through frames indices[0], indices[1], ... with forward-backward
+    checks. Returns (tracks (n, 35, 2), accumulated fb error (n, 35)), NaN where
+    lost, or None if should_stop() asked to cancel.
+    """
+    tracks = np.full((len(indices), NUM_KEYPOINTS, 2), np.nan, dtype=np.float32)
+    errors = np.full((len(indices), NUM_KEYPOINTS), np.nan, dtype=np.float32)
+    tracks[0] = points.reshape(-1, 2)
+    errors[0] = np.where(np.isnan(points.reshape(-1, 2)).any(axis=1), np.nan, 0.0)
+    frame = frame_source.read_gray(indices[0])
+    if frame is None:
+        raise ValueError(f"Failed to load frame {indices[0]}.")
+    prev_pyramid = prepare_frame(frame, tracker)
+    for step in range(1, len(indices)):
+        if should_stop is not None and should_stop():
+            return None
+        frame = frame_source.read_gray(indices[step])
+        if frame is None:
+            raise ValueError(f"Failed to load frame {indices[step]}.")
+        next_pyramid = prepare_frame(frame, tracker)
+        if np.isnan(tracks[step - 1]).all():
+            # Every point is lost; the rest of this direction stays NaN
+            if progress:
+                progress(len(indices) - step)
+            break
+        next_points, fb_error = track_with_fb_check(
+            prev_pyramid, next_pyramid, tracks[step - 1].reshape(-1, 1, 2), max_fb_error, tracker)
+        tracks[step] = next_points.reshape(-1, 2)
+        errors[step] = errors[step - 1] + fb_error
+        prev_pyramid = next_pyramid
+        if progress:
+            progress(1)
+    return tracks, errors
+
+def interpolate_keyframes(frame_source, start_index, end_index, start_values, end_values,
+                          max_fb_error=MAX_FB_ERROR, max_disagreement=MAX_TRACK_DISAGREEMENT,
+                          use_homography=False, should_stop=None, progress=None, tracker=None):
+    """
+    Fill the frames strictly between two annotated keyframes.
+
+    Keypoints are tracked forward from the first keyframe and backward from the
+    second, each step checked by tracking back (forward-backward error). Where a
+    track reaches the other keyframe and that keyframe has the point, its drift
+    is spread linearly back over the track. The two directions are then blended
+    per point and frame, weighted by the distance to their keyframe and by the
+    accumulated forward-backward error; points the directions disagree on are
+    left out. All of this runs on (frames, 35) arrays at once.
+
+    Args:
+        frame_source (FrameSource): Source of grayscale frames.
+        start_index (int): First keyframe; must be before end_index.
+        end_index (int): Second keyframe.
+        start_values (np.array): (35, 3) annotations of the first keyframe.
+        end_values (np.array): (35, 3) annotations of the second keyframe.
+        max_fb_error (float): Forward-backward error in pixels that loses a point.
+        max_disagreement (float): Distance in pixels between the directions that drops a point.
+        use_homography (bool): Constrain every filled frame with the pitch homography.
+        should_stop (callable): Polled before every tracking step; return True to cancel.
+        progress (callable): Called as progress(done_steps, total_steps).
+        tracker: Tracker name or instance (see utils.trackers); None tracks over the whole frame.
+
+    Returns:
+        np.array: Annotations of frames start_index + 1 .. end_index - 1, shape
+        (end_index - start_index - 1, 35, 3), filled points marked PREDICTED;
+        None if cancelled.
+    """
+    if end_index - start_index < 2:
+        return np.empty((0, NUM_KEYPOINTS, 3), dtype=np.float32)
+    indices = list(range(start_index, end_index + 1))
+    count = len(indices)
+    total = 2 * (count - 1)
+    done = 0
+
+    def advance(steps):
+        nonlocal done
+        done += steps
+        if progress:
+            progress(done, total)
+
+    start_points = annotations_to_points(start_values)
+    end_points = annotations_to_points(end_values)
+    tracker = get_tracker(tracker)
+    result = _track_through(frame_source, indices, start_points, max_fb_error, should_stop, advance, tracker)
+    if result is None:
+        return None
+    forward, forward_error = result
+    result = _track_through(frame_source, indices[::-1], end_points, max_fb_error, should_stop, advance, tracker)
+    if result is None:
+        return None
+    backward, backward_error = result[0][::-1], result[1][::-1]
+
+    # Position of each frame between the keyframes, 0 at the first and 1 at the second
+    s = (np.arange(count, dtype=np.float32) / (count - 1))[:, None, None]
+    # Spread the drift each track has at the far keyframe linearly along it
+    forward_drift = end_points.reshape(-1, 2) - forward[-1]
+    backward_drift = start_points.reshape(-1, 2) - backward[0]
+    forward = forward + np.nan_to_num(forward_drift) * s
+    backward = backward + np.nan_to_num(backward_drift) * (1 - s)
+
+    forward_ok = ~np.isnan(forward).any(axis=2)
+    backward_ok = ~np.isnan(backward).any(axis=2)
+    forward_weight = np.where(forward_ok, (1 - s[:, :, 0]) / (1 + np.nan_to_num(forward_error)), 0)
+    backward_weight = np.where(backward_ok, s[:, :, 0] / (1 + np.nan_to_num(backward_error)), 0)
+    weight = forward_weight + backward_weight
+    blended = (np.nan_to_num(forward) * forward_weight[:, :, None]
+               + np.nan_to_num(backward) * backward_weight[:, :, None]) / np.where(weight > 0, weight, 1)[:, :, None]
+    disagree = forward_ok & backward_ok & (np.linalg.norm(forward - backward, axis=2) > max_disagreement)
+    # Drift correction and blending can push a point off the frame; such points are dropped
+    frame_shape = frame_source.read_gray(start_index).shape
+    height, width = frame_shape[:2]
+    inside = ((blended[:, :, 0] >= 0) & (blended[:, :, 0] < width)
+              & (blended[:, :, 1] >= 0) & (blended[:, :, 1] < height))
+    filled = (forward_ok | backward_ok) & ~disagree & (weight > 0) & inside
+
+    values = np.empty((count - 2, NUM_KEYPOINTS, 3), dtype=np.float32)
+    inner = slice(1, count - 1)
+    values[:, :, :VISIBLE] = np.where(filled[inner][:, :, None], blended[inner], np.nan)
+    values[:, :, VISIBLE] = np.where(filled[inner], PREDICTED, 0)
+    if use_homography:
+        for i in range(len(values)):
+            points = values[i, :, :VISIBLE].reshape(-1, 1, 2).copy()
+            status = (values[i, :, VISIBLE] > 0).astype(np.uint8).reshape(-1, 1)
+            points, status = constrain_with_homography(points, status, frame_shape)
+            values[i] = predictions_to_annotations(points, status)
+            values[i, values[i, :, VISIBLE] > 0, VISIBLE] = PREDICTED
+    return values
@@ -0,0 +1,45 @@
+"""
+Deferred imports of heavy modules.
+
+NumPy and OpenCV take most of the annotation tool's start-up time but are not
+needed until a video or session is opened. Modules on the start-up path bind
+them with lazy_import instead of import, so they are loaded on first use:
+
+    np = lazy_import("numpy")
+
+Command-line tools and worker processes that import these modules later just
+use the real module, as it is already loaded by then.
+"""
+import sys
+import importlib
+import threading
+import types
+
+_lock = threading.RLock()
+
+class _LazyModule(types.ModuleType):
+    """
+    Stand-in that imports the module on first attribute access and then copies
+    its namespace, so later lookups are plain attribute reads.
+    """
+    def __getattr__(self, attr):
+        with _lock:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name):
+    """
+    Return module name if it is already imported, otherwise a stand-in that
+    imports it on first attribute access (safe from several threads at once).
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
+
+def is_loaded(name):
+    """
+    Whether module name has been imported (through lazy_import or otherwise).
+    """
+    return name in sys.modules
@@ -0,0 +1,209 @@
+"""
+Shot-cut and near-duplicate frame detection from small grayscale thumbnails.
+
+Every frame is reduced to a THUMBNAIL_SIZE grayscale thumbnail. Two consecutive
+frames get a cut score from the distance between their thumbnail histograms and
+the peak of their phase correlation. The histograms catch cuts to close-ups and
+crowd shots; the phase correlation catches cuts between two wide pitch views
+that have the same colours, while a pan within a shot, being a translation,
+still correlates strongly. A frame whose thumbnail barely differs from the last
+frame kept is a near-duplicate. Scores are computed with NumPy over whole
+stacks of thumbnails, so analysing a frame costs a resize and a few FFTs of a
+64x36 image.
+"""
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = (64, 36)  # (width, height)
+HISTOGRAM_BINS = 32
+# Cut score in [0, 1] above which two consecutive frames belong to different
+# shots. Consecutive frames of a fast pan score about 0.5, unrelated views 0.85+.
+DEFAULT_CUT_THRESHOLD = 0.75
+# Mean thumbnail difference (in [0, 1]) below which a frame repeats the last kept one
+DEFAULT_DUPLICATE_THRESHOLD = 0.005
+DEFAULT_BATCH_FRAMES = 512  # thumbnails scored per vectorized batch
+
+def frame_thumbnail(frame):
+    """
+    Reduce a BGR or grayscale frame to its uint8 grayscale thumbnail.
+    """
+    if frame.ndim == 3:
+        # Shrink before converting: the colour conversion then runs on a thumbnail
+        frame = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+def thumbnail_histograms(thumbnails):
+    """
+    Normalised grayscale histograms of a stack of thumbnails, shape (N, HISTOGRAM_BINS).
+    """
+    thumbnails = np.asarray(thumbnails, dtype=np.uint8)
+    count = len(thumbnails)
+    pixels = thumbnails.reshape(count, -1)
+    bins = pixels.astype(np.intp) * HISTOGRAM_BINS // 256
+    # Offset each thumbnail's bins so a single bincount fills all histograms at once
+    bins += np.arange(count, dtype=np.intp)[:, None] * HISTOGRAM_BINS
+    counts = np.bincount(bins.ravel(), minlength=count * HISTOGRAM_BINS)
+    return counts.reshape(count, HISTOGRAM_BINS).astype(np.float32) / max(1, pixels.shape[1])
+
+def thumbnail_differences(a, b):
+    """
+    Mean absolute difference, in [0, 1], between thumbnails (or stacks of thumbnails) a and b.
+    """
+    diff = np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16))
+    return diff.reshape(diff.shape[:-2] + (-1,)).mean(axis=-1) / 255.0
+
+# Tapers the thumbnail edges so the wrap-around of the FFT does not look like structure
+_WINDOW = np.outer(np.hanning(THUMBNAIL_SIZE[1]), np.hanning(THUMBNAIL_SIZE[0])).astype(np.float32)
+
+def phase_correlation_peaks(a, b):
+    """
+    Peak of the phase correlation between stacks of thumbnails a and b, shape (N,).
+    Close to 1 for a translated copy, around 0.1 for unrelated images.
+    """
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    a = (a - a.mean(axis=(-2, -1), keepdims=True)) * _WINDOW
+    b = (b - b.mean(axis=(-2, -1), keepdims=True)) * _WINDOW
+    cross = np.fft.rfft2(a) * np.conj(np.fft.rfft2(b))
+    cross /= np.abs(cross) + 1e-6
+    correlation = np.fft.irfft2(cross, s=a.shape[-2:])
+    return correlation.reshape(len(correlation), -1).max(axis=1)
+
+def cut_scores(thumbnails):
+    """
+    Cut score in [0, 1] between each pair of consecutive thumbnails, shape (N - 1,).
+    """
+    thumbnails = np.asarray(thumbnails, dtype=np.uint8)
+    if len(thumbnails) < 2:
+        return np.zeros(0, dtype=np.float32)
+    histograms = thumbnail_histograms(thumbnails)
+    # Total variation distance between histograms, in [0, 1]
+    histogram_distance = 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1)
+    similarity = np.clip(phase_correlation_peaks(thumbnails[1:], thumbnails[:-1]), 0, 1)
+    return (1 - similarity * (1 - histogram_distance)).astype(np.float32)
+
+def detect_cuts(thumbnails, threshold=DEFAULT_CUT_THRESHOLD):
+    """
+    Return the indices of the thumbnails that start a new shot (never 0).
+    """
+    return np.flatnonzero(cut_scores(thumbnails) > threshold) + 1
+
+def select_informative(thumbnails, cuts=(), threshold=DEFAULT_DUPLICATE_THRESHOLD, last_kept=None):
+    """
+    Return a boolean mask of the thumbnails to keep: the first frame, the first
+    frame of every shot, and every frame that differs from the last kept one by
+    more than threshold. Comparing against the last kept frame, rather than the
+    previous one, keeps slow pans from being dropped frame by frame. last_kept
+    continues the selection from an earlier batch, whose first frame is then
+    compared like any other.
+    """
+    keep = np.zeros(len(thumbnails), dtype=bool)
+    if len(thumbnails) == 0:
+        return keep
+    keep[np.asarray(cuts, dtype=np.intp)] = True
+    start = 0
+    if last_kept is None:
+        keep[0] = True
+        last_kept = thumbnails[0]
+        start = 1
+    last = last_kept
+    for i in range(start, len(thumbnails)):
+        if keep[i] or thumbnail_differences(thumbnails[i], last) > threshold:
+            keep[i] = True
+            last = thumbnails[i]
+    return keep
+
+def analyse_frames(frame_source, cut_threshold=DEFAULT_CUT_THRESHOLD,
+                   duplicate_threshold=DEFAULT_DUPLICATE_THRESHOLD, batch_frames=DEFAULT_BATCH_FRAMES,
+                   progress=None):
+    """
+    Find the shot cuts and near-duplicate frames of a whole frame source.
+
+    Frames are read in order as grayscale and scored in batches of thumbnails,
+    so memory stays bounded for long videos.
+
+    Args:
+        frame_source (FrameSource): Video, frame store or frames folder.
+        cut_threshold (float): Cut score above which a frame starts a new shot.
+        duplicate_threshold (float): Mean thumbnail difference up to which a frame is a duplicate.
+        batch_frames (int): Thumbnails scored per batch.
+        progress (callable): Called as progress(done_frames, total_frames).
+
+    Returns:
+        dict: {"cuts": [frame index], "duplicates": [frame index]}.
+    """
+    total = len(frame_source)
+    cuts = []
+    duplicates = []
+    previous = None  # last thumbnail of the previous batch
+    last_kept = None
+    for batch_start in range(0, total, batch_frames):
+        thumbnails = []
+        for index in range(batch_start, min(total, batch_start + batch_frames)):
+            frame = frame_source.read_gray(index)
+            if frame is None:
+                break
+            thumbnails.append(frame_thumbnail(frame))
+        if not thumbnails:
+            break
+        thumbnails = np.stack(thumbnails)
+        # Score the boundary with the previous batch too
+        scored = thumbnails if previous is None else np.concatenate([previous[None], thumbnails])
+        offset = batch_start - (0 if previous is None else 1)
+        batch_cuts = (detect_cuts(scored, cut_threshold) + offset).tolist()
+        keep = select_informative(thumbnails, np.asarray(batch_cuts, dtype=np.intp) - batch_start,
+                                  duplicate_threshold, last_kept)
+        cuts += batch_cuts
+        duplicates += (np.flatnonzero(~keep) + batch_start).tolist()
+        kept = np.flatnonzero(keep)
+        if len(kept):
+            last_kept = thumbnails[kept[-1]]
+        previous = thumbnails[-1]
+        if progress:
+            progress(batch_start + len(thumbnails), total)
+        if len(thumbnails) < min(batch_frames, total - batch_start):
+            break
+    return {"cuts": cuts, "duplicates": duplicates}
+
+class ShotDetector:
+    """
+    Incremental version of detect_cuts / select_informative for frames that are
+    decoded one at a time (extraction, propagation).
+
+    update(frame) returns (cut, duplicate): whether the frame starts a new shot,
+    and whether it nearly repeats the last frame that was not a duplicate.
+    """
+    def __init__(self, cut_threshold=DEFAULT_CUT_THRESHOLD, duplicate_threshold=DEFAULT_DUPLICATE_THRESHOLD):
+        self.cut_threshold = cut_threshold
+        self.duplicate_threshold = duplicate_threshold
+        self.previous = None
+        self.last_kept = None
+        self.last_score = 0.0
+
+    def reset(self):
+        self.previous = None
+        self.last_kept = None
+        self.last_score = 0.0
+
+    def prime(self, frame):
+        """
+        Use frame as the previous frame for cut detection without keeping it, so the
+        next frame can be checked for a cut but is never a duplicate.
+        """
+        self.previous = frame_thumbnail(frame)
+        self.last_kept = None
+
+    def update(self, frame):
+        thumbnail = frame_thumbnail(frame)
+        if self.previous is None:
+            self.previous = self.last_kept = thumbnail
+            return False, False
+        self.last_score = float(cut_scores(np.stack([self.previous, thumbnail]))[0])
+        self.previous = thumbnail
+        cut = self.last_score > self.cut_threshold
+        duplicate = (not cut and self.last_kept is not None and
+                     thumbnail_differences(thumbnail, self.last_kept) <= self.duplicate_threshold)
+        if not duplicate:
+            self.last_kept = thumbnail
+        return cut, duplicate
@@ -0,0 +1,91 @@
+"""
+Start-up time measurement for main.py --startup-time.
+
+StartupProfile records the wall time of each start-up phase and, through a
+hook on builtins.__import__, the time spent importing each module excluding
+the modules it imports itself, then prints where the time went:
+
+    python main.py --startup-time
+    python main.py --startup-time --reopen
+
+Modules imported with importlib.import_module (e.g. by utils.lazy_import) are
+counted in their phase but not listed by module.
+"""
+import sys
+import time
+import builtins
+import importlib.util
+
+HEAVY_MODULES = ("numpy", "cv2")  # modules the start-up path should not load
+TOP_IMPORTS = 10  # slowest modules listed
+
+class StartupProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.phases = []  # (name, seconds, heavy modules loaded by the end of the phase)
+        self.import_times = {}  # module name -> seconds, excluding nested imports
+        self._nested = []  # time spent in nested imports, per active import
+        self._import = None
+
+    def install(self):
+        """
+        Start timing imports.
+        """
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level:
+            try:
+                name_key = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                name_key = name
+        else:
+            name_key = name
+        if name_key in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            self.import_times[name_key] = self.import_times.get(name_key, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def phase(self, name):
+        """
+        End the current phase, naming it name.
+        """
+        now = time.perf_counter()
+        loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+        self.phases.append((name, now - self._last, loaded))
+        self._last = now
+
+    def report(self, file=None):
+        file = file or sys.stdout
+        total = self._last - self.start
+        print(f"Start-up took {total * 1000:.0f} ms (from main.py, after the interpreter started):", file=file)
+        for name, seconds, loaded in self.phases:
+            heavy = f"  [{', '.join(loaded)} loaded]" if loaded else ""
+            print(f"  {name:<36} {seconds * 1000:8.1f} ms{heavy}", file=file)
+        if not self.import_times:
+            return
+        by_package = {}
+        for module, seconds in self.import_times.items():
+            package = module.split(".", 1)[0]
+            by_package[package] = by_package.get(package, 0.0) + seconds
+        print("Import time by package:", file=file)
+        for package, seconds in sorted(by_package.items(), key=lambda item: -item[1])[:TOP_IMPORTS]:
+            print(f"  {package:<36} {seconds * 1000:8.1f} ms", file=file)
+        print("Slowest modules (excluding their imports):", file=file)
+        for module, seconds in sorted(self.import_times.items(), key=lambda item: -item[1])[:TOP_IMPORTS]:
+            print(f"  {module:<36} {seconds * 1000:8.1f} ms", file=file)
@@ -0,0 +1,102 @@
+# utils/thumbnail_cache.py
+import os
+import json
+import shutil
+import logging
+from utils.frame_source import fit_width
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+DEFAULT_THUMBNAIL_WIDTH = 96
+THUMBNAIL_QUALITY = 80
+# Sub-folder of a frames folder (or frame store) holding its thumbnails, like the proxies
+THUMBNAIL_FOLDER = "thumbnails"
+# Next to a video, thumbnails go into <video name without extension> + this suffix
+VIDEO_THUMBNAIL_SUFFIX = ".thumbnails"
+# Size and modification time of the video the thumbnails were made from
+STAMP_NAME = "source.json"
+
+def thumbnail_root(source_path):
+    """
+    Return the folder holding the thumbnails of a video file or frames folder.
+    """
+    source_path = source_path.rstrip(os.sep)
+    if os.path.isdir(source_path):
+        return os.path.join(source_path, THUMBNAIL_FOLDER)
+    return os.path.splitext(source_path)[0] + VIDEO_THUMBNAIL_SUFFIX
+
+def _source_stamp(source_path):
+    stat = os.stat(source_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+class ThumbnailCache:
+    """
+    Small JPEG thumbnails of the frames of a FrameSource, cached on disk as
+    <root>/<width>/<frame index>.jpg so they are made once per video and size.
+
+    Thumbnails of a video are dropped when the video file changes. If the cache
+    folder cannot be written, thumbnails are still returned but not kept.
+    """
+    def __init__(self, frame_source, width=DEFAULT_THUMBNAIL_WIDTH, root=None):
+        self.frame_source = frame_source
+        self.width = width
+        self.root = root or thumbnail_root(frame_source.path)
+        self.folder = os.path.join(self.root, str(width))
+        self.writable = True
+        try:
+            self._check_stamp()
+            os.makedirs(self.folder, exist_ok=True)
+        except OSError as e:
+            logging.warning("Thumbnails of %s are not cached: %s", frame_source.path, e)
+            self.writable = False
+
+    def _check_stamp(self):
+        if os.path.isdir(self.frame_source.path):
+            # Extracted frames are not rewritten in place, so their thumbnails stay valid
+            return
+        stamp = _source_stamp(self.frame_source.path)
+        stamp_path = os.path.join(self.root, STAMP_NAME)
+        try:
+            with open(stamp_path, "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+        if cached != stamp:
+            shutil.rmtree(self.root, ignore_errors=True)
+            os.makedirs(self.root, exist_ok=True)
+            with open(stamp_path, "w") as f:
+                json.dump(stamp, f)
+
+    def path(self, index):
+        return os.path.join(self.folder, f"{index:06d}.jpg")
+
+    def get(self, index):
+        """
+        Return the path of the cached thumbnail of frame index, or None.
+        """
+        path = self.path(index)
+        return path if os.path.exists(path) else None
+
+    def create(self, index):
+        """
+        Make the thumbnail of frame index and write it to the cache.
+
+        Returns:
+            numpy.ndarray: BGR thumbnail at most width pixels wide, or None if the
+            frame cannot be decoded.
+        """
+        # Proxies are read at thumbnail width, so JPEG folders decode at reduced scale;
+        # pre-generated proxies come back at their own size and are shrunk here
+        thumbnail = fit_width(self.frame_source.read_proxy(index, self.width), self.width)
+        if thumbnail is None or not self.writable:
+            return thumbnail
+        path = self.path(index)
+        # Written under a temporary name so a reader never sees a partial file
+        tmp_path = path + ".tmp.jpg"
+        try:
+            if cv2.imwrite(tmp_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY]):
+                os.replace(tmp_path, path)
+        except (OSError, cv2.error) as e:
+            logging.warning("Could not cache thumbnail %s: %s", path, e)
+        return thumbnail